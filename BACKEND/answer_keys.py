@@ -0,0 +1,90 @@
+import os
+import re
+from sqlalchemy import select
+from cache import LRUCache
+from models import db, Quiz, Question, EntityVersion
+
+# Compiled answer keys, one per quiz, so grading a submission needs one
+# small query (two on a miss) instead of one per answered question. Entries
+# are tagged with the quiz's 'quiz:<id>' version (versions.py), which every
+# Question insert, update or delete bumps in the same transaction, so no
+# gunicorn worker grades against a key older than the committed questions.
+
+_cache = LRUCache(
+    maxsize=int(os.getenv('ANSWER_KEY_CACHE_SIZE', 256)),
+    ttl=int(os.getenv('ANSWER_KEY_CACHE_TTL', 300))
+)
+
+_OPTION = re.compile(r'[0-9]{1,9}')
+
+
+def answer_text(answer):
+    # The form QuizAnswer.answer stores; grading only looks at this, so a
+    # later regrade of the stored text gives the same result as submitting
+    return answer if isinstance(answer, str) else str(answer)
+
+
+def option_number(answer):
+    # The MCQ option an answer names, or None. Only one to nine ASCII digits
+    # name an option: 1 and "1" do, "01" is option 1, while True, "1.0",
+    # "²", "١" and numbers too large for an option column never match.
+    text = answer_text(answer)
+    return int(text) if _OPTION.fullmatch(text) else None
+
+
+class AnswerKey:
+    __slots__ = ('quiz_id', 'questions')
+
+    def __init__(self, quiz_id, rows):
+        self.quiz_id = quiz_id
+        # question id -> (type, correct option)
+        self.questions = {row.id: (row.type, row.correct_option) for row in rows}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __contains__(self, question_id):
+        return question_id in self.questions
+
+    def is_correct(self, question_id, answer):
+        # Only MCQ questions with a correct option are graded automatically;
+        # everything else is left for manual review
+        question_type, correct_option = self.questions[question_id]
+        if question_type == 'mcq' and correct_option is not None:
+            return option_number(answer) == correct_option
+        return False
+
+
+def get_answer_key(quiz_id):
+    # None when the quiz does not exist. One statement checks the quiz and
+    # reads its version; the questions are only read when this process has
+    # no key for that version.
+    row = db.session.execute(
+        select(Quiz.id, EntityVersion.version)
+        .outerjoin(EntityVersion, EntityVersion.name == f'quiz:{quiz_id}')
+        .where(Quiz.id == quiz_id)
+    ).first()
+    if row is None:
+        return None
+    version = row.version or 0
+
+    entry = _cache.get(quiz_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    rows = db.session.execute(
+        select(Question.id, Question.type, Question.correct_option).where(Question.quiz_id == quiz_id)
+    ).all()
+    key = AnswerKey(quiz_id, rows)
+    # An empty key is cheap to rebuild, and would otherwise be the one most
+    # likely to be graded against while questions are still being added
+    if rows:
+        _cache.set(quiz_id, (version, key))
+    return key
+
+
+def invalidate(quiz_id):
+    _cache.pop(quiz_id)
+
+
+def stats():
+    return _cache.stats()
@@ -1,50 +1,149 @@
-from flask import Flask, request, jsonify
+import config
+from flask import Flask
+from flask.cli import with_appcontext
 from flask_cors import CORS
-from routes.auth import auth_bp
-from routes.courses import course_bp
 from models import db
-from routes.dashboard import dashboard_bp
-from routes.notifications import notif_bp
-from routes.youtube import youtube_bp
-from routes.quiz import quiz_bp
-from leaderboard import leaderboard_bp
+import passwords
+import metrics
+import query_profiler
+import responses
+from leaderboard import rebuild_leaderboard
+from counters import reconcile_student_counts
+from retention import archive_notifications, RETENTION_DAYS
+import migrations
 
-import os
-from dotenv import load_dotenv
+import click
 
-app = Flask(__name__)
-load_dotenv()
+# Application factory. gunicorn and the flask CLI call create_app():
+#
+#     gunicorn 'app:create_app()'
+#     flask --app app db-upgrade
+#
+# Nothing touches the database at import or in create_app; the schema is
+# created and upgraded by the db-upgrade command. Clients of external
+# services (Cloudinary, YouTube) are built on first use.
 
 
-CORS(app, 
-     origins=["https://mentoroid-zeta.vercel.app"],
-     supports_credentials=True)
+def create_app(overrides=None, routes=True):
+    # routes=False leaves out the blueprints, for processes that only need
+    # the database (worker.py)
+    app = Flask(__name__)
+    app.config.from_object(config.Config)
+    if overrides:
+        app.config.update(overrides)
 
+    CORS(app,
+         origins=app.config['CORS_ORIGINS'],
+         supports_credentials=True,
+         expose_headers=['ETag', 'X-Next-Cursor'])
 
+    db.init_app(app)
+    passwords.init_app(app)
+    # Before responses, so the recorded time includes compression
+    metrics.init_app(app)
+    query_profiler.init_app(app)
+    responses.init_app(app)
 
-app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL")
+    if routes:
+        register_blueprints(app)
+        app.add_url_rule('/', 'home', home)
 
+    for command in COMMANDS:
+        app.cli.add_command(command)
+    return app
 
-db.init_app(app)
 
-# Blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(course_bp)
-app.register_blueprint(quiz_bp)
-app.register_blueprint(dashboard_bp)
-app.register_blueprint(notif_bp)
-app.register_blueprint(youtube_bp)
-app.register_blueprint(leaderboard_bp)
+def register_blueprints(app):
+    from routes.auth import auth_bp
+    from routes.courses import course_bp
+    from routes.quiz import quiz_bp
+    from routes.dashboard import dashboard_bp
+    from routes.notifications import notif_bp
+    from routes.youtube import youtube_bp
+    from leaderboard import leaderboard_bp
+    from course import course_detail_bp
+    from routes.media import media_bp
 
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(course_bp)
+    app.register_blueprint(quiz_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(notif_bp)
+    app.register_blueprint(youtube_bp)
+    app.register_blueprint(leaderboard_bp)
+    app.register_blueprint(course_detail_bp)
+    app.register_blueprint(media_bp)
 
-with app.app_context():
-    db.create_all()
 
-@app.route('/')
 def home():
     return 'Flask backend is working!'
 
 
+@click.command('db-upgrade')
+@with_appcontext
+def db_upgrade_command():
+    # Run on every deploy, before starting the new web and worker processes.
+    # On an empty database this creates the schema.
+    applied = migrations.upgrade(db.engine)
+    print(f'Applied {len(applied)} migrations')
+
+
+@click.command('db-status')
+@with_appcontext
+def db_status_command():
+    applied = migrations.applied_versions(db.engine)
+    for version, name, _ in migrations.discover():
+        print(f"{version:04d}_{name}: {'applied' if version in applied else 'pending'}")
+
+
+@click.command('regrade-quiz')
+@click.argument('quiz_id', type=int)
+@with_appcontext
+def regrade_quiz_command(quiz_id):
+    # Same as POST /quiz/<quiz_id>/regrade, with progress on the terminal
+    from regrade import regrade_quiz
+
+    def progress(done, total):
+        print(f'\r{done}/{total} answers', end='', flush=True)
+
+    summary = regrade_quiz(quiz_id, progress=progress)
+    print()
+    print(summary)
+
+
+@click.command('reconcile-enrollments')
+@click.option('--dry-run', is_flag=True, help='Only report courses whose counter is off')
+@with_appcontext
+def reconcile_enrollments_command(dry_run):
+    drift = reconcile_student_counts(fix=not dry_run)
+    for course_id, stored, actual in drift:
+        print(f'course {course_id}: students={stored}, enrollments={actual}')
+    print(f"{len(drift)} courses {'drifted' if dry_run else 'repaired'}")
+
+
+@click.command('archive-notifications')
+@click.option('--days', type=int, default=RETENTION_DAYS, show_default=True, help='Keep read notifications this many days')
+@with_appcontext
+def archive_notifications_command(days):
+    print(f'Archived {archive_notifications(days=days)} notifications')
+
+
+@click.command('rebuild-leaderboard')
+@with_appcontext
+def rebuild_leaderboard_command():
+    # Fills leaderboard_entry from existing submissions
+    print(f'Rebuilt {rebuild_leaderboard()} leaderboard entries')
+
+
+COMMANDS = [
+    db_upgrade_command,
+    db_status_command,
+    regrade_quiz_command,
+    reconcile_enrollments_command,
+    archive_notifications_command,
+    rebuild_leaderboard_command,
+]
+
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,73 @@
+"""Student course list: full dashboard vs paginated catalog.
+
+    python -m benchmarks.bench_catalog [catalog sizes...]
+
+Seeds courses with realistic descriptions, enrolls one student in a few
+of them and compares latency and response size of /dashboard/student
+(every course, full descriptions) with the first /catalog page.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import insert, delete
+
+from models import db, User, Course, Enrollment
+from routes.dashboard import dashboard_bp
+
+DEFAULT_SIZES = [1_000, 10_000, 50_000]
+REPEAT = 10
+DESCRIPTION = 'Learn the fundamentals step by step with hands-on projects. ' * 12
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(dashboard_bp)
+    return app
+
+
+def seed(size):
+    for model in (Enrollment, Course, User):
+        db.session.execute(delete(model))
+    db.session.execute(insert(User), [
+        {'id': 1, 'name': 'Teacher', 'email': 't@gmail.com', 'password': 'x', 'role': 'teacher'},
+        {'id': 2, 'name': 'Student', 'email': 's@gmail.com', 'password': 'x', 'role': 'student'},
+    ])
+    db.session.execute(insert(Course), [
+        {'id': i, 'title': f'Course {i}', 'level': 'beginner', 'description': DESCRIPTION,
+         'thumbnail': f'https://res.cloudinary.com/demo/image/upload/course{i}.jpg',
+         'youtube_link': 'https://youtube.com/playlist?list=PL', 'teacher_id': 1}
+        for i in range(1, size + 1)
+    ])
+    db.session.execute(insert(Enrollment), [{'student_id': 2, 'course_id': i} for i in range(1, size + 1, max(size // 20, 1))])
+    db.session.commit()
+
+
+def measure(client, url):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        res = client.get(url)
+    assert res.status_code == 200
+    return (time.perf_counter() - start) / REPEAT * 1000, len(res.data)
+
+
+def run(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            print(f"{'courses':>8} {'dashboard ms':>13} {'dashboard KiB':>14} {'catalog ms':>11} {'catalog KiB':>12}")
+            for size in sizes:
+                seed(size)
+                dash_ms, dash_bytes = measure(client, '/dashboard/student?student_id=2')
+                cat_ms, cat_bytes = measure(client, '/catalog?student_id=2')
+                print(f'{size:>8} {dash_ms:>13.1f} {dash_bytes / 1024:>14.0f} {cat_ms:>11.2f} {cat_bytes / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    run([int(n) for n in sys.argv[1:]] or DEFAULT_SIZES)
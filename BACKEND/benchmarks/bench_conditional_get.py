@@ -0,0 +1,81 @@
+"""Full responses versus 304 Not Modified on the cached read endpoints.
+
+    python -m benchmarks.bench_conditional_get [--scale 1.0] [--requests 500]
+
+Seeds benchmarks.seed and, for each route served through
+versions.conditional, times REQUESTS plain GETs and REQUESTS GETs that send
+back the ETag of the first response. Reports requests/second, statements
+per request and response bytes for both, through the test client in one
+thread, so the numbers show the work saved per request, not the server's
+capacity.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# The app reads DATABASE_URL at import; point it at a scratch database
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'conditional.sqlite3')}"
+
+from sqlalchemy import event  # noqa: E402
+
+import migrations  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+app = create_app()
+
+
+def routes_for(ids):
+    return [
+        ('/course/<id>', f"/course/{ids['course_id']}"),
+        ('/quiz/<id>', f"/quiz/{ids['quiz_id']}"),
+        ('/quizzes', '/quizzes?limit=50'),
+        ('/dashboard/teacher', f"/dashboard/teacher?id={ids['teacher_id']}"),
+        ('/leaderboard/<id>', f"/leaderboard/{ids['quiz_id']}"),
+        ('/leaderboard/<id>/rank/<student>', f"/leaderboard/{ids['quiz_id']}/rank/{ids['student_id']}"),
+        ('/leaderboard/<id>/student/<student>', f"/leaderboard/{ids['quiz_id']}/student/{ids['student_id']}"),
+    ]
+
+
+def measure(client, url, headers, requests, counter):
+    counter[0] = 0
+    size = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        res = client.get(url, headers=headers)
+        size = len(res.data)
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, counter[0] / requests, size, res.status_code
+
+
+def run(scale, requests):
+    client = app.test_client()
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        ids = seed(scale=scale)
+
+        counter = [0]
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(*args):
+            counter[0] += 1
+
+        print(f'{requests} requests per row, scale {scale}')
+        print(f"{'route':<38} {'':>4} {'req/s':>8} {'stmts':>6} {'bytes':>8}")
+        for label, url in routes_for(ids):
+            tag = client.get(url).headers['ETag']
+            for kind, headers in (('full', {}), ('304', {'If-None-Match': tag})):
+                rate, statements, size, status = measure(client, url, headers, requests, counter)
+                assert status == (200 if kind == 'full' else 304), (url, status)
+                print(f'{label:<38} {kind:>4} {rate:>8.0f} {statements:>6.1f} {size:>8}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    run(args.scale, args.requests)
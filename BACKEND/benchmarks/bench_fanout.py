@@ -0,0 +1,94 @@
+"""Notification fan-out throughput.
+
+Run from the BACKEND directory:
+
+    python -m benchmarks.bench_fanout [recipient counts...]
+
+Seeds N students into a throwaway SQLite database and times three ways of
+notifying all of them: the old one-ORM-object-per-student loop, chunked
+Core executemany, and a single INSERT ... SELECT. Peak Python memory is
+reported alongside rows/second.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+from sqlalchemy import insert, delete
+
+from models import db, User, Notification
+from fanout import notify_students, notify_users
+
+DEFAULT_COUNTS = [1_000, 10_000, 100_000]
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    return app
+
+
+def seed_students(count):
+    db.session.execute(delete(Notification))
+    db.session.execute(delete(User))
+    db.session.execute(insert(User), [{
+        'name': f'Student {i}',
+        'email': f'student{i}@gmail.com',
+        'password': 'x',
+        'role': 'student'
+    } for i in range(count)])
+    db.session.commit()
+
+
+def orm_loop(message):
+    # What create_course used to do
+    for student in User.query.filter_by(role='student').all():
+        db.session.add(Notification(recipient_id=student.id, message=message, is_read=False))
+    db.session.flush()
+
+
+def chunked_executemany(message):
+    ids = db.session.execute(db.select(User.id).where(User.role == 'student').execution_options(yield_per=1000)).scalars()
+    notify_users(ids, message)
+
+
+def insert_select(message):
+    notify_students(message)
+
+
+STRATEGIES = [
+    ('orm loop', orm_loop),
+    ('executemany', chunked_executemany),
+    ('insert-select', insert_select),
+]
+
+
+def run(counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        with app.app_context():
+            db.create_all()
+            print(f"{'recipients':>10}  {'strategy':<14} {'seconds':>8} {'rows/s':>12} {'peak MiB':>9}")
+            for count in counts:
+                seed_students(count)
+                for name, fn in STRATEGIES:
+                    db.session.expunge_all()
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    fn('New course uploaded: Benchmark')
+                    db.session.commit()
+                    elapsed = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    written = Notification.query.count()
+                    assert written == count, (name, written, count)
+                    print(f'{count:>10}  {name:<14} {elapsed:>8.3f} {count / elapsed:>12,.0f} {peak / 2**20:>9.1f}')
+                    db.session.execute(delete(Notification))
+                    db.session.commit()
+
+
+if __name__ == '__main__':
+    run([int(n) for n in sys.argv[1:]] or DEFAULT_COUNTS)
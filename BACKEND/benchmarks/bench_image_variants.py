@@ -0,0 +1,60 @@
+"""Time to make the image variants of one upload.
+
+    python -m benchmarks.bench_image_variants [megapixels...]
+
+For each source size (default 2 8 24 megapixels, 4:3) writes a noisy JPEG
+and a PNG and runs images.make_variants on it for the thumbnail sizes.
+Reports the best of REPEAT runs in milliseconds per image and per source
+megapixel. JPEGs are decoded at a reduced
+size (draft mode), so their cost grows much more slowly with the camera
+resolution than the PNGs' does.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+from images import make_variants
+
+DEFAULT_MEGAPIXELS = [2, 8, 24]
+REPEAT = 3
+
+
+def write_source(directory, megapixels, fmt):
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    # Noise on a gradient, so the encoders cannot cheat on flat colour
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    noise = Image.effect_noise((width, height), 40).convert('RGB')
+    image = Image.blend(image, noise, 0.3)
+    path = os.path.join(directory, f'source-{megapixels}mp.{fmt.lower()}')
+    image.save(path, fmt)
+    return path, width * height / 1_000_000
+
+
+def measure(path):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        files = make_variants(path, 'thumbnail')
+        timings.append(time.perf_counter() - start)
+        for formats in files.values():
+            for file_path in formats.values():
+                os.remove(file_path)
+    return min(timings) * 1000
+
+
+def run(megapixels):
+    print(f"{'source':>14} {'ms/image':>9} {'ms/MP':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mp in megapixels:
+            for fmt in ('JPEG', 'PNG'):
+                path, actual = write_source(tmp, mp, fmt)
+                ms = measure(path)
+                print(f'{actual:>7.1f} MP {fmt:<4} {ms:>9.1f} {ms / actual:>7.1f}')
+
+
+if __name__ == '__main__':
+    run([float(m) for m in sys.argv[1:]] or DEFAULT_MEGAPIXELS)
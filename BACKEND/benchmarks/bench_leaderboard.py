@@ -0,0 +1,85 @@
+"""Leaderboard reads on small and large quizzes.
+
+    python -m benchmarks.bench_leaderboard [board sizes...]
+
+For each size, seeds one quiz with that many submissions, builds the
+materialized board and times: the old full sort over QuizSubmission joined
+to User, the top-10 page, and a rank-with-neighbours lookup for the median
+student.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import insert, delete
+
+from models import db, User, Quiz, QuizSubmission, LeaderboardEntry
+from leaderboard import leaderboard_bp, rebuild_leaderboard
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+REPEAT = 20
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(leaderboard_bp)
+    return app
+
+
+def seed(size):
+    for model in (LeaderboardEntry, QuizSubmission, Quiz, User):
+        db.session.execute(delete(model))
+    rng = random.Random(size)
+    db.session.execute(insert(User), [
+        {'id': i, 'name': f'Student {i}', 'email': f's{i}@gmail.com', 'password': 'x', 'role': 'student'}
+        for i in range(1, size + 1)
+    ])
+    db.session.execute(insert(Quiz), [{'id': 1, 'title': 'Bench', 'teacher_id': 1}])
+    db.session.execute(insert(QuizSubmission), [
+        {'quiz_id': 1, 'student_id': i, 'time_taken': rng.randint(30, 900), 'score': rng.randint(0, 20) * 5.0}
+        for i in range(1, size + 1)
+    ])
+    db.session.commit()
+    rebuild_leaderboard(1)
+
+
+def old_full_board():
+    rows = db.session.query(
+        QuizSubmission.student_id, QuizSubmission.submitted_at, QuizSubmission.time_taken,
+        QuizSubmission.score, User.name
+    ).join(User, User.id == QuizSubmission.student_id)\
+     .filter(QuizSubmission.quiz_id == 1)\
+     .order_by(QuizSubmission.score.desc(), QuizSubmission.time_taken.asc()).all()
+    return len(rows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def run(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            print(f"{'board size':>10} {'old full sort ms':>17} {'top-10 ms':>10} {'my rank ms':>11}")
+            for size in sizes:
+                seed(size)
+                median = client.get('/leaderboard/1?limit=1&offset=%d' % (size // 2)).get_json()[0]['student_id']
+                old_ms = timed(old_full_board)
+                top_ms = timed(lambda: client.get('/leaderboard/1?limit=10'))
+                rank_ms = timed(lambda: client.get(f'/leaderboard/1/rank/{median}'))
+                print(f'{size:>10} {old_ms:>17.2f} {top_ms:>10.2f} {rank_ms:>11.2f}')
+
+
+if __name__ == '__main__':
+    run([int(n) for n in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,97 @@
+"""Login throughput per bcrypt cost.
+
+    python -m benchmarks.bench_login [costs...]
+
+For each cost (default 4 8 10 12) stores a bcrypt hash of that cost and
+has CLIENTS threads log in through the test client for SECONDS seconds.
+Reports logins/second overall and per core (hashes run on the
+PASSWORD_HASH_WORKERS pool, so the pool size is the number of cores
+used), 503 answers from the bounded queue, and the one-off cost of
+upgrading a legacy SHA-256 account on its first login.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import insert, update
+
+import passwords
+from models import db, User
+from routes.auth import auth_bp
+
+DEFAULT_COSTS = [4, 8, 10, 12]
+CLIENTS = 16
+SECONDS = 5
+PASSWORD = 'Secret@123'
+
+
+def make_app(path, cost):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['BCRYPT_LOG_ROUNDS'] = cost
+    db.init_app(app)
+    passwords.init_app(app)
+    app.register_blueprint(auth_bp)
+    return app
+
+
+def hammer(app):
+    ok = busy = 0
+    lock = threading.Lock()
+    stop = time.monotonic() + SECONDS
+
+    def client_loop():
+        nonlocal ok, busy
+        client = app.test_client()
+        while time.monotonic() < stop:
+            res = client.post('/login', json={'email': 'student@gmail.com', 'password': PASSWORD})
+            with lock:
+                if res.status_code == 200:
+                    ok += 1
+                elif res.status_code == 503:
+                    busy += 1
+                else:
+                    raise AssertionError(res.status_code)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(CLIENTS)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return ok / (time.monotonic() - start), busy
+
+
+def run(costs):
+    cores = min(passwords.WORKERS, os.cpu_count() or 1)
+    print(f'{CLIENTS} clients, {passwords.WORKERS} hash workers, queue {passwords.QUEUE_SIZE}, {cores} cores')
+    print(f"{'cost':>4} {'logins/s':>9} {'per core':>9} {'503s':>6} {'legacy upgrade ms':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for cost in costs:
+            app = make_app(os.path.join(tmp, f'cost{cost}.sqlite3'), cost)
+            with app.app_context():
+                db.create_all()
+                db.session.execute(insert(User), [{
+                    'id': 1, 'name': 'Student', 'email': 'student@gmail.com', 'role': 'student',
+                    'password': hashlib.sha256(PASSWORD.encode()).hexdigest()
+                }])
+                db.session.commit()
+
+                client = app.test_client()
+                start = time.perf_counter()
+                assert client.post('/login', json={'email': 'student@gmail.com', 'password': PASSWORD}).status_code == 200
+                upgrade_ms = (time.perf_counter() - start) * 1000
+                assert db.session.get(User, 1).password.startswith(f'$2b${cost:02d}$')
+
+                rate, busy = hammer(app)
+                print(f'{cost:>4} {rate:>9.1f} {rate / cores:>9.1f} {busy:>6} {upgrade_ms:>18.1f}')
+                db.session.execute(update(User).values(password=''))
+                db.session.commit()
+
+
+if __name__ == '__main__':
+    run([int(c) for c in sys.argv[1:]] or DEFAULT_COSTS)
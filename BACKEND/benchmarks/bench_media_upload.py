@@ -0,0 +1,100 @@
+"""Course creation latency with a slow media backend.
+
+    python -m benchmarks.bench_media_upload [upload delay ms]
+
+Creates courses with a 200 KiB JPEG thumbnail through POST /create-course while
+the media backend takes the given time per upload (default 800 ms, a slow
+Cloudinary round trip). Compares the request time with the time it takes
+the request plus an inline upload, which is what create_course used to
+do, and reports how long the worker then needs to push the staged files.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+import media
+from media import LocalUploader, process_uploads
+from models import db, User, Course
+from routes.courses import course_bp
+
+REQUESTS = 20
+
+
+def make_thumbnail():
+    # Noise compresses badly, so a small image still makes a large file
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (480, 360), os.urandom(480 * 360 * 3)).save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+THUMBNAIL = make_thumbnail()
+
+
+class SlowUploader(LocalUploader):
+    def __init__(self, root, delay):
+        super().__init__(root=root, base_url='/media')
+        self.delay = delay
+
+    def upload(self, path, kind):
+        time.sleep(self.delay)
+        return super().upload(path, kind)
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(course_bp)
+    return app
+
+
+def create_course(client, n):
+    res = client.post('/create-course', content_type='multipart/form-data', data={
+        'title': f'Course {n}', 'description': 'About', 'teacher_id': '1', 'youtube_link': 'https://youtube.com',
+        'thumbnail': (io.BytesIO(THUMBNAIL), 'thumbnail.jpg')
+    })
+    assert res.status_code == 200, res.json
+    return res
+
+
+def run(delay_ms):
+    with tempfile.TemporaryDirectory() as tmp:
+        media.STAGING_DIR = os.path.join(tmp, 'staging')
+        uploader = SlowUploader(os.path.join(tmp, 'media'), delay_ms / 1000)
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id=1, name='Teacher', email='t@gmail.com', password='x', role='teacher'))
+            db.session.commit()
+
+            start = time.perf_counter()
+            for n in range(REQUESTS):
+                create_course(client, n)
+            staged_ms = (time.perf_counter() - start) / REQUESTS * 1000
+
+            start = time.perf_counter()
+            while process_uploads(uploader=uploader):
+                pass
+            drain = time.perf_counter() - start
+            ready = Course.query.filter_by(thumbnail_status='ready').count()
+
+            start = time.perf_counter()
+            for n in range(REQUESTS):
+                create_course(client, n)
+                process_uploads(uploader=uploader)
+            inline_ms = (time.perf_counter() - start) / REQUESTS * 1000
+
+        print(f'upload delay {delay_ms} ms, {REQUESTS} courses each')
+        print(f'  staged request            {staged_ms:8.1f} ms')
+        print(f'  request + inline upload   {inline_ms:8.1f} ms')
+        print(f'  worker pushed the {ready} staged thumbnails in {drain:.1f} s')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 800)
@@ -0,0 +1,112 @@
+"""Cost of the request metrics: the same requests with metrics on and off.
+
+    python -m benchmarks.bench_metrics [--scale 1.0] [--requests 300] [--rounds 5]
+
+First times the recording itself, which is what metrics add to every
+request: the request hooks (timers, two histogram observations, two
+counters, the in-flight gauge) and the SQL statement listeners.
+
+Then seeds benchmarks.seed and requests a cheap route (a 304 answer), a
+typical read and a write through the test client, alternating rounds with
+metrics.ENABLED off and on so drift on the machine hits both equally, and
+reports the median round's process CPU microseconds per request for each
+mode. Differences of a few percent there are noise; the first numbers are
+the stable ones. Also times one render of /metrics with every route
+recorded.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# The app reads DATABASE_URL at import; point it at a scratch database
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'metrics.sqlite3')}"
+
+import metrics  # noqa: E402
+import migrations  # noqa: E402
+from flask import Response  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+app = create_app()
+
+
+def routes_for(client, ids):
+    # (label, method, url, json body, headers)
+    etag = client.get(f"/quiz/{ids['quiz_id']}").headers['ETag']
+    return [
+        ('/quiz/<id> 304', 'GET', f"/quiz/{ids['quiz_id']}", None, {'If-None-Match': etag}),
+        ('/dashboard/student', 'GET', f"/dashboard/student?student_id={ids['student_id']}", None, {}),
+        ('/quiz/<id>/score/<student>', 'POST', f"/quiz/{ids['quiz_id']}/score/{ids['student_id']}",
+         {'score': 80, 'feedback': 'Reviewed'}, {}),
+    ]
+
+
+def measure(client, method, url, body, headers, requests):
+    start = time.process_time()
+    for _ in range(requests):
+        res = client.open(url, method=method, json=body, headers=headers)
+    assert res.status_code in (200, 304), (url, res.status_code)
+    return (time.process_time() - start) / requests * 1e6
+
+
+def recording_cost(n=100000):
+    # (microseconds per request, microseconds per SQL statement)
+    response = Response('')
+    with app.test_request_context('/dashboard/student'):
+        start = time.process_time()
+        for _ in range(n):
+            metrics._before_request()
+            metrics._after_request(response)
+            metrics._teardown_request(None)
+        per_request = (time.process_time() - start) / n * 1e6
+
+        class Context:
+            pass
+        context = Context()
+        token = metrics._db_usage.set([0.0, 0])
+        start = time.process_time()
+        for _ in range(n):
+            metrics._before_execute(None, None, '', None, context, False)
+            metrics._after_execute(None, None, '', None, context, False)
+        per_statement = (time.process_time() - start) / n * 1e6
+        metrics._db_usage.reset(token)
+    return per_request, per_statement
+
+
+def run(scale, requests, rounds):
+    per_request, per_statement = recording_cost()
+    print(f'Recording: {per_request:.1f} us per request + {per_statement:.2f} us per SQL statement\n')
+
+    client = app.test_client()
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        ids = seed(scale=scale)
+
+        print(f'{requests} requests per round, median of {rounds} rounds, scale {scale}')
+        print(f"{'route':<30} {'off us':>8} {'on us':>8} {'cost us':>8} {'cost':>6}")
+        for label, method, url, body, headers in routes_for(client, ids):
+            timings = {False: [], True: []}
+            for _ in range(rounds):
+                for enabled in (False, True):
+                    metrics.ENABLED = enabled
+                    timings[enabled].append(measure(client, method, url, body, headers, requests))
+            off, on = statistics.median(timings[False]), statistics.median(timings[True])
+            print(f'{label:<30} {off:>8.1f} {on:>8.1f} {on - off:>8.1f} {(on - off) / off * 100:>5.1f}%')
+        metrics.ENABLED = True
+
+        start = time.perf_counter()
+        size = len(client.get('/metrics').data)
+        print(f'\n/metrics render: {(time.perf_counter() - start) * 1000:.2f} ms, {size} bytes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    run(args.scale, args.requests, args.rounds)
@@ -0,0 +1,91 @@
+"""Notification reads before and after archiving old read notifications.
+
+    python -m benchmarks.bench_notification_retention [users] [per_user]
+
+Seeds per_user notifications (default 500) for each of users (default
+1,000), one a day going back in time, with everything older than 30 days
+read. Times the first page of /notifications/<id>, paging deep with
+?before=, and mark-read up to an id; then runs archive_notifications() and
+times the same requests on the smaller table.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import insert, func, select
+
+from models import db, User, Notification
+from retention import archive_notifications
+from routes.notifications import notif_bp
+
+REPEAT = 200
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(notif_bp)
+    return app
+
+
+def seed(users, per_user, now):
+    db.session.execute(insert(User), [
+        {'id': i, 'name': f'Student {i}', 'email': f's{i}@gmail.com', 'password': 'x', 'role': 'student',
+         'unread_notifications': 30}
+        for i in range(1, users + 1)
+    ])
+    # Oldest first, so ids follow time like real inserts
+    for day in range(per_user, 0, -1):
+        db.session.execute(insert(Notification), [
+            {'recipient_id': i, 'message': f'Notification from {day} days ago', 'is_read': day > 30,
+             'timestamp': now - timedelta(days=day)}
+            for i in range(1, users + 1)
+        ])
+    db.session.commit()
+
+
+def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        res = client.open(url, method=method, **kwargs)
+    assert res.status_code == 200, res.status_code
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def measure(client, user_id, label):
+    rows = db.session.execute(select(func.count(Notification.id))).scalar()
+    newest = db.session.execute(
+        select(func.max(Notification.id)).where(Notification.recipient_id == user_id)
+    ).scalar()
+    first = timed(client, 'GET', f'/notifications/{user_id}')
+    deep = timed(client, 'GET', f'/notifications/{user_id}?before={newest // 2}')
+    mark = timed(client, 'POST', f'/notifications/mark-read/{user_id}', json={'up_to': newest})
+    print(f'{label:<16} {rows:>9} rows   first page {first:6.2f} ms   deep page {deep:6.2f} ms   '
+          f'mark-read {mark:6.2f} ms')
+
+
+def run(users, per_user):
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            seed(users, per_user, now)
+            user_id = users // 2
+            measure(client, user_id, 'before archive')
+
+            start = time.perf_counter()
+            archived = archive_notifications(days=30, now=now)
+            seconds = time.perf_counter() - start
+            print(f'archived {archived} notifications in {seconds:.1f} s ({archived / seconds:,.0f} rows/s)')
+            measure(client, user_id, 'after archive')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [1000, 500][len(args):]))
@@ -0,0 +1,148 @@
+"""Database load of idle notification bells: polling vs the SSE stream.
+
+    python -m benchmarks.bench_notification_stream [clients] [seconds]
+
+Opens the given number of bells (default 200) for the given time (default
+10 s). Polling bells GET /notifications/<id> every POLL_EVERY seconds like
+the old NotificationBell; streaming bells hold /notifications/<id>/stream
+open while one notification per second is fanned out. Reports statements
+executed against the database (connecting the streams counted separately)
+and events delivered. Also compares a /notifications/<id> read with
+/notifications/<id>/unread-count.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from models import db, User, Notification
+from fanout import notify_students
+from notification_stream import hub
+import routes.notifications
+from routes.notifications import notif_bp
+
+POLL_EVERY = 5
+REPEAT = 200
+
+routes.notifications.SSE_ENABLED = True
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(notif_bp)
+    return app
+
+
+def seed(clients):
+    db.session.execute(insert(User), [
+        {'id': i, 'name': f'Student {i}', 'email': f's{i}@gmail.com', 'password': 'x', 'role': 'student',
+         'unread_notifications': 20}
+        for i in range(1, clients + 1)
+    ])
+    db.session.execute(insert(Notification), [
+        {'recipient_id': i, 'message': f'Notification {n}', 'is_read': False}
+        for i in range(1, clients + 1) for n in range(20)
+    ])
+    db.session.commit()
+
+
+def count_statements(engine):
+    counter = {'n': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(*args):
+        counter['n'] += 1
+
+    return counter
+
+
+def polling(app, clients, seconds):
+    stop = time.monotonic() + seconds
+
+    def bell(user_id):
+        client = app.test_client()
+        # Spread the clients over the interval, as real page loads are
+        time.sleep(POLL_EVERY * user_id / clients)
+        while time.monotonic() < stop:
+            client.get(f'/notifications/{user_id}')
+            time.sleep(POLL_EVERY)
+
+    threads = [threading.Thread(target=bell, args=(i,)) for i in range(1, clients + 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def streaming(app, clients, seconds, counter):
+    received = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def bell(user_id):
+        res = app.test_client().get(f'/notifications/{user_id}/stream', buffered=False)
+        for chunk in res.iter_encoded():
+            if b'event: notification' in chunk:
+                with lock:
+                    received[0] += 1
+            if time.monotonic() >= stop:
+                break
+        res.close()
+
+    threads = [threading.Thread(target=bell, args=(i,)) for i in range(1, clients + 1)]
+    for t in threads:
+        t.start()
+    while hub.subscriber_count() < clients:
+        time.sleep(0.01)
+    connected = counter['n']
+    counter['n'] = 0
+    while time.monotonic() < stop:
+        time.sleep(1)
+        with app.app_context():
+            notify_students('Exam starts soon')
+            db.session.commit()
+    for t in threads:
+        t.join()
+    return connected, received[0]
+
+
+def read_latency(client, url):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        client.get(url)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def run(clients, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        with app.app_context():
+            db.create_all()
+            seed(clients)
+            counter = count_statements(db.engine)
+
+        client = app.test_client()
+        list_ms = read_latency(client, '/notifications/1')
+        count_ms = read_latency(client, '/notifications/1/unread-count')
+        print(f'GET /notifications/<id>: {list_ms:.2f} ms, /unread-count: {count_ms:.2f} ms')
+
+        counter['n'] = 0
+        polling(app, clients, seconds)
+        print(f'polling   {clients} bells, {seconds} s: {counter["n"]:>6} statements')
+
+        counter['n'] = 0
+        connected, received = streaming(app, clients, seconds, counter)
+        # notify_students itself is 2 statements per notification
+        print(f'streaming {clients} bells, {seconds} s: {counter["n"]:>6} statements '
+              f'(+{connected} to connect), {received} events delivered')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [200, 10][len(args):]))
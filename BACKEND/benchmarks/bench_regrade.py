@@ -0,0 +1,115 @@
+"""Bulk regrade throughput: NumPy engine vs row-at-a-time.
+
+    python -m benchmarks.bench_regrade [submissions] [questions]
+
+Seeds a quiz with the given number of submissions (every question
+answered), changes the answer key and regrades. The row-at-a-time
+baseline, which looks up each question and updates each answer through
+the ORM, runs on a smaller sample and its rate is reported alongside.
+On the sample both engines must produce the same scores.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import insert, update
+
+from models import db, User, Quiz, Question, QuizSubmission, QuizAnswer
+from regrade import regrade_quiz
+
+SAMPLE = 2_000
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    return app
+
+
+def seed_quiz(quiz_id, submissions, questions, rng):
+    db.session.execute(insert(Quiz), [{'id': quiz_id, 'title': f'Quiz {quiz_id}', 'teacher_id': 1}])
+    question_ids = [quiz_id * 1000 + n for n in range(questions)]
+    db.session.execute(insert(Question), [
+        {'id': qid, 'quiz_id': quiz_id, 'text': 'q', 'type': 'mcq', 'options': ['a', 'b', 'c', 'd'], 'correct_option': 0}
+        for qid in question_ids
+    ])
+    first_submission = quiz_id * 10_000_000
+    batch = []
+    for n in range(submissions):
+        sid = first_submission + n
+        answers = [rng.randint(0, 3) for _ in question_ids]
+        batch.append({'id': sid, 'quiz_id': quiz_id, 'student_id': n + 1, 'time_taken': 60,
+                      'score': sum(a == 0 for a in answers) / questions * 100, 'answers': answers})
+    db.session.execute(insert(QuizSubmission), [{k: v for k, v in b.items() if k != 'answers'} for b in batch])
+    rows = []
+    for b in batch:
+        for qid, a in zip(question_ids, b['answers']):
+            rows.append({'submission_id': b['id'], 'question_id': qid, 'answer': str(a), 'is_correct': a == 0})
+            if len(rows) >= 100_000:
+                db.session.execute(insert(QuizAnswer), rows)
+                rows = []
+    if rows:
+        db.session.execute(insert(QuizAnswer), rows)
+    # New key: half of the questions now have option 1 as the right answer
+    db.session.execute(update(Question).where(Question.quiz_id == quiz_id, Question.id % 2 == 0).values(correct_option=1))
+    db.session.commit()
+
+
+def row_at_a_time(quiz_id):
+    # What regrading would look like with the request-path logic
+    total_questions = Question.query.filter_by(quiz_id=quiz_id).count()
+    for submission in QuizSubmission.query.filter_by(quiz_id=quiz_id).all():
+        correct_answers = 0
+        for answer in QuizAnswer.query.filter_by(submission_id=submission.id).all():
+            question = Question.query.get(answer.question_id)
+            answer.is_correct = question.type == 'mcq' and question.correct_option is not None \
+                and answer.answer.isdigit() and int(answer.answer) == question.correct_option
+            correct_answers += answer.is_correct
+        submission.score = correct_answers / total_questions * 100 if total_questions else 0
+    db.session.commit()
+
+
+def scores(quiz_id):
+    return [s for (s,) in db.session.query(QuizSubmission.score).filter_by(quiz_id=quiz_id).order_by(QuizSubmission.id)]
+
+
+def run(submissions, questions):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            seed_quiz(1, submissions, questions, rng)
+            seed_quiz(2, SAMPLE, questions, rng)
+            print(f'seeded {submissions + SAMPLE} submissions x {questions} questions in {time.perf_counter() - start:.1f}s')
+
+            # Baseline and engine must agree on the sample
+            db.session.execute(update(QuizSubmission).where(QuizSubmission.quiz_id == 2).values(score=None))
+            db.session.commit()
+            start = time.perf_counter()
+            row_at_a_time(2)
+            baseline = time.perf_counter() - start
+            expected = scores(2)
+            db.session.execute(update(QuizSubmission).where(QuizSubmission.quiz_id == 2).values(score=None))
+            db.session.commit()
+            regrade_quiz(2)
+            assert scores(2) == expected, 'engines disagree'
+
+            def progress(done, total):
+                print(f'\r  {done}/{total} answers', end='', flush=True)
+
+            summary = regrade_quiz(1, progress=progress)
+            print()
+            print(f"{'engine':<16} {'submissions':>11} {'seconds':>8} {'submissions/s':>14}")
+            print(f"{'row-at-a-time':<16} {SAMPLE:>11} {baseline:>8.2f} {SAMPLE / baseline:>14,.0f}")
+            print(f"{'numpy':<16} {submissions:>11} {summary['seconds']:>8.2f} {submissions / summary['seconds']:>14,.0f}")
+            print(summary)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000, int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,92 @@
+"""CPU per request and bytes on the wire for the large JSON responses.
+
+    python -m benchmarks.bench_responses [--scale 1.0] [--requests 200]
+
+Seeds benchmarks.seed and requests the biggest list endpoints through the
+test client in four modes:
+
+    jsonify    Flask's own JSON provider, no compression (the old path;
+               it formats datetimes as HTTP dates, about what the
+               per-row strftime calls used to cost)
+    orjson     responses.JSONProvider, identity encoding
+    gzip, br   responses.JSONProvider plus compression
+
+Reports process CPU milliseconds per request (the whole request: queries,
+row building, encoding, compression) and response bytes. orjson and
+brotli are optional; missing ones are reported and skipped.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# The app reads DATABASE_URL at import; point it at a scratch database
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'responses.sqlite3')}"
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import migrations  # noqa: E402
+import responses  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+app = create_app()
+
+
+def routes_for(ids):
+    return [
+        ('/dashboard/student', f"/dashboard/student?student_id={ids['student_id']}"),
+        ('/quizzes', '/quizzes'),
+        ('/leaderboard/<id>', f"/leaderboard/{ids['quiz_id']}"),
+        ('/quiz/<id>/submissions', f"/quiz/{ids['quiz_id']}/submissions"),
+    ]
+
+
+def modes():
+    # (name, JSON provider, Accept-Encoding)
+    yield 'jsonify', DefaultJSONProvider(app), 'identity'
+    if responses.orjson is None:
+        print('orjson is not installed; the responses.JSONProvider rows use the stdlib encoder')
+    yield 'orjson', responses.JSONProvider(app), 'identity'
+    yield 'gzip', responses.JSONProvider(app), 'gzip'
+    if responses.brotli is None:
+        print('brotli is not installed; skipping br')
+    else:
+        yield 'br', responses.JSONProvider(app), 'br'
+
+
+def measure(client, url, encoding, requests):
+    headers = {'Accept-Encoding': encoding}
+    client.get(url, headers=headers)
+    start = time.process_time()
+    for _ in range(requests):
+        res = client.get(url, headers=headers)
+    cpu_ms = (time.process_time() - start) / requests * 1000
+    assert res.status_code == 200, (url, res.status_code)
+    return cpu_ms, len(res.data)
+
+
+def run(scale, requests):
+    client = app.test_client()
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        ids = seed(scale=scale)
+
+        print(f'{requests} requests per row, scale {scale}')
+        print(f"{'route':<24} {'mode':<8} {'CPU ms':>7} {'bytes':>9}")
+        for label, url in routes_for(ids):
+            for name, provider, encoding in modes():
+                app.json = provider
+                cpu_ms, size = measure(client, url, encoding, requests)
+                print(f'{label:<24} {name:<8} {cpu_ms:>7.2f} {size:>9}')
+        app.json = responses.JSONProvider(app)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    run(args.scale, args.requests)
@@ -0,0 +1,82 @@
+"""Cold start of a web process: import, create_app() and the first request.
+
+    python -m benchmarks.bench_startup [--runs 5] [--url /quizzes] [--imports 15]
+
+Each run is a fresh interpreter (as a gunicorn worker boot is) against a
+scratch SQLite database migrated beforehand. Reports the median over
+--runs of the time to import app, to call create_app(), to answer the
+first request through the test client, and the whole process from launch
+to exit. --imports then lists the slowest packages imported by app and
+create_app(), from python -X importtime (cumulative milliseconds).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+res = flask_app.test_client().get(sys.argv[1])
+answered = time.perf_counter()
+assert res.status_code == 200, res.status_code
+print(json.dumps({'import': imported - start, 'create_app': created - imported, 'first_request': answered - created}))
+"""
+
+
+def run_child(env, url):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD, url], env=env, cwd=BACKEND,
+                         capture_output=True, text=True, check=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - start
+    return result
+
+
+def slowest_imports(env, count):
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'], env=env, cwd=BACKEND,
+                         capture_output=True, text=True, check=True).stderr
+    packages = {}
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        top = name.strip().split('.')[0]
+        packages[top] = max(packages.get(top, 0), int(cumulative) / 1000)
+    return sorted(packages.items(), key=lambda item: -item[1])[:count]
+
+
+def run(runs, url, imports):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.sqlite3')}")
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db-upgrade'], env=env, cwd=BACKEND,
+                       capture_output=True, check=True)
+
+        results = [run_child(env, url) for _ in range(runs)]
+        print(f'median of {runs} runs, first request GET {url}')
+        for phase in ('import', 'create_app', 'first_request', 'process'):
+            print(f'{phase:<14} {statistics.median(r[phase] for r in results) * 1000:>8.1f} ms')
+
+        if imports:
+            print('\nslowest imports (cumulative ms)')
+            for name, ms in slowest_imports(env, imports):
+                print(f'{name:<24} {ms:>8.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--url', default='/quizzes')
+    parser.add_argument('--imports', type=int, default=15, help='how many of the slowest imports to list')
+    args = parser.parse_args()
+    run(args.runs, args.url, args.imports)
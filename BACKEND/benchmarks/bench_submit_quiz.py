@@ -0,0 +1,76 @@
+"""Statements and latency per /submit-quiz call by quiz length.
+
+    python -m benchmarks.bench_submit_quiz [question counts...]
+
+The number of SQL statements per submission must not depend on the number
+of questions; the script exits non-zero if it does.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from models import db, User, Quiz, Question
+from routes.quiz import quiz_bp
+from leaderboard import leaderboard_bp
+
+DEFAULT_COUNTS = [5, 20, 100]
+STUDENTS = 50
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(quiz_bp)
+    app.register_blueprint(leaderboard_bp)
+    return app
+
+
+def run(counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.sqlite3'))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(User), [
+                {'id': i, 'name': f'Student {i}', 'email': f's{i}@gmail.com', 'password': 'x', 'role': 'student'}
+                for i in range(1, STUDENTS + 1)
+            ])
+            db.session.commit()
+
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+            print(f"{'questions':>9} {'statements/submit':>18} {'ms/submit':>10}")
+            per_submit = set()
+            for quiz_id, count in enumerate(counts, start=1):
+                db.session.execute(insert(Quiz), [{'id': quiz_id, 'title': f'Quiz {quiz_id}', 'teacher_id': 1}])
+                db.session.execute(insert(Question), [
+                    {'id': quiz_id * 1000 + n, 'quiz_id': quiz_id, 'text': 'q', 'type': 'mcq', 'options': ['a', 'b'], 'correct_option': n % 2}
+                    for n in range(count)
+                ])
+                db.session.commit()
+                answers = [{'question_id': quiz_id * 1000 + n, 'answer': 1} for n in range(count)]
+
+                # First submission warms the answer key cache
+                client.post(f'/submit-quiz/{quiz_id}', json={'student_id': 1, 'answers': answers, 'time_taken': 10})
+                statements.clear()
+                start = time.perf_counter()
+                for student_id in range(2, STUDENTS + 1):
+                    res = client.post(f'/submit-quiz/{quiz_id}', json={'student_id': student_id, 'answers': answers, 'time_taken': 10})
+                    assert res.status_code == 200, res.get_json()
+                elapsed = time.perf_counter() - start
+                average = len(statements) / (STUDENTS - 1)
+                per_submit.add(average)
+                print(f'{count:>9} {average:>18.1f} {elapsed / (STUDENTS - 1) * 1000:>10.2f}')
+
+            if len(per_submit) != 1:
+                sys.exit('statement count grows with the number of questions')
+
+
+if __name__ == '__main__':
+    run([int(n) for n in sys.argv[1:]] or DEFAULT_COUNTS)
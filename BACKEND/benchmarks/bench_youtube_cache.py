@@ -0,0 +1,116 @@
+"""YouTube response cache against the local fake API.
+
+    python -m benchmarks.bench_youtube_cache [views]
+
+Serves /fetch-playlist and /fetch-video-details repeatedly and reports
+upstream requests and latency for: a cold cache, a warm cache, a second
+process-like cache instance reading the shared SQLite tier, expired
+entries revalidated with If-None-Match, entries whose TTL ran out in real
+time, and a memory tier too small for every entry (LRU eviction).
+
+Each phase also checks the upstream request and 304 counts of the fake and
+the hit/miss counters of the cache against what that phase must produce,
+and the run exits with status 1 if any of them differ.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from benchmarks.fake_youtube import FakeYouTube
+
+# The playlist has 100 videos, so /fetch-playlist reads two pages of 50;
+# /fetch-video-details reads one videos batch
+PLAYLIST_SIZE = 100
+PLAYLIST_URL = '/fetch-playlist?url=https://youtube.com/playlist?list=PLbench'
+VIDEO_URL = '/fetch-video-details?videoId=vid1'
+KEYS = {PLAYLIST_URL: 2, VIDEO_URL: 1}
+COUNTERS = ('hits', 'disk_hits', 'misses', 'revalidated', 'stale')
+
+
+def timed_views(client, url, views):
+    start = time.perf_counter()
+    for _ in range(views):
+        res = client.get(url)
+        assert res.status_code == 200, res.get_json()
+    return (time.perf_counter() - start) / views * 1000
+
+
+def run(views):
+    fake = FakeYouTube(playlist_size=PLAYLIST_SIZE, delay=0.02).start()
+    os.environ['YOUTUBE_API_URL'] = fake.url
+    tmp = tempfile.mkdtemp()
+    os.environ['YOUTUBE_CACHE_PATH'] = os.path.join(tmp, 'youtube-cache.sqlite3')
+
+    import youtube_client
+    from youtube_cache import YouTubeCache
+    from routes import youtube
+
+    app = Flask(__name__)
+    app.register_blueprint(youtube.youtube_bp)
+    client = app.test_client()
+    failures = []
+
+    def phase(name, urls, upstream, not_modified, **counters):
+        # counters: expected change of each cache counter, 0 when not given
+        cache = youtube_client.get_client().cache
+        before = cache.stats()
+        fake.reset_counters()
+        ms = sum(timed_views(client, url, views) for url in urls)
+        after = cache.stats()
+        print(f'{name:<22} {ms:>10.2f} {fake.total_requests():>9} {fake.not_modified:>6}')
+
+        expected = dict({counter: 0 for counter in COUNTERS}, upstream=upstream, not_modified=not_modified, **counters)
+        actual = {counter: after[counter] - before[counter] for counter in COUNTERS}
+        actual.update(upstream=fake.total_requests(), not_modified=fake.not_modified)
+        for counter, value in expected.items():
+            if actual[counter] != value:
+                failures.append(f'{name}: {counter} {actual[counter]}, expected {value}')
+
+    urls = [PLAYLIST_URL, VIDEO_URL]
+    keys = sum(KEYS.values())
+    print(f"{'phase':<22} {'ms/view':>10} {'upstream':>9} {'304s':>6}")
+    phase('cold then warm', urls, keys, 0, misses=keys, hits=keys * (views - 1))
+    phase('warm', urls, 0, 0, hits=keys * views)
+
+    # A fresh in-memory tier, as in another gunicorn worker, sharing the file
+    youtube_client._client = youtube_client.YouTubeClient.from_env()
+    phase('other worker (disk)', urls, 0, 0, disk_hits=keys, hits=keys * (views - 1))
+
+    # Let every entry run past its TTL; the API should only be asked
+    # whether anything changed
+    cache = youtube_client.get_client().cache
+    cache.memory.clear()
+    cache._disk().execute('UPDATE youtube_cache SET expires_at = 0')
+    phase('expired (revalidate)', urls, keys, keys, revalidated=keys, hits=keys * (views - 1))
+
+    # The same, with a one second TTL actually running out
+    api_key = os.getenv('YOUTUBE_API_KEY')
+    youtube_client._client = youtube_client.YouTubeClient(api_key, fake.url, cache=YouTubeCache(ttl=1))
+    for url in urls:
+        client.get(url)
+    time.sleep(1.1)
+    phase('ttl ran out', urls, keys, keys, revalidated=keys, hits=keys * (views - 1))
+
+    # Room for two entries: the video batch evicts the first playlist page,
+    # then reading the playlist again evicts the second page and the batch.
+    # Evicted entries are gone, so they are fetched in full, not revalidated.
+    youtube_client._client = youtube_client.YouTubeClient(api_key, fake.url, cache=YouTubeCache(maxsize=2))
+    phase('lru: playlist, video', urls, keys, 0, misses=keys, hits=keys * (views - 1))
+    pages = KEYS[PLAYLIST_URL]
+    phase('lru: playlist again', [PLAYLIST_URL], pages, 0, misses=pages, hits=pages * (views - 1))
+    if youtube_client.get_client().cache.stats()['memory_size'] != 2:
+        failures.append('lru: memory tier holds more than its maxsize')
+
+    print(youtube_client.get_client().cache.stats())
+    fake.stop()
+
+    for failure in failures:
+        print(f'!! {failure}')
+    return not failures
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run(int(sys.argv[1]) if len(sys.argv) > 1 else 20) else 1)
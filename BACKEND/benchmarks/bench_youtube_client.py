@@ -0,0 +1,60 @@
+"""Round trips for a large playlist: old request pattern vs YouTubeClient.
+
+    python -m benchmarks.bench_youtube_client [playlist size] [latency ms]
+
+Against the local fake API (with simulated latency), fetches every item of
+a playlist and then the details of every video in it. The old pattern is
+what routes/youtube.py used to do: maxResults=10 pages and one videos?id=
+call per video, each through a bare requests.get. The client uses a pooled
+session, 50-item pages and 50-id batches, starting from a cold cache.
+"""
+import sys
+import time
+
+import requests
+
+from benchmarks.fake_youtube import FakeYouTube
+from youtube_cache import YouTubeCache
+from youtube_client import YouTubeClient
+
+PLAYLIST_ID = 'PLbench'
+
+
+def old_pattern(api_url):
+    videos = []
+    page_token = ''
+    while True:
+        res = requests.get(f'{api_url}/playlistItems?part=snippet&maxResults=10&playlistId={PLAYLIST_ID}&key=x&pageToken={page_token}').json()
+        for item in res.get('items', []):
+            videos.append(item['snippet']['resourceId']['videoId'])
+        page_token = res.get('nextPageToken')
+        if not page_token:
+            break
+    details = [requests.get(f'{api_url}/videos?part=snippet&id={v}&key=x').json()['items'][0] for v in videos]
+    return len(details)
+
+
+def client_pattern(api_url):
+    client = YouTubeClient('x', api_url, cache=YouTubeCache())
+    videos = client.playlist_videos(PLAYLIST_ID)
+    details = client.videos([v['videoId'] for v in videos])
+    return len(details)
+
+
+def run(size, latency_ms):
+    fake = FakeYouTube(playlist_size=size, delay=latency_ms / 1000).start()
+    print(f'{size} videos, {latency_ms} ms simulated API latency')
+    print(f"{'pattern':<10} {'seconds':>8} {'requests':>9} {'playlist':>9} {'videos':>7} {'connections':>12}")
+    for name, fn in [('old', old_pattern), ('client', client_pattern)]:
+        fake.reset_counters()
+        start = time.perf_counter()
+        count = fn(fake.url)
+        elapsed = time.perf_counter() - start
+        assert count == size, (name, count)
+        print(f"{name:<10} {elapsed:>8.2f} {fake.total_requests():>9} {fake.requests['playlistItems']:>9} "
+              f"{fake.requests['videos']:>7} {fake.connections:>12}")
+    fake.stop()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500, float(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,155 @@
+"""Query plans of every endpoint on a seeded SQLite database.
+
+    python -m benchmarks.explain_plans [--scale 1.0] [-v]
+
+Builds the schema through the migrations, seeds benchmarks.seed, calls each
+endpoint with the test client and runs EXPLAIN QUERY PLAN on every
+statement it issued. A full table scan ("SCAN <table>" without an index)
+on a table not listed in EXPECTED_SCANS for that endpoint is reported and
+makes the script exit with status 1, so a dropped or unusable index shows
+up here before it shows up in production. -v prints every plan.
+
+Plans follow the ANALYZE statistics of the seeded data; at a small --scale
+SQLite may rightly prefer scanning a table of a few dozen rows.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# The app reads DATABASE_URL at import; point it at a scratch database
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'plans.sqlite3')}"
+
+from sqlalchemy import event, select  # noqa: E402
+
+import migrations  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, QuizSubmission, Quiz  # noqa: E402
+from benchmarks.seed import seed, PASSWORD  # noqa: E402
+
+app = create_app()
+
+# endpoint -> tables it is expected to read in full, and why
+EXPECTED_SCANS = {
+    '/dashboard/student': {'course'},       # lists every course
+    '/catalog': {'course'},                 # walks course ids newest first, stops at the page size
+    '/quizzes': {'quiz'},                   # unfiltered listing, stops at the page size
+}
+
+# Bookkeeping tables with a handful of rows
+SMALL_TABLES = {'schema_migrations', 'entity_version', 'notification_event'}
+
+
+def requests_for(ids, unsubmitted_quiz):
+    student, teacher = ids['student_id'], ids['teacher_id']
+    course, quiz = ids['course_id'], ids['quiz_id']
+    return [
+        ('/login', 'POST', f'/login', {'email': f'student{student}@gmail.com', 'password': PASSWORD}),
+        ('/dashboard/student', 'GET', f'/dashboard/student?student_id={student}', None),
+        ('/catalog', 'GET', f'/catalog?student_id={student}', None),
+        ('/catalog?enrolled=1', 'GET', f'/catalog?student_id={student}&enrolled=1', None),
+        ('/dashboard/teacher', 'GET', f'/dashboard/teacher?id={teacher}', None),
+        ('/course/<id>', 'GET', f'/course/{course}?student_id={student}', None),
+        ('/unenroll/<id>', 'POST', f'/unenroll/{course}', {'student_id': student}),
+        ('/enroll/<id>', 'POST', f'/enroll/{course}', {'student_id': student}),
+        ('/notifications/<user>', 'GET', f'/notifications/{student}', None),
+        ('/notifications/<user>/unread-count', 'GET', f'/notifications/{student}/unread-count', None),
+        ('/notifications/mark-read/<user>', 'POST', f'/notifications/mark-read/{student}', None),
+        ('/quiz/student', 'GET', f'/quiz/student?student_id={student}', None),
+        ('/quiz/<id>', 'GET', f'/quiz/{quiz}', None),
+        ('/quiz/teacher/<id>', 'GET', f'/quiz/teacher/{teacher}', None),
+        ('/quizzes', 'GET', '/quizzes?limit=50', None),
+        ('/quizzes?course_id=', 'GET', f'/quizzes?course_id={course}', None),
+        ('/quizzes?teacher_id=', 'GET', f'/quizzes?teacher_id={teacher}', None),
+        ('/submit-quiz/<id>', 'POST', f'/submit-quiz/{unsubmitted_quiz}',
+         {'student_id': student, 'time_taken': 300, 'answers': [{'question_id': 1, 'answer': 0}]}),
+        ('/quiz/<id>/submissions', 'GET', f'/quiz/{quiz}/submissions', None),
+        ('/quiz/<id>/submission/<student>', 'GET', f'/quiz/{quiz}/submission/{student}', None),
+        ('/quiz/<id>/score/<student>', 'POST', f'/quiz/{quiz}/score/{student}', {'score': 90, 'feedback': 'Good'}),
+        ('/quiz/<id>/regrade', 'POST', f'/quiz/{quiz}/regrade', None),
+        ('/student/<id>/submissions', 'GET', f'/student/{student}/submissions', None),
+        ('/student/<id>/progress', 'GET', f'/student/{student}/progress', None),
+        ('/student/<id>/submission/<quiz>', 'GET', f'/student/{student}/submission/{quiz}', None),
+        ('/leaderboard/<id>', 'GET', f'/leaderboard/{quiz}?limit=20', None),
+        ('/leaderboard/<id>/rank/<student>', 'GET', f'/leaderboard/{quiz}/rank/{student}', None),
+        ('/leaderboard/<id>/student/<student>', 'GET', f'/leaderboard/{quiz}/student/{student}', None),
+    ]
+
+
+def capture(engine):
+    statements = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        statements.append((statement, parameters))
+
+    return statements
+
+
+def explain(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    # "SCAN quiz" and "SCAN q" (aliased) read every row; "SCAN quiz USING
+    # INDEX ..." / "USING COVERING INDEX" walk an index instead
+    tables = set()
+    for detail in plan:
+        words = detail.split()
+        if words[:1] == ['SCAN'] and 'INDEX' not in words and 'CONSTANT' not in words:
+            tables.add(words[1])
+    return tables
+
+
+def run(scale, verbose):
+    client = app.test_client()
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        ids = seed(scale=scale)
+        unsubmitted_quiz = db.session.execute(
+            select(Quiz.id).where(~Quiz.id.in_(
+                select(QuizSubmission.quiz_id).where(QuizSubmission.student_id == ids['student_id'])
+            )).limit(1)
+        ).scalar()
+        print(f"Seeded {ids['users']} users, {ids['courses']} courses, {ids['submissions']} submissions, "
+              f"{ids['answers']} answers")
+
+        statements = capture(db.engine)
+        results = []
+        for label, method, url, body in requests_for(ids, unsubmitted_quiz):
+            del statements[:]
+            res = client.open(url, method=method, json=body)
+            results.append((label, res.status_code, list(statements)))
+
+        problems = 0
+        with db.engine.connect() as connection:
+            for label, status, issued in results:
+                print(f'\n{label}  [{status}]  {len(issued)} statements')
+                allowed = EXPECTED_SCANS.get(label.split('?')[0], set()) | SMALL_TABLES
+                for statement, parameters in issued:
+                    verb = statement.lstrip().split(None, 1)[0].upper()
+                    if verb not in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+                        continue
+                    plan = explain(connection, statement, parameters)
+                    unexpected = full_scans(plan) - allowed
+                    if unexpected or verbose:
+                        print('  ' + ' '.join(statement.split())[:160])
+                        for detail in plan:
+                            print(f'      {detail}')
+                    if unexpected:
+                        problems += 1
+                        print(f"  !! full scan of {', '.join(sorted(unexpected))}")
+        print(f'\n{problems} statements with unexpected full scans')
+        return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    sys.exit(1 if run(args.scale, args.verbose) else 0)
@@ -0,0 +1,93 @@
+"""Local stand-in for the Cloudinary upload API.
+
+Accepts POST /v1_1/<cloud>/<resource type>/upload, reads and drops the
+multipart body, and answers with a secure_url like the real API. Uploads
+and bytes are counted so callers can check what the media worker pushed.
+
+    python -m benchmarks.fake_cloudinary [port] [delay seconds]
+
+or, in-process:
+
+    server = FakeCloudinary(delay=0.3).start()
+    os.environ['CLOUDINARY_UPLOAD_PREFIX'] = server.url
+"""
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCloudinary:
+    def __init__(self, delay=0.0, host='127.0.0.1', port=0):
+        self.delay = delay
+        self.uploads = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.url = f'http://{host}:{self._server.server_address[1]}'
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                parts = self.path.strip('/').split('/')
+                size = int(self.headers.get('Content-Length', 0))
+                self.rfile.read(size)
+                if len(parts) != 4 or parts[0] != 'v1_1' or parts[3] != 'upload':
+                    return self._send(404, {'error': {'message': 'Not found'}})
+                if fake.delay:
+                    time.sleep(fake.delay)
+                with fake._lock:
+                    fake.uploads += 1
+                    fake.bytes += size
+
+                cloud, resource_type = parts[1], parts[2]
+                public_id = uuid.uuid4().hex
+                url = f'{fake.url}/{cloud}/{resource_type}/upload/v1/{public_id}'
+                self._send(200, {
+                    'public_id': public_id,
+                    'version': 1,
+                    'resource_type': resource_type,
+                    'bytes': size,
+                    'url': url,
+                    'secure_url': url,
+                })
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the uploader was stopped mid-upload
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8082
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    server = FakeCloudinary(delay=delay, port=port)
+    print(f'Fake Cloudinary upload API on {server.url}')
+    server._server.serve_forever()
@@ -0,0 +1,157 @@
+"""Local stand-in for the YouTube Data API v3.
+
+Serves /playlistItems and /videos with deterministic data, real-looking
+pagination, ETags and 304 answers to If-None-Match. Every request and
+connection is counted so callers can check how many round trips they made.
+
+    python -m benchmarks.fake_youtube [port] [delay seconds]
+
+or, in-process:
+
+    server = FakeYouTube(playlist_size=500).start()
+    os.environ['YOUTUBE_API_URL'] = server.url
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MAX_RESULTS = 50
+
+
+def _video(video_id):
+    return {
+        'kind': 'youtube#video',
+        'id': video_id,
+        'snippet': {
+            'title': f'Video {video_id}',
+            'description': f'Description of {video_id} ' * 20,
+            'thumbnails': {
+                size: {'url': f'https://i.ytimg.com/vi/{video_id}/{size}.jpg', 'width': w, 'height': h}
+                for size, w, h in [('default', 120, 90), ('medium', 320, 180), ('high', 480, 360)]
+            },
+        },
+    }
+
+
+class FakeYouTube:
+    def __init__(self, playlist_size=100, delay=0.0, host='127.0.0.1', port=0):
+        self.playlist_size = playlist_size
+        self.delay = delay
+        self.requests = Counter()
+        self.connections = 0
+        self.not_modified = 0
+        self.version = 1  # bump to make every resource look changed
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.url = f'http://{host}:{self._server.server_address[1]}'
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse shows up
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                endpoint = parsed.path.rstrip('/').rsplit('/', 1)[-1]
+                fake.requests[endpoint] += 1
+                if fake.delay:
+                    time.sleep(fake.delay)
+
+                if endpoint == 'playlistItems':
+                    body = fake.playlist_page(query)
+                elif endpoint == 'videos':
+                    body = fake.videos(query)
+                else:
+                    return self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+                if self.headers.get('If-None-Match') == body['etag']:
+                    fake.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', body['etag'])
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self._send(200, body)
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if 'etag' in body:
+                    self.send_header('ETag', body['etag'])
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _etag(self, *parts):
+        return '"' + hashlib.md5(repr((self.version,) + parts).encode()).hexdigest() + '"'
+
+    def playlist_page(self, query):
+        playlist_id = query.get('playlistId', '')
+        size = min(int(query.get('maxResults', 5)), MAX_RESULTS)
+        start = int(query.get('pageToken') or 0)
+        end = min(start + size, self.playlist_size)
+        items = []
+        for position in range(start, end):
+            video = _video(f'{playlist_id}-{position}')
+            snippet = dict(video['snippet'], position=position, resourceId={'kind': 'youtube#video', 'videoId': video['id']})
+            items.append({'kind': 'youtube#playlistItem', 'id': f'item-{position}', 'snippet': snippet})
+        body = {
+            'kind': 'youtube#playlistItemListResponse',
+            'etag': self._etag('playlist', playlist_id, start, size),
+            'items': items,
+            'pageInfo': {'totalResults': self.playlist_size, 'resultsPerPage': size},
+        }
+        if end < self.playlist_size:
+            body['nextPageToken'] = str(end)
+        return body
+
+    def videos(self, query):
+        ids = [i for i in query.get('id', '').split(',') if i][:MAX_RESULTS]
+        return {
+            'kind': 'youtube#videoListResponse',
+            'etag': self._etag('videos', tuple(ids)),
+            'items': [_video(i) for i in ids],
+            'pageInfo': {'totalResults': len(ids), 'resultsPerPage': len(ids)},
+        }
+
+    def total_requests(self):
+        return sum(self.requests.values())
+
+    def reset_counters(self):
+        self.requests.clear()
+        self.connections = 0
+        self.not_modified = 0
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    server = FakeYouTube(playlist_size=500, delay=delay, port=port)
+    print(f'Fake YouTube API on {server.url}')
+    server._server.serve_forever()
@@ -0,0 +1,367 @@
+"""Exam-day load test: the app under gunicorn, with fake Cloudinary and YouTube.
+
+    python -m benchmarks.load_exam_day [--students 1000] [--window 30]
+        [--refreshes 3] [--teachers 5] [--courses-per-teacher 4]
+        [--concurrency 100] [--workers 2] [--threads 8]
+        [--worker-class gthread] [--upload-delay 0.3] [--youtube-delay 0.05]
+        [--scale 0.5] [--seed 1]
+
+Seeds a SQLite database (benchmarks.seed at --scale, plus an exam course in
+which all --students are enrolled and a 20-question exam quiz). Then it
+starts the app under gunicorn and worker.py next to it, both pointed at
+local fake Cloudinary and YouTube servers. The scenario runs in three
+steps:
+
+    open      every student opens /quiz/<id>, spread over --window seconds
+    submit    every student submits /submit-quiz/<id> once, spread over
+              the next --window seconds
+    refresh   every student refreshes /leaderboard/<id> --refreshes times
+              over another window, sending back the last ETag like a
+              browser does
+
+From the start of the submit step to the end of the refresh step,
+--teachers teachers create courses with a thumbnail (one every
+window / --courses-per-teacher seconds). Each creation fans a notification
+out to every student and gives the worker an upload to push. Each teacher
+then opens the course's videos (/youtube-videos/<id>) and their dashboard.
+
+Requests are sent by --concurrency client threads, each with its own
+keep-alive connection. The schedule is drawn from --seed, so runs are
+repeatable. For each step and endpoint the report shows:
+- requests, errors (exceptions or status >= 400) and error rate
+- throughput over the step
+- p50/p95/p99 latency in ms
+Then it shows what the fakes received and what the worker had left to do
+when the load stopped.
+"""
+import argparse
+import io
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAM_QUESTIONS = 20
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def prepare_database(path, scale, students):
+    # Runs in a child process so this one never imports the app
+    code = f"""
+import os
+os.environ['DATABASE_URL'] = {f'sqlite:///{path}'!r}
+from sqlalchemy import insert, select, func, text
+import migrations
+from app import create_app
+from models import db, User, Course, Enrollment, Quiz, Question
+from benchmarks.seed import seed
+
+with create_app(routes=False).app_context():
+    migrations.upgrade(db.engine, log=lambda message: None)
+    seed(scale={scale!r})
+    student_ids = db.session.execute(
+        select(User.id).where(User.role == 'student').order_by(User.id).limit({students})
+    ).scalars().all()
+    course_id = db.session.execute(select(func.max(Course.id))).scalar() + 1
+    quiz_id = db.session.execute(select(func.max(Quiz.id))).scalar() + 1
+    question_id = db.session.execute(select(func.max(Question.id))).scalar() + 1
+    db.session.execute(insert(Course).values(
+        id=course_id, title='Final exam', description='Exam day', teacher_id=1, students=len(student_ids),
+        youtube_link='https://youtube.com/playlist?list=PLexam'))
+    db.session.execute(insert(Enrollment), [{{'student_id': s, 'course_id': course_id}} for s in student_ids])
+    db.session.execute(insert(Quiz).values(id=quiz_id, title='Final exam', instructions='Good luck',
+                                           teacher_id=1, course_id=course_id))
+    db.session.execute(insert(Question), [
+        {{'id': question_id + n, 'quiz_id': quiz_id, 'text': f'Question {{n + 1}}', 'type': 'mcq',
+          'options': ['A', 'B', 'C', 'D'], 'correct_option': n % 4}}
+        for n in range({EXAM_QUESTIONS})
+    ])
+    db.session.commit()
+    if len(student_ids) < {students}:
+        raise SystemExit(f'Only {{len(student_ids)}} students at this scale; raise --scale')
+    print(quiz_id, question_id, ' '.join(map(str, student_ids)))
+"""
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND, check=True, capture_output=True, text=True)
+    # The app prints while importing; the ids are on the last line
+    line = out.stdout.strip().splitlines()[-1].split()
+    return int(line[0]), int(line[1]), [int(s) for s in line[2:]]
+
+
+def use_wal(path):
+    # WAL lets readers carry on while a writer commits; the setting is
+    # stored in the database file
+    import sqlite3
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # (step, endpoint) -> [(start, seconds, status)]
+        self._lock = threading.Lock()
+
+    def add(self, step, endpoint, start, seconds, status):
+        with self._lock:
+            self.samples[(step, endpoint)].append((start, seconds, status))
+
+    def report(self):
+        print(f"\n{'step':<9} {'endpoint':<24} {'requests':>8} {'errors':>7} {'err %':>6} "
+              f"{'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for (step, endpoint), samples in self.samples.items():
+            latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+            errors = sum(1 for _, _, status in samples if status is None or status >= 400)
+            began = min(start for start, _, _ in samples)
+            ended = max(start + seconds for start, seconds, _ in samples)
+            rate = len(samples) / (ended - began) if ended > began else 0
+            print(f'{step:<9} {endpoint:<24} {len(samples):>8} {errors:>7} {errors / len(samples) * 100:>6.1f} '
+                  f'{rate:>7.1f} {pct(latencies, 50):>8.1f} {pct(latencies, 95):>8.1f} {pct(latencies, 99):>8.1f}')
+        statuses = defaultdict(int)
+        for samples in self.samples.values():
+            for _, _, status in samples:
+                statuses[status] += 1
+        print(f"304 Not Modified answers: {statuses[304]}")
+        failed = {status: n for status, n in statuses.items() if status is None or status >= 400}
+        if failed:
+            print('errors by status: ' + ', '.join(
+                f"{'no response' if status is None else status}: {n}" for status, n in failed.items()))
+
+
+def pct(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)]
+
+
+class Client:
+    # One keep-alive session per thread
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self._local = threading.local()
+
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            session = requests.Session()
+            # Like a browser, repeat a GET once when the server had already
+            # closed the idle keep-alive connection
+            session.mount('http://', HTTPAdapter(max_retries=Retry(total=1, status=0, allowed_methods=['GET'])))
+            self._local.session = session
+        return self._local.session
+
+    def call(self, step, endpoint, method, path, **kwargs):
+        start = time.monotonic()
+        try:
+            res = self.session().request(method, self.base_url + path, timeout=60, **kwargs)
+            status = res.status_code
+        except requests.RequestException:
+            res, status = None, None
+        self.recorder.add(step, endpoint, start, time.monotonic() - start, status)
+        return res
+
+
+def at(when, fn, *args):
+    # (when, task): task runs fn at monotonic time when
+    def task():
+        delay = when - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        fn(*args)
+    return when, task
+
+
+def thumbnail_bytes():
+    buffer = io.BytesIO()
+    Image.effect_noise((800, 450), 40).convert('RGB').save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def run_scenario(client, pool, args, quiz_id, first_question, students):
+    rng = random.Random(args.seed)
+    window = args.window
+    questions = list(range(first_question, first_question + EXAM_QUESTIONS))
+    etags = {}
+
+    def open_quiz(student):
+        client.call('open', '/quiz/<id>', 'GET', f'/quiz/{quiz_id}')
+
+    def submit(student, answers, time_taken):
+        client.call('submit', '/submit-quiz/<id>', 'POST', f'/submit-quiz/{quiz_id}', json={
+            'student_id': student, 'time_taken': time_taken,
+            'answers': [{'question_id': q, 'answer': a} for q, a in zip(questions, answers)]
+        })
+
+    def refresh(student):
+        headers = {'If-None-Match': etags[student]} if student in etags else {}
+        res = client.call('refresh', '/leaderboard/<id>', 'GET', f'/leaderboard/{quiz_id}?limit=20', headers=headers)
+        if res is not None and res.headers.get('ETag'):
+            etags[student] = res.headers['ETag']
+
+    thumbnail = thumbnail_bytes()
+
+    def teacher_round(teacher, n):
+        res = client.call('teachers', '/create-course', 'POST', '/create-course', data={
+            'title': f'Course by {teacher} #{n}', 'description': 'Created during the exam', 'teacher_id': str(teacher),
+            'youtube_link': f'https://youtube.com/playlist?list=PLteacher{teacher}x{n}'
+        }, files={'thumbnail': ('thumbnail.jpg', thumbnail, 'image/jpeg')})
+        if res is not None and res.status_code == 200:
+            client.call('teachers', '/youtube-videos/<id>', 'GET', f"/youtube-videos/{res.json()['id']}")
+        client.call('teachers', '/dashboard/teacher', 'GET', f'/dashboard/teacher?id={teacher}')
+
+    def run_step(tasks):
+        # In start order, so no client thread sleeps on a late task while
+        # an earlier one waits for a thread
+        tasks = sorted(tasks, key=lambda item: item[0])
+        for future in [pool.submit(task) for _, task in tasks]:
+            future.result()
+
+    start = time.monotonic()
+    print(f'open: {len(students)} students over {window} s')
+    run_step([at(start + rng.uniform(0, window), open_quiz, s) for s in students])
+
+    start = time.monotonic()
+    teacher_tasks = [
+        at(start + (n + rng.random()) * window * 2 / args.courses_per_teacher, teacher_round, teacher, n)
+        for teacher in range(1, args.teachers + 1) for n in range(args.courses_per_teacher)
+    ]
+    teacher_thread = threading.Thread(target=run_step, args=(teacher_tasks,))
+    teacher_thread.start()
+
+    print(f'submit: {len(students)} submissions over {window} s, '
+          f'{len(teacher_tasks)} courses created by {args.teachers} teachers meanwhile')
+    run_step([
+        at(start + rng.uniform(0, window), submit, s,
+           [rng.randrange(4) for _ in questions], rng.randint(300, 1800))
+        for s in students
+    ])
+
+    start = time.monotonic()
+    print(f'refresh: {len(students) * args.refreshes} leaderboard refreshes over {window} s')
+    run_step([at(start + rng.uniform(0, window), refresh, s) for s in students for _ in range(args.refreshes)])
+    teacher_thread.join()
+
+
+def backlog(db_path):
+    import sqlite3
+    connection = sqlite3.connect(db_path)
+    try:
+        events = connection.execute("SELECT count(*) FROM notification_event WHERE status != 'done'").fetchone()[0]
+        uploads = connection.execute("SELECT count(*) FROM media_upload WHERE status != 'done'").fetchone()[0]
+        notifications = connection.execute('SELECT count(*) FROM notification').fetchone()[0]
+    finally:
+        connection.close()
+    return events, uploads, notifications
+
+
+def wait_until_up(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            requests.get(base_url + '/quizzes?limit=1', timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not come up')
+
+
+def main(args):
+    from benchmarks.fake_cloudinary import FakeCloudinary
+    from benchmarks.fake_youtube import FakeYouTube
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'exam.sqlite3')
+        print('Seeding...')
+        quiz_id, first_question, students = prepare_database(db_path, args.scale, args.students)
+        if args.journal_mode == 'wal':
+            use_wal(db_path)
+
+        cloudinary = FakeCloudinary(delay=args.upload_delay).start()
+        youtube = FakeYouTube(playlist_size=50, delay=args.youtube_delay).start()
+        port = free_port()
+        env = dict(
+            os.environ,
+            DATABASE_URL=f'sqlite:///{db_path}',
+            MEDIA_BACKEND='cloudinary',
+            MEDIA_STAGING_DIR=os.path.join(tmp, 'staging'),
+            CLOUDINARY_UPLOAD_PREFIX=cloudinary.url,
+            cloud_name='exam', api_key='key', api_secret='secret',
+            YOUTUBE_API_URL=youtube.url, YOUTUBE_API_KEY='key',
+            WORKER_POLL_INTERVAL='0.5',
+            PYTHONUNBUFFERED='1',
+        )
+        log = open(os.path.join(tmp, 'server.log'), 'w')
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', 'app:create_app()', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(args.workers), '--threads', str(args.threads), '--worker-class', args.worker_class,
+            '--timeout', '120'
+        ], cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+        worker = subprocess.Popen([sys.executable, 'worker.py'], cwd=BACKEND, env=env,
+                                  stdout=log, stderr=subprocess.STDOUT)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            wait_until_up(base_url, server)
+            print(f'gunicorn: {args.workers} x {args.worker_class} workers, {args.threads} threads; '
+                  f'{args.concurrency} client threads')
+            recorder = Recorder()
+            client = Client(base_url, recorder)
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                run_scenario(client, pool, args, quiz_id, first_question, students)
+            recorder.report()
+
+            events, uploads, notifications = backlog(db_path)
+            print(f'fake Cloudinary: {cloudinary.uploads} uploads, {cloudinary.bytes / 2 ** 20:.1f} MiB; '
+                  f'fake YouTube: {youtube.total_requests()} requests, {youtube.not_modified} answered 304')
+            print(f'worker backlog when the load stopped: {events} notification events, {uploads} uploads; '
+                  f'{notifications} notification rows')
+        finally:
+            for process in (worker, server):
+                process.send_signal(signal.SIGTERM)
+            for process in (worker, server):
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            log.close()
+            cloudinary.stop()
+            youtube.stop()
+            if args.log:
+                with open(os.path.join(tmp, 'server.log')) as f:
+                    print(f.read())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--window', type=float, default=30, help='seconds each step is spread over')
+    parser.add_argument('--refreshes', type=int, default=3, help='leaderboard refreshes per student')
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--courses-per-teacher', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=100, help='client threads')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gunicorn worker')
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--upload-delay', type=float, default=0.3, help='seconds per fake Cloudinary upload')
+    parser.add_argument('--youtube-delay', type=float, default=0.05, help='seconds per fake YouTube request')
+    parser.add_argument('--scale', type=float, default=0.5, help='size of the background dataset')
+    parser.add_argument('--journal-mode', choices=['wal', 'delete'], default='wal')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--log', action='store_true', help='print the gunicorn and worker output at the end')
+    main(parser.parse_args())
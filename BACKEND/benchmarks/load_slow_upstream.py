@@ -0,0 +1,121 @@
+"""Slow YouTube API under gunicorn: sync, gthread and gevent workers side by side.
+
+    python -m benchmarks.load_slow_upstream [--modes sync,gthread,gevent]
+        [--workers 2] [--threads 4] [--slow 40] [--fast 100]
+        [--youtube-delay 1.0] [--window 5]
+
+For each mode, starts the app under gunicorn with --workers workers
+(gthread: --threads threads each) against a fake YouTube API that takes
+--youtube-delay seconds per request. Over --window seconds it sends --slow
+/fetch-video-details requests, each for a video id no worker has cached,
+all at once at the start, and --fast /quizzes requests spread evenly, so
+the database route runs while the YouTube calls are still waiting.
+
+A sync worker is held for the whole upstream call, so the slow requests
+queue behind each other and the fast ones queue behind them. Threads help
+up to --threads per worker. Under gevent the waiting requests give the
+worker up and the fast route keeps its usual latency. The report shows,
+per mode and route, requests, errors, p50/p95/max latency in ms, and the
+time until the last slow request finished.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.load_exam_day import prepare_database, use_wal, free_port, wait_until_up, pct, BACKEND
+
+
+def run_mode(mode, args, db_path, youtube_url, tmp):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f'sqlite:///{db_path}',
+        YOUTUBE_API_URL=youtube_url, YOUTUBE_API_KEY='key',
+        YOUTUBE_CACHE_PATH='',
+        GUNICORN_WORKER_CLASS=mode,
+        WEB_CONCURRENCY=str(args.workers),
+        GUNICORN_THREADS=str(args.threads if mode == 'gthread' else 1),
+        GUNICORN_TIMEOUT='120',
+    )
+    log = open(os.path.join(tmp, f'{mode}.log'), 'w')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:create_app()', '--bind', f'127.0.0.1:{port}'],
+                              cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    samples = {'slow': [], 'fast': []}
+    lock = threading.Lock()
+
+    def call(kind, path, when):
+        delay = when - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        start = time.monotonic()
+        try:
+            status = requests.get(base_url + path, timeout=120).status_code
+        except requests.RequestException:
+            status = None
+        with lock:
+            samples[kind].append((time.monotonic() - start, status, time.monotonic()))
+
+    try:
+        wait_until_up(base_url, server)
+        start = time.monotonic() + 0.5
+        tasks = [('slow', f'/fetch-video-details?videoId={mode}-{n}', start) for n in range(args.slow)]
+        tasks += [('fast', '/quizzes?limit=20', start + 0.1 + n * args.window / args.fast) for n in range(args.fast)]
+        with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            for task in tasks:
+                pool.submit(call, *task)
+        slow_done = max(end for _, _, end in samples['slow']) - start
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        log.close()
+
+    for kind, route in (('slow', '/fetch-video-details'), ('fast', '/quizzes')):
+        latencies = sorted(seconds * 1000 for seconds, _, _ in samples[kind])
+        errors = sum(1 for _, status, _ in samples[kind] if status is None or status >= 400)
+        print(f'{mode:<8} {route:<22} {len(latencies):>8} {errors:>7} {pct(latencies, 50):>9.1f} '
+              f'{pct(latencies, 95):>9.1f} {latencies[-1]:>9.1f}'
+              f"{f'   last slow done at {slow_done:.1f} s' if kind == 'slow' else ''}")
+
+
+def main(args):
+    from benchmarks.fake_youtube import FakeYouTube
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'upstream.sqlite3')
+        print('Seeding...')
+        prepare_database(db_path, args.scale, 1)
+        use_wal(db_path)
+        youtube = FakeYouTube(delay=args.youtube_delay).start()
+        try:
+            print(f'{args.workers} workers (gthread: {args.threads} threads each); {args.slow} YouTube requests '
+                  f'taking {args.youtube_delay} s upstream, {args.fast} /quizzes requests over {args.window} s')
+            print(f"\n{'mode':<8} {'route':<22} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+            for mode in args.modes.split(','):
+                run_mode(mode, args, db_path, youtube.url, tmp)
+        finally:
+            youtube.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='threads per gthread worker')
+    parser.add_argument('--slow', type=int, default=40, help='concurrent /fetch-video-details requests')
+    parser.add_argument('--fast', type=int, default=100, help='/quizzes requests during the window')
+    parser.add_argument('--youtube-delay', type=float, default=1.0, help='seconds per fake YouTube request')
+    parser.add_argument('--window', type=float, default=5, help='seconds the fast requests are spread over')
+    parser.add_argument('--scale', type=float, default=0.1, help='size of the seeded dataset')
+    main(parser.parse_args())
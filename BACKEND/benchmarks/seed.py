@@ -0,0 +1,139 @@
+"""Deterministic sample dataset for benchmarks and query-plan checks.
+
+    from benchmarks.seed import seed
+    ids = seed(scale=1.0)     # inside an app context, on an empty schema
+
+Rows are written with Core executemany inserts and explicit ids, so the
+same scale always produces the same database. At scale 1.0: 20 teachers,
+2,000 students, 100 courses, 10,000 enrollments, 400 quizzes of 10
+questions, ~25,000 submissions with their answers and 20 notifications per
+user. Returns ids that are handy for requests (a teacher, an enrolled
+student with submissions, one of their courses and quizzes).
+"""
+import hashlib
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from models import (db, User, Course, Enrollment, Notification, Quiz, Question,
+                    QuizSubmission, QuizAnswer)
+from leaderboard import rebuild_leaderboard
+from counters import reconcile_student_counts
+
+PASSWORD = 'password'
+DESCRIPTION = 'Learn the fundamentals step by step with hands-on projects. ' * 6
+BATCH = 10_000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[start:start + BATCH])
+
+
+def seed(scale=1.0, teachers=20, courses_per_teacher=5, enrollments_per_student=5,
+         quizzes_per_course=4, questions_per_quiz=10, submission_rate=0.5,
+         notifications_per_user=20, analyze=True):
+    rng = random.Random(42)
+    students = max(int(2000 * scale), 10)
+    teachers = max(int(teachers * scale), 1)
+    now = datetime(2025, 1, 1)
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()  # pre-bcrypt hashes, upgraded on first login
+    unread = notifications_per_user - notifications_per_user // 2
+
+    user_rows = [
+        {'id': i, 'name': f'Teacher {i}', 'email': f'teacher{i}@gmail.com', 'password': password, 'role': 'teacher',
+         'unread_notifications': unread}
+        for i in range(1, teachers + 1)
+    ]
+    student_ids = list(range(teachers + 1, teachers + students + 1))
+    user_rows += [
+        {'id': i, 'name': f'Student {i}', 'email': f'student{i}@gmail.com', 'password': password, 'role': 'student',
+         'unread_notifications': unread}
+        for i in student_ids
+    ]
+    _insert(User, user_rows)
+
+    course_rows = []
+    for teacher_id in range(1, teachers + 1):
+        for _ in range(courses_per_teacher):
+            course_id = len(course_rows) + 1
+            course_rows.append({
+                'id': course_id, 'title': f'Course {course_id}', 'level': 'beginner', 'description': DESCRIPTION,
+                'thumbnail': f'https://res.cloudinary.com/demo/image/upload/course{course_id}.jpg',
+                'youtube_link': 'https://youtube.com/playlist?list=PL', 'teacher_id': teacher_id, 'students': 0
+            })
+    _insert(Course, course_rows)
+    course_ids = [c['id'] for c in course_rows]
+
+    quiz_rows, question_rows = [], []
+    quizzes_by_course = {}
+    for course in course_rows:
+        for _ in range(quizzes_per_course):
+            quiz_id = len(quiz_rows) + 1
+            quiz_rows.append({'id': quiz_id, 'title': f'Quiz {quiz_id}', 'instructions': 'Answer every question.',
+                              'teacher_id': course['teacher_id'], 'course_id': course['id'],
+                              'created_at': now + timedelta(minutes=quiz_id)})
+            quizzes_by_course.setdefault(course['id'], []).append(quiz_id)
+            for n in range(questions_per_quiz):
+                question_rows.append({'id': len(question_rows) + 1, 'quiz_id': quiz_id, 'text': f'Question {n + 1}',
+                                      'type': 'mcq', 'options': ['A', 'B', 'C', 'D'], 'correct_option': n % 4})
+    _insert(Quiz, quiz_rows)
+    _insert(Question, question_rows)
+    questions_by_quiz = {}
+    for question in question_rows:
+        questions_by_quiz.setdefault(question['quiz_id'], []).append(question)
+
+    enrollment_rows, submission_rows, answer_rows = [], [], []
+    for student_id in student_ids:
+        for course_id in rng.sample(course_ids, min(enrollments_per_student, len(course_ids))):
+            enrollment_rows.append({'id': len(enrollment_rows) + 1, 'student_id': student_id, 'course_id': course_id,
+                                    'timestamp': now})
+            for quiz_id in quizzes_by_course[course_id]:
+                if rng.random() >= submission_rate:
+                    continue
+                submission_id = len(submission_rows) + 1
+                correct = 0
+                for question in questions_by_quiz[quiz_id]:
+                    answer = rng.randrange(4)
+                    is_correct = answer == question['correct_option']
+                    correct += is_correct
+                    answer_rows.append({'id': len(answer_rows) + 1, 'submission_id': submission_id,
+                                        'question_id': question['id'], 'answer': str(answer), 'is_correct': is_correct})
+                submission_rows.append({'id': submission_id, 'quiz_id': quiz_id, 'student_id': student_id,
+                                        'time_taken': rng.randint(60, 1800),
+                                        'score': correct / questions_per_quiz * 100,
+                                        'submitted_at': now + timedelta(seconds=submission_id)})
+    _insert(Enrollment, enrollment_rows)
+    _insert(QuizSubmission, submission_rows)
+    _insert(QuizAnswer, answer_rows)
+
+    notification_rows = [
+        {'recipient_id': user['id'], 'message': f'Notification {n}', 'is_read': n < notifications_per_user // 2,
+         'timestamp': now + timedelta(hours=n)}
+        for user in user_rows for n in range(notifications_per_user)
+    ]
+    _insert(Notification, notification_rows)
+    db.session.commit()
+
+    rebuild_leaderboard()
+    reconcile_student_counts()
+    if analyze:
+        # Table statistics, as a long-running database would have them
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+    student = submission_rows[0]['student_id']
+    quiz = submission_rows[0]['quiz_id']
+    course = next(q['course_id'] for q in quiz_rows if q['id'] == quiz)
+    return {
+        'teacher_id': next(c['teacher_id'] for c in course_rows if c['id'] == course),
+        'student_id': student,
+        'course_id': course,
+        'quiz_id': quiz,
+        'other_student_id': next(s for s in student_ids if s != student),
+        'users': len(user_rows),
+        'courses': len(course_rows),
+        'submissions': len(submission_rows),
+        'answers': len(answer_rows),
+    }
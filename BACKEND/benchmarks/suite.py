@@ -0,0 +1,230 @@
+"""Latency and query counts of every endpoint on a seeded SQLite database.
+
+    python -m benchmarks.suite [--scale 1.0] [--requests 100] [--save]
+                               [--baseline benchmarks/baseline.json] [--tolerance FACTOR]
+
+Seeds benchmarks.seed (users, courses, enrollments, quizzes, questions,
+submissions, answers, notifications; --scale sizes it) and calls each
+endpoint REQUESTS times through the Flask test client. Write endpoints get
+fresh arguments every time: every /submit-quiz call is a student's first
+submission of a quiz in one of their courses, /enroll picks a course the
+student is not in and /unenroll undoes those enrollments.
+
+Reports p50/p95/p99 latency in milliseconds, SQL statements per request and
+the most times one statement shape ran in a request (query_profiler; a
+count of N_PLUS_ONE_THRESHOLD or more is flagged as a likely N+1), next to
+the baseline stored by an earlier --save run. An endpoint which issues more
+statements than in the baseline is marked as a regression and makes the
+script exit with status 1; statement counts are comparable on any machine.
+The p50 change is shown for information only unless --tolerance is given,
+in which case a p50 that grew by more than that factor is a regression too.
+Timings are only comparable between runs at the same scale on the same
+machine, so the committed baseline.json is no reference for them: record a
+baseline first on the machine that runs the comparison,
+
+    python -m benchmarks.suite --save --baseline /tmp/local-baseline.json
+    python -m benchmarks.suite --baseline /tmp/local-baseline.json --tolerance 1.5
+
+Login and signup are left out (bcrypt dominates, see bench_login), and so
+are the YouTube and media routes, which call external services.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# The app reads DATABASE_URL at import; point it at a scratch database
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'suite.sqlite3')}"
+
+from sqlalchemy import select, exists  # noqa: E402
+
+import migrations  # noqa: E402
+import query_profiler  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, User, Course, Enrollment, Quiz, Question, QuizSubmission  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+app = create_app()
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+WARMUP = 3  # untimed calls of each read endpoint
+
+
+def _cycle(items):
+    return lambda i: items[i % len(items)]
+
+
+def write_arguments(requests):
+    # Fresh (student, quiz, answers) and (student, course) pairs for the
+    # write endpoints, one per request
+    submissions = db.session.execute(
+        select(Enrollment.student_id, Quiz.id)
+        .join(Quiz, Quiz.course_id == Enrollment.course_id)
+        .where(~exists().where(QuizSubmission.quiz_id == Quiz.id, QuizSubmission.student_id == Enrollment.student_id))
+        .order_by(Quiz.id, Enrollment.student_id)
+        .limit(requests)
+    ).all()
+    questions = {}
+    for quiz_id, question_id in db.session.execute(
+        select(Question.quiz_id, Question.id).where(Question.quiz_id.in_({quiz_id for _, quiz_id in submissions}))
+    ):
+        questions.setdefault(quiz_id, []).append(question_id)
+
+    students = db.session.execute(
+        select(User.id).where(User.role == 'student').order_by(User.id).limit(requests)
+    ).scalars().all()
+    course_ids = db.session.execute(select(Course.id).order_by(Course.id)).scalars().all()
+    enrolled = set(db.session.execute(
+        select(Enrollment.student_id, Enrollment.course_id).where(Enrollment.student_id.in_(students))
+    ).all())
+    enrollments = [
+        (student, next(course for course in course_ids if (student, course) not in enrolled))
+        for student in students
+    ]
+    return submissions, questions, students, enrollments
+
+
+def endpoints(ids, requests):
+    # [(label, method, i -> url, i -> json body or None)]
+    student, teacher = ids['student_id'], ids['teacher_id']
+    course, quiz = ids['course_id'], ids['quiz_id']
+    submissions, questions, students, enrollments = write_arguments(requests)
+
+    def fixed(url):
+        return lambda i: url
+
+    def submit_body(i):
+        student_id, quiz_id = submissions[i]
+        return {'student_id': student_id, 'time_taken': 300,
+                'answers': [{'question_id': q, 'answer': n % 4} for n, q in enumerate(questions[quiz_id])]}
+
+    return [
+        ('/dashboard/student', 'GET', fixed(f'/dashboard/student?student_id={student}'), None),
+        ('/catalog', 'GET', fixed(f'/catalog?student_id={student}'), None),
+        ('/dashboard/teacher', 'GET', fixed(f'/dashboard/teacher?id={teacher}'), None),
+        ('/course/<id>', 'GET', fixed(f'/course/{course}'), None),
+        ('/notifications/<user>', 'GET', fixed(f'/notifications/{student}'), None),
+        ('/notifications/<user>/unread-count', 'GET', fixed(f'/notifications/{student}/unread-count'), None),
+        ('/quiz/student', 'GET', fixed(f'/quiz/student?student_id={student}'), None),
+        ('/quiz/<id>', 'GET', fixed(f'/quiz/{quiz}'), None),
+        ('/quiz/teacher/<id>', 'GET', fixed(f'/quiz/teacher/{teacher}'), None),
+        ('/quizzes', 'GET', fixed('/quizzes?limit=50'), None),
+        ('/quiz/<id>/submissions', 'GET', fixed(f'/quiz/{quiz}/submissions'), None),
+        ('/quiz/<id>/submission/<student>', 'GET', fixed(f'/quiz/{quiz}/submission/{student}'), None),
+        ('/student/<id>/submissions', 'GET', fixed(f'/student/{student}/submissions'), None),
+        ('/student/<id>/progress', 'GET', fixed(f'/student/{student}/progress'), None),
+        ('/student/<id>/submission/<quiz>', 'GET', fixed(f'/student/{student}/submission/{quiz}'), None),
+        ('/leaderboard/<id>', 'GET', fixed(f'/leaderboard/{quiz}?limit=20'), None),
+        ('/leaderboard/<id>/rank/<student>', 'GET', fixed(f'/leaderboard/{quiz}/rank/{student}'), None),
+        ('/leaderboard/<id>/student/<student>', 'GET', fixed(f'/leaderboard/{quiz}/student/{student}'), None),
+        ('/submit-quiz/<id>', 'POST', lambda i: f'/submit-quiz/{submissions[i][1]}', submit_body),
+        ('/quiz/<id>/score/<student>', 'POST', fixed(f'/quiz/{quiz}/score/{student}'),
+         lambda i: {'score': 50 + i % 50, 'feedback': 'Reviewed'}),
+        ('/enroll/<id>', 'POST', lambda i: f'/enroll/{enrollments[i][1]}',
+         lambda i: {'student_id': enrollments[i][0]}),
+        ('/unenroll/<id>', 'POST', lambda i: f'/unenroll/{enrollments[i][1]}',
+         lambda i: {'student_id': enrollments[i][0]}),
+        ('/notifications/mark-read/<user>', 'POST', lambda i: f'/notifications/mark-read/{_cycle(students)(i)}', None),
+    ]
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)]
+
+
+def run_endpoint(client, method, url, body, requests):
+    if method == 'GET':
+        for i in range(WARMUP):
+            client.get(url(i))
+    timings = []
+    statements = repeats = 0
+    for i in range(requests):
+        with query_profiler.profile() as profile:
+            start = time.perf_counter()
+            res = client.open(url(i), method=method, json=body(i) if body else None)
+            timings.append((time.perf_counter() - start) * 1000)
+        statements += len(profile)
+        repeats = max([repeats] + [count for _, count in profile.repeated(threshold=1)])
+        if res.status_code != 200:
+            raise AssertionError(f'{method} {url(i)}: {res.status_code} {res.get_data(as_text=True)[:200]}')
+    timings.sort()
+    return {
+        'p50': round(statistics.median(timings), 3),
+        'p95': round(percentile(timings, 95), 3),
+        'p99': round(percentile(timings, 99), 3),
+        'queries': round(statements / requests, 2),
+        'repeats': repeats,
+    }
+
+
+def load_baseline(path, scale):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('scale') != scale:
+        print(f"Baseline {path} is for scale {baseline.get('scale')}; comparing statement counts only")
+        return {label: {'queries': row['queries']} for label, row in baseline['endpoints'].items()}
+    return baseline['endpoints']
+
+
+def compare(result, base, tolerance):
+    # (p50 change as text, regression?)
+    if not base:
+        return '', False
+    problems = result['queries'] > base['queries']
+    if 'p50' not in base:
+        return '', problems
+    change = result['p50'] / base['p50'] if base['p50'] else 1
+    # Latency only counts when asked for (tolerance), see the docstring
+    problems = problems or (tolerance is not None and change > tolerance)
+    return f'{(change - 1) * 100:+.0f}%', problems
+
+
+def run(scale, requests, baseline_path, save, tolerance):
+    client = app.test_client()
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        ids = seed(scale=scale)
+        print(f"Seeded {ids['users']} users, {ids['courses']} courses, {ids['submissions']} submissions, "
+              f"{ids['answers']} answers; {requests} requests per endpoint")
+
+        baseline = {} if save else load_baseline(baseline_path, scale)
+        results = {}
+        regressions = 0
+        print(f"{'endpoint':<38} {'p50':>8} {'p95':>8} {'p99':>8} {'stmts':>6} {'repeat':>6} {'base stmts':>10} {'p50 vs base':>11}")
+        for label, method, url, body in endpoints(ids, requests):
+            result = run_endpoint(client, method, url, body, requests)
+            results[label] = result
+            base = baseline.get(label)
+            change, regressed = compare(result, base, tolerance)
+            regressions += regressed
+            print(f"{label:<38} {result['p50']:>8.2f} {result['p95']:>8.2f} {result['p99']:>8.2f} "
+                  f"{result['queries']:>6.1f} {result['repeats']:>6} {base['queries'] if base else '':>10} {change:>11}"
+                  f"{'  !! regression' if regressed else ''}"
+                  f"{'  !! N+1' if result['repeats'] >= query_profiler.N_PLUS_ONE_THRESHOLD else ''}")
+
+        if save:
+            with open(baseline_path, 'w') as f:
+                json.dump({'scale': scale, 'requests': requests, 'endpoints': results}, f, indent=2, sort_keys=True)
+                f.write('\n')
+            print(f'\nSaved baseline to {baseline_path}')
+        elif baseline:
+            print(f'\n{regressions} regressions against {baseline_path}')
+        return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float,
+                        help='also fail on a p50 growth beyond this factor (baseline saved on this machine)')
+    args = parser.parse_args()
+    sys.exit(1 if run(args.scale, args.requests, args.baseline, args.save, args.tolerance) else 0)
@@ -0,0 +1,36 @@
+import os
+from dotenv import load_dotenv
+
+# The one place .env is read. app.py imports this module before anything
+# else, so the os.getenv settings of the other modules see .env values too;
+# variables already set in the environment win over .env.
+load_dotenv()
+
+
+def _engine_options(database_url):
+    # One pooled connection per request a web worker can serve at once
+    # (gunicorn.conf.py), capped at DB_POOL_SIZE so WEB_CONCURRENCY workers
+    # stay under the server's connection limit. Requests beyond the pool
+    # wait up to DB_POOL_TIMEOUT seconds. SQLite keeps SQLAlchemy's defaults.
+    if not database_url or database_url.startswith('sqlite'):
+        return {}
+    concurrency = {
+        'gthread': int(os.getenv('GUNICORN_THREADS', 1)),
+        'gevent': int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000)),
+    }.get(os.getenv('GUNICORN_WORKER_CLASS', 'sync'), 1)
+    return {
+        'pool_size': min(concurrency, int(os.getenv('DB_POOL_SIZE', 20))),
+        'max_overflow': 0,
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_pre_ping': True,
+    }
+
+
+class Config:
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    # Larger request bodies are refused with 413 before they are read
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    CORS_ORIGINS = [origin.strip() for origin in os.getenv('CORS_ORIGINS', '').split(',') if origin.strip()] \
+        or ['https://mentoroid-zeta.vercel.app']
@@ -0,0 +1,74 @@
+from sqlalchemy import select, update, case, func
+from models import db, Course, Enrollment, User, Notification
+import versions
+
+# Course.students is a denormalized count of Enrollment rows. It is only
+# changed with relative SQL updates in the enrolling transaction, and
+# reconcile_student_counts() repairs any drift (manual edits, old racy
+# writes) against the Enrollment table. User.unread_notifications works the
+# same way (fanout.py, routes/notifications.py) and is repaired by
+# reconcile_unread_counts().
+
+
+def change_student_count(course_id, delta):
+    current = func.coalesce(Course.students, 0)
+    db.session.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(students=case((current + delta < 0, 0), else_=current + delta))
+    )
+    versions.bump_courses(course_id)
+
+
+def _actual_count():
+    return select(func.count(Enrollment.id)).where(Enrollment.course_id == Course.id).scalar_subquery()
+
+
+def find_drift():
+    # [(course id, stored count, actual count)] for every course that is off
+    actual = _actual_count()
+    rows = db.session.execute(
+        select(Course.id, Course.students, actual)
+        .where(func.coalesce(Course.students, -1) != actual)
+        .order_by(Course.id)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def reconcile_student_counts(fix=True):
+    drift = find_drift()
+    if fix and drift:
+        db.session.execute(
+            update(Course)
+            .where(Course.id.in_([course_id for course_id, _, _ in drift]))
+            .values(students=_actual_count())
+        )
+        versions.bump_courses(*[course_id for course_id, _, _ in drift])
+        db.session.commit()
+    return drift
+
+
+def _actual_unread():
+    return (
+        select(func.count(Notification.id))
+        .where(Notification.recipient_id == User.id, Notification.is_read.is_(False))
+        .scalar_subquery()
+    )
+
+
+def reconcile_unread_counts(fix=True):
+    # [(user id, stored count, actual count)] for every user that was off
+    actual = _actual_unread()
+    drift = [tuple(row) for row in db.session.execute(
+        select(User.id, User.unread_notifications, actual)
+        .where(User.unread_notifications != actual)
+        .order_by(User.id)
+    ).all()]
+    if fix and drift:
+        db.session.execute(
+            update(User)
+            .where(User.id.in_([user_id for user_id, _, _ in drift]))
+            .values(unread_notifications=_actual_unread())
+        )
+        db.session.commit()
+    return drift
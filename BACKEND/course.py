@@ -1,13 +1,6 @@
-import requests
 from flask import Blueprint, jsonify
 from models import Course
-from routes.youtube import YOUTUBE_API_KEY
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
-api_url = os.getenv("YOUTUBE_API_URL")
+from youtube_client import get_client
 
 course_detail_bp = Blueprint('course_detail', __name__)
 
@@ -23,38 +16,19 @@ def get_youtube_videos(course_id):
     try:
         if "list=" in url:
             playlist_id = url.split("list=")[1].split("&")[0]
-            api_url = f"{api_url}/playlistItems?part=snippet&maxResults=20&playlistId={playlist_id}&key={YOUTUBE_API_KEY}"
-            res = requests.get(api_url)
-            items = res.json().get('items', [])
-            videos = [{
-                'title': item['snippet']['title'],
-                'videoId': item['snippet']['resourceId']['videoId'],
-                'thumbnail': item['snippet']['thumbnails']['medium']['url']
-            } for item in items]
+            videos = get_client().playlist_videos(playlist_id, limit=20)
 
-        elif "v=" in url:
-            video_id = url.split("v=")[-1].split("&")[0]
-            api_url = f"{api_url}/videos?part=snippet&id={video_id}&key={YOUTUBE_API_KEY}"
-            res = requests.get(api_url)
-            items = res.json().get('items', [])
-            if items:
-                item = items[0]
-                videos = [{
-                    'title': item['snippet']['title'],
-                    'videoId': video_id,
-                    'thumbnail': item['snippet']['thumbnails']['medium']['url']
-                }]
-        elif "youtu.be/" in url:
-            video_id = url.split("youtu.be/")[1].split("?")[0]
-            api_url = f"{api_url}/videos?part=snippet&id={video_id}&key={YOUTUBE_API_KEY}"
-            res = requests.get(api_url)
-            items = res.json().get('items', [])
-            if items:
-                item = items[0]
+        elif "v=" in url or "youtu.be/" in url:
+            if "v=" in url:
+                video_id = url.split("v=")[-1].split("&")[0]
+            else:
+                video_id = url.split("youtu.be/")[1].split("?")[0]
+            video = get_client().video(video_id)
+            if video:
                 videos = [{
-                    'title': item['snippet']['title'],
-                    'videoId': video_id,
-                    'thumbnail': item['snippet']['thumbnails']['medium']['url']
+                    'title': video['title'],
+                    'videoId': video['videoId'],
+                    'thumbnail': video['thumbnail']
                 }]
         return jsonify({'videos': videos})
     
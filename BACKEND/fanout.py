@@ -0,0 +1,83 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert, update, select, literal, false, bindparam
+from models import db, Notification, User, Enrollment
+
+# Notification fan-out done by the database instead of one ORM object per
+# recipient. Everything here runs inside the caller's session/transaction,
+# so the caller still decides when to commit. User.unread_notifications is
+# raised in the same statements' transaction, with one set-based UPDATE per
+# fan-out.
+
+NOTIFICATION_COLUMNS = ['recipient_id', 'message', 'is_read', 'timestamp']
+CHUNK_SIZE = 1000
+
+
+def _insert_from_select(recipients, message, timestamp=None):
+    # recipients is a single-column select of user ids; the rows never leave the database
+    now = timestamp or datetime.now()
+    rows = recipients.add_columns(
+        literal(message),
+        false(),
+        literal(now, Notification.timestamp.type)
+    )
+    stmt = insert(Notification).from_select(NOTIFICATION_COLUMNS, rows)
+    result = db.session.execute(stmt)
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(recipients))
+        .values(unread_notifications=User.unread_notifications + 1)
+    )
+    _written()
+    return result.rowcount
+
+
+def _count_unread(batch):
+    # Core executemany on the table; one parameter set per distinct recipient
+    users = User.__table__
+    counts = Counter(row['recipient_id'] for row in batch)
+    db.session.execute(
+        update(users)
+        .where(users.c.id == bindparam('user_id'))
+        .values(unread_notifications=users.c.unread_notifications + bindparam('count')),
+        [{'user_id': user_id, 'count': count} for user_id, count in counts.items()]
+    )
+
+
+def _written():
+    # Lets notification_stream wake its poller once the transaction commits
+    db.session.info['notifications_written'] = True
+
+
+def notify_students(message, timestamp=None):
+    # Every user with the student role
+    recipients = select(User.id).where(User.role == 'student')
+    return _insert_from_select(recipients, message, timestamp)
+
+
+def notify_course_students(course_id, message, timestamp=None):
+    # Every student enrolled in the given course
+    recipients = select(Enrollment.student_id).where(Enrollment.course_id == course_id)
+    return _insert_from_select(recipients, message, timestamp)
+
+
+def notify_users(user_ids, message, timestamp=None, chunk_size=CHUNK_SIZE):
+    # Explicit recipient list (any iterable, may be a generator), written in
+    # fixed-size executemany batches so memory does not grow with the audience
+    now = timestamp or datetime.now()
+    total = 0
+    batch = []
+    for user_id in user_ids:
+        batch.append({'recipient_id': user_id, 'message': message, 'is_read': False, 'timestamp': now})
+        if len(batch) >= chunk_size:
+            db.session.execute(insert(Notification), batch)
+            _count_unread(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Notification), batch)
+        _count_unread(batch)
+        total += len(batch)
+    if total:
+        _written()
+    return total
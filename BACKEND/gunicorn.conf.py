@@ -0,0 +1,41 @@
+import os
+
+# gunicorn reads this file from the working directory; options given on the
+# command line override it.
+#
+# GUNICORN_WORKER_CLASS picks the serving mode:
+#
+#   sync      one request per worker process
+#   gthread   GUNICORN_THREADS requests per worker, on OS threads
+#   gevent    up to GUNICORN_WORKER_CONNECTIONS requests per worker, on
+#             green threads. The worker monkey-patches the standard
+#             library before loading the app, so requests (YouTube) and
+#             the Cloudinary SDK wait on sockets without holding the
+#             worker, and server-sent event streams cost a greenlet each.
+#             Do not combine with preload_app, which would import the app
+#             before the patching. psycopg2 is not covered by the patching;
+#             post_fork below makes it wait through gevent (psycogreen),
+#             otherwise every query would block all greenlets of the worker.
+#
+# The database pool of each worker is sized from the same variables, up to
+# DB_POOL_SIZE connections (config.py).
+#
+# WEB_CONCURRENCY sets the number of worker processes.
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        # psycogreen or psycopg2 missing: fine on SQLite, not on PostgreSQL
+        server.log.warning('psycopg2 is not patched for gevent; database queries will block the worker')
+        return
+    patch_psycopg()
@@ -0,0 +1,77 @@
+import os
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Fixed-size variants of uploaded avatars and course thumbnails, made by the
+# worker before upload (media.py). Each image is decoded once: JPEGs are
+# asked for a reduced decode (draft mode) no larger than the biggest
+# variant needs, and every smaller variant is scaled from the one before
+# it. Together with MEDIA_MAX_PIXELS this bounds memory per image whatever
+# the camera resolution.
+
+# kind -> variant name -> (width, height); cropped to fill
+VARIANTS = {
+    'thumbnail': {'detail': (1280, 720), 'card': (640, 360), 'grid': (320, 180)},
+    'avatar': {'detail': (512, 512), 'card': (128, 128), 'grid': (48, 48)},
+}
+
+FORMATS = [f.strip() for f in os.getenv('MEDIA_VARIANT_FORMATS', 'webp,jpeg').split(',') if f.strip()]
+EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg'}
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# Larger images are refused instead of decoded. _open checks the header
+# size itself: Pillow only raises past twice MAX_IMAGE_PIXELS and merely
+# warns below that; its limit stays as a backstop for other loaders.
+MAX_PIXELS = int(os.getenv('MEDIA_MAX_PIXELS', 50_000_000))
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def _open(path, size):
+    try:
+        image = Image.open(path)
+        if image.width * image.height > MAX_PIXELS:
+            image.close()
+            raise InvalidImage(f'{image.width}x{image.height} is more than {MAX_PIXELS} pixels')
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        image.load()
+        return image
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImage(str(e)) from e
+
+
+def _save(image, path, fmt):
+    if fmt == 'jpeg' and image.mode == 'RGBA':
+        # JPEG has no alpha; flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    image.save(path, **SAVE_OPTIONS[fmt])
+
+
+def make_variants(path, kind, formats=None):
+    # Writes the variants next to path and returns
+    # {variant name: {format: file path}}, largest variant first
+    formats = formats or FORMATS
+    sizes = VARIANTS[kind]
+    largest = max(sizes.values())
+    base = os.path.splitext(path)[0]
+
+    image = _open(path, largest)
+    files = {}
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+        files[name] = {}
+        for fmt in formats:
+            out = f'{base}-{name}{EXTENSIONS[fmt]}'
+            _save(image, out, fmt)
+            files[name][fmt] = out
+    return files
@@ -1,8 +1,15 @@
-from flask import Blueprint, jsonify
-from models import db, Quiz, QuizSubmission, QuizAnswer, User
+from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, or_, select, insert, delete
+from models import db, Quiz, QuizSubmission, QuizAnswer, Question, User, LeaderboardEntry
+import versions
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+MAX_PAGE_SIZE = 500
+# Boards change with every submission during an exam, so shared caches may
+# only keep them for a few seconds
+BOARD_CACHE_CONTROL = 'public, max-age=5'
+
 # Helper function to add CORS headers
 def add_cors_headers(response):
     response.headers['Access-Control-Allow-Origin'] = 'mentoroid-zeta.vercel.app'
@@ -11,38 +18,115 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Credentials'] = 'true'
     return response
 
+
+# Board order: highest score first, then fastest, then student id so that
+# ties still have a stable position
+BOARD_ORDER = (LeaderboardEntry.score.desc(), LeaderboardEntry.time_taken.asc(), LeaderboardEntry.student_id.asc())
+REVERSE_ORDER = (LeaderboardEntry.score.asc(), LeaderboardEntry.time_taken.desc(), LeaderboardEntry.student_id.desc())
+
+
+def record_submission(submission, new=False):
+    # Called in the same transaction that creates (new=True) or rescores the submission
+    entry = None if new else db.session.get(LeaderboardEntry, (submission.quiz_id, submission.student_id))
+    if entry is None:
+        student = db.session.get(User, submission.student_id)
+        entry = LeaderboardEntry(
+            quiz_id=submission.quiz_id,
+            student_id=submission.student_id,
+            student_name=student.name if student else None
+        )
+        db.session.add(entry)
+    entry.score = submission.score or 0
+    entry.time_taken = submission.time_taken
+    entry.submitted_at = submission.submitted_at
+    return entry
+
+
+def rebuild_leaderboard(quiz_id=None):
+    # Recreates the materialized rows from QuizSubmission, for one quiz or
+    # for all of them (first deploy, or after bulk changes)
+    rows = select(
+        QuizSubmission.quiz_id,
+        QuizSubmission.student_id,
+        User.name,
+        db.func.coalesce(QuizSubmission.score, 0),
+        QuizSubmission.time_taken,
+        QuizSubmission.submitted_at
+    ).join(User, User.id == QuizSubmission.student_id)
+    clear = delete(LeaderboardEntry)
+    if quiz_id is not None:
+        rows = rows.where(QuizSubmission.quiz_id == quiz_id)
+        clear = clear.where(LeaderboardEntry.quiz_id == quiz_id)
+
+    db.session.execute(clear)
+    result = db.session.execute(insert(LeaderboardEntry).from_select(
+        ['quiz_id', 'student_id', 'student_name', 'score', 'time_taken', 'submitted_at'], rows
+    ))
+    versions.bump('leaderboards' if quiz_id is None else f'leaderboard:{quiz_id}')
+    db.session.commit()
+    return result.rowcount
+
+
+def _ahead_of(entry):
+    # Entries that sort before entry on the board
+    return and_(
+        LeaderboardEntry.quiz_id == entry.quiz_id,
+        or_(
+            LeaderboardEntry.score > entry.score,
+            and_(LeaderboardEntry.score == entry.score, LeaderboardEntry.time_taken < entry.time_taken),
+            and_(LeaderboardEntry.score == entry.score, LeaderboardEntry.time_taken == entry.time_taken,
+                 LeaderboardEntry.student_id < entry.student_id)
+        )
+    )
+
+
+def _behind(entry):
+    return and_(
+        LeaderboardEntry.quiz_id == entry.quiz_id,
+        or_(
+            LeaderboardEntry.score < entry.score,
+            and_(LeaderboardEntry.score == entry.score, LeaderboardEntry.time_taken > entry.time_taken),
+            and_(LeaderboardEntry.score == entry.score, LeaderboardEntry.time_taken == entry.time_taken,
+                 LeaderboardEntry.student_id > entry.student_id)
+        )
+    )
+
+
+def _format_entry(e, rank):
+    return {
+        'rank': rank,
+        'student_name': e.student_name,
+        'student_id': e.student_id,
+        'submitted_at': e.submitted_at,
+        'time_taken': e.time_taken,
+        'score': e.score
+    }
+
+
+def _board_versions(quiz_id, **_):
+    return ['leaderboards', f'leaderboard:{quiz_id}']
+
+
 @leaderboard_bp.route('/leaderboard/<int:quiz_id>', methods=['GET'])
+@versions.conditional(_board_versions, cache_control=BOARD_CACHE_CONTROL)
 def get_leaderboard(quiz_id):
+    # ?limit=&offset= page through the board; without limit the whole board
+    # is returned as before
     try:
+        limit = request.args.get('limit', type=int)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
         # Verify quiz exists
-        quiz = Quiz.query.get(quiz_id)
+        quiz = db.session.get(Quiz, quiz_id)
         if not quiz:
             response = jsonify({'error': 'Quiz not found'})
             return add_cors_headers(response), 404
 
-        # Get all submissions for this quiz with user details
-        submissions = db.session.query(
-            QuizSubmission.id,
-            QuizSubmission.student_id,
-            QuizSubmission.submitted_at,
-            QuizSubmission.time_taken,
-            QuizSubmission.score,
-            User.name.label('student_name')
-        ).join(User, User.id == QuizSubmission.student_id)\
-        .filter(QuizSubmission.quiz_id == quiz_id)\
-        .order_by(
-            QuizSubmission.score.desc(),  # Order by score first (highest first)
-            QuizSubmission.time_taken.asc()  # Then by time taken (fastest first)
-        ).all()
-
-        # Format the leaderboard data
-        leaderboard = [{
-            'student_name': s.student_name,
-            'student_id': s.student_id,
-            'submitted_at': s.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if s.submitted_at else None,
-            'time_taken': s.time_taken,
-            'score': s.score
-        } for s in submissions]
+        query = LeaderboardEntry.query.filter_by(quiz_id=quiz_id).order_by(*BOARD_ORDER).offset(offset)
+        if limit is not None:
+            query = query.limit(min(max(limit, 0), MAX_PAGE_SIZE))
+
+        leaderboard = [_format_entry(e, offset + i + 1) for i, e in enumerate(query.all())]
 
         response = jsonify(leaderboard)
         return add_cors_headers(response)
@@ -52,13 +136,47 @@ def get_leaderboard(quiz_id):
         response = jsonify({'error': 'Server error fetching leaderboard'})
         return add_cors_headers(response), 500
 
+
+# A student's rank plus the entries right around it. Only the part of the
+# board ahead of the student is counted, via the rank index.
+@leaderboard_bp.route('/leaderboard/<int:quiz_id>/rank/<int:student_id>', methods=['GET'])
+@versions.conditional(_board_versions, cache_control=BOARD_CACHE_CONTROL)
+def get_student_rank(quiz_id, student_id):
+    try:
+        neighbours = min(max(request.args.get('neighbours', 2, type=int), 0), 50)
+
+        entry = db.session.get(LeaderboardEntry, (quiz_id, student_id))
+        if not entry:
+            response = jsonify({'error': 'Submission not found'})
+            return add_cors_headers(response), 404
+
+        rank = db.session.query(db.func.count()).select_from(LeaderboardEntry).filter(_ahead_of(entry)).scalar() + 1
+        above = LeaderboardEntry.query.filter(_ahead_of(entry)).order_by(*REVERSE_ORDER).limit(neighbours).all()
+        below = LeaderboardEntry.query.filter(_behind(entry)).order_by(*BOARD_ORDER).limit(neighbours).all()
+
+        response = jsonify({
+            'rank': rank,
+            'entry': _format_entry(entry, rank),
+            'above': [_format_entry(e, rank - i - 1) for i, e in reversed(list(enumerate(above)))],
+            'below': [_format_entry(e, rank + i + 1) for i, e in enumerate(below)]
+        })
+        return add_cors_headers(response)
+
+    except Exception as e:
+        print(f"Error fetching rank: {str(e)}")
+        response = jsonify({'error': 'Server error fetching rank'})
+        return add_cors_headers(response), 500
+
 # Add CORS headers to all responses
 @leaderboard_bp.after_request
 def after_request(response):
     return add_cors_headers(response)
 
 # Optional: Get detailed submission info for a specific student
+# Answers only change with the board (rescoring, regrading) or the questions
 @leaderboard_bp.route('/leaderboard/<int:quiz_id>/student/<int:student_id>', methods=['GET'])
+@versions.conditional(lambda quiz_id, student_id: _board_versions(quiz_id) + [f'quiz:{quiz_id}'],
+                      cache_control='private, no-cache')
 def get_student_submission_details(quiz_id, student_id):
     try:
         # Get the submission
@@ -89,7 +207,7 @@ def get_student_submission_details(quiz_id, student_id):
             'submission_id': submission.id,
             'score': submission.score,
             'time_taken': submission.time_taken,
-            'submitted_at': submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'submitted_at': submission.submitted_at,
             'answers': [{
                 'question_id': a.question_id,
                 'question_text': a.question_text,
@@ -108,27 +226,3 @@ def get_student_submission_details(quiz_id, student_id):
         print(f"Error fetching submission details: {str(e)}")
         response = jsonify({'error': 'Server error fetching submission details'})
         return add_cors_headers(response), 500
-
-
-@leaderboard_bp.route('/quizzes', methods=['GET'])
-def get_quizzes():
-    try:
-        # Fetch all quizzes from database
-        quizzes = Quiz.query.all()
-        
-        # Convert to list of dictionaries
-        quiz_list = []
-        for quiz in quizzes:
-            quiz_data = {
-                'id': quiz.id,
-                'title': quiz.title,
-                'instructions': quiz.instructions if hasattr(quiz, 'instructions') else '',
-                'created_at': quiz.created_at.strftime('%Y-%m-%d %H:%M:%S') if hasattr(quiz, 'created_at') and quiz.created_at else 'No date'
-            }
-            quiz_list.append(quiz_data)
-        
-        return jsonify(quiz_list)
-    
-    except Exception as e:
-        print(f"Error: {e}")
-        return jsonify({'error': 'Failed to fetch quizzes'}), 500
\ No newline at end of file
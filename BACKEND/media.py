@@ -0,0 +1,282 @@
+import os
+import shutil
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, exists
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from models import db, User, Course, MediaUpload
+import versions
+import metrics
+
+# Avatars and course thumbnails are not uploaded inside the request. The
+# request stores the file's bytes in a MediaUpload row and marks the image
+# 'pending'; worker.py, which may run on another machine, writes them to a
+# scratch file under MEDIA_STAGING_DIR, pushes it to the media backend and
+# fills in User.image / Course.thumbnail. Before uploading, the
+# worker also makes fixed-size variants of the image (images.py) and stores
+# their URLs in User.image_variants / Course.thumbnail_variants.
+#
+# A worker claims an upload by moving its available_at forward by
+# MEDIA_LEASE seconds and commits before uploading, so no transaction is
+# open while the file travels. If the worker dies, the lease runs out and
+# another worker picks the upload up again. Failed attempts are retried
+# with exponential backoff, MEDIA_MAX_ATTEMPTS times.
+#
+# Backends (MEDIA_BACKEND): 'cloudinary' (default, configured from the
+# cloud_name/api_key/api_secret variables and, for a stand-in server,
+# CLOUDINARY_UPLOAD_PREFIX) and 'local', which copies files
+# to MEDIA_LOCAL_ROOT and serves them from MEDIA_LOCAL_URL, for development
+# and tests.
+
+STAGING_DIR = os.getenv('MEDIA_STAGING_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'media-staging'))
+BATCH_SIZE = int(os.getenv('MEDIA_BATCH_SIZE', 10))
+MAX_ATTEMPTS = int(os.getenv('MEDIA_MAX_ATTEMPTS', 5))
+RETRY_DELAY = int(os.getenv('MEDIA_RETRY_DELAY', 30))  # seconds, doubled after every failure
+LEASE = int(os.getenv('MEDIA_LEASE', 300))  # seconds a claimed upload is left to its worker
+MAX_UPLOAD_BYTES = int(os.getenv('MEDIA_MAX_UPLOAD_BYTES', 5 * 1024 * 1024))  # per image
+
+# kind -> (model, url column, status column, variants column)
+TARGETS = {
+    'avatar': (User, 'image', 'image_status', 'image_variants'),
+    'thumbnail': (Course, 'thumbnail', 'thumbnail_status', 'thumbnail_variants'),
+}
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    # The request as a whole can also be refused (MAX_CONTENT_LENGTH), with
+    # RequestEntityTooLarge; routes answer 413 for both
+    description = f'Images may be at most {MAX_UPLOAD_BYTES // (1024 * 1024)} MiB'
+
+
+class CloudinaryUploader:
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+        cloudinary.config(
+            cloud_name=os.getenv("cloud_name"),
+            api_key=os.getenv("api_key"),
+            api_secret=os.getenv("api_secret"),
+            # Another API host, e.g. benchmarks/fake_cloudinary.py in load tests
+            upload_prefix=os.getenv('CLOUDINARY_UPLOAD_PREFIX') or None
+        )
+        self._upload = cloudinary.uploader.upload
+
+    def upload(self, path, kind):
+        start = time.perf_counter()
+        try:
+            result = self._upload(path, folder=kind)
+        except Exception:
+            metrics.observe_outbound('cloudinary', time.perf_counter() - start, 'error')
+            raise
+        metrics.observe_outbound('cloudinary', time.perf_counter() - start, 200)
+        return result['secure_url']
+
+
+class LocalUploader:
+    def __init__(self, root=None, base_url=None):
+        self.root = root or os.getenv('MEDIA_LOCAL_ROOT', os.path.join(os.path.dirname(STAGING_DIR), 'media'))
+        self.base_url = (base_url or os.getenv('MEDIA_LOCAL_URL', '/media')).rstrip('/')
+
+    def upload(self, path, kind):
+        name = os.path.join(kind, os.path.basename(path))
+        os.makedirs(os.path.join(self.root, kind), exist_ok=True)
+        shutil.copyfile(path, os.path.join(self.root, name))
+        return f'{self.base_url}/{name}'
+
+
+UPLOADERS = {
+    'cloudinary': CloudinaryUploader,
+    'local': LocalUploader,
+}
+
+_uploader = None
+
+
+def get_uploader():
+    global _uploader
+    if _uploader is None:
+        backend = os.getenv('MEDIA_BACKEND', 'cloudinary')
+        if backend not in UPLOADERS:
+            raise ValueError(f'Unknown MEDIA_BACKEND: {backend}')
+        _uploader = UPLOADERS[backend]()
+    return _uploader
+
+
+def stage_upload(kind, target, file):
+    # Stages file (a werkzeug FileStorage) for target, a User or Course that
+    # already has an id, and marks its image pending. The caller commits.
+    # Raises UploadTooLarge past MAX_UPLOAD_BYTES, having read no more.
+    model, _, status_column, _ = TARGETS[kind]
+    data = file.stream.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge()
+    filename = secure_filename(file.filename or '')
+    extension = os.path.splitext(filename)[1].lower()
+    name = f'{kind}-{uuid.uuid4().hex}{extension}'
+
+    upload = MediaUpload(kind=kind, target_id=target.id, path=name, filename=filename, data=data)
+    db.session.add(upload)
+    setattr(target, status_column, 'pending')
+    return upload
+
+
+def _changed(kind, *target_ids):
+    # Core updates skip the version rules; course pages show thumbnails
+    if kind == 'thumbnail':
+        versions.bump_courses(*target_ids)
+
+
+def _newer_upload(upload):
+    # A later upload for the same image wins, whichever finishes first
+    return db.session.execute(select(exists().where(
+        MediaUpload.kind == upload.kind,
+        MediaUpload.target_id == upload.target_id,
+        MediaUpload.id > upload.id
+    ))).scalar()
+
+
+def _push(uploader, path, kind):
+    # Uploads the variants, then the original. Returns (url, variant urls).
+    # Pillow is only needed in the worker, so images is imported here.
+    from images import make_variants
+
+    files = make_variants(path, kind)
+    try:
+        variants = {
+            name: {fmt: uploader.upload(file_path, kind) for fmt, file_path in formats.items()}
+            for name, formats in files.items()
+        }
+        return uploader.upload(path, kind), variants
+    finally:
+        for formats in files.values():
+            for file_path in formats.values():
+                _remove(file_path)
+
+
+def _unstage(upload_id, name):
+    # Writes the staged bytes to a scratch file and returns its path, or
+    # None when the upload has none left
+    data = db.session.execute(select(MediaUpload.data).where(MediaUpload.id == upload_id)).scalar()
+    db.session.rollback()
+    if data is None:
+        return None
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    path = os.path.join(STAGING_DIR, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _finish(upload_id, url, variants):
+    upload = db.session.get(MediaUpload, upload_id)
+    upload.status = 'done'
+    upload.url = url
+    upload.data = None
+    upload.processed_at = datetime.now()
+    if not _newer_upload(upload):
+        model, url_column, status_column, variants_column = TARGETS[upload.kind]
+        db.session.execute(
+            update(model)
+            .where(model.id == upload.target_id)
+            .values({url_column: url, status_column: 'ready', variants_column: variants})
+        )
+        _changed(upload.kind, upload.target_id)
+    db.session.commit()
+
+
+def _record_failure(upload_id, error, permanent=False):
+    # permanent: retrying cannot help (the file is not a usable image)
+    upload = db.session.get(MediaUpload, upload_id)
+    upload.attempts += 1
+    upload.last_error = error
+    if permanent or upload.attempts >= MAX_ATTEMPTS:
+        upload.status = 'failed'
+        if not _newer_upload(upload):
+            model, _, status_column, _ = TARGETS[upload.kind]
+            db.session.execute(update(model).where(model.id == upload.target_id).values({status_column: 'failed'}))
+            _changed(upload.kind, upload.target_id)
+    else:
+        upload.status = 'pending'
+        upload.available_at = datetime.now() + timedelta(seconds=RETRY_DELAY * 2 ** (upload.attempts - 1))
+    db.session.commit()
+
+
+def _claim(upload_id):
+    now = datetime.now()
+    claimed = db.session.execute(
+        update(MediaUpload)
+        .where(MediaUpload.id == upload_id,
+               MediaUpload.status.in_(['pending', 'uploading']),
+               MediaUpload.available_at <= now)
+        .values(status='uploading', available_at=now + timedelta(seconds=LEASE))
+    ).rowcount
+    db.session.commit()
+    return claimed
+
+
+def process_uploads(batch_size=BATCH_SIZE, uploader=None):
+    # Pushes up to batch_size due uploads. Returns how many were looked at
+    # so the worker knows whether to sleep.
+    from images import InvalidImage
+
+    uploader = uploader or get_uploader()
+    due = db.session.execute(
+        select(MediaUpload.id, MediaUpload.kind, MediaUpload.path)
+        .where(MediaUpload.status.in_(['pending', 'uploading']), MediaUpload.available_at <= datetime.now())
+        .order_by(MediaUpload.id)
+        .limit(batch_size)
+    ).all()
+    db.session.rollback()
+
+    for upload_id, kind, name in due:
+        if not _claim(upload_id):
+            continue
+        path = None
+        try:
+            path = _unstage(upload_id, name)
+            if path is None:
+                _record_failure(upload_id, 'Staged file is missing', permanent=True)
+                continue
+            url, variants = _push(uploader, path, kind)
+        except InvalidImage as e:
+            _record_failure(upload_id, f'Invalid image: {e}', permanent=True)
+            continue
+        except Exception as e:
+            traceback.print_exc()
+            _record_failure(upload_id, f'{type(e).__name__}: {e}')
+            continue
+        finally:
+            if path:
+                _remove(path)
+        _finish(upload_id, url, variants)
+    return len(due)
+
+
+def retry_failed_uploads():
+    # Requeues uploads that ran out of attempts; their staged bytes are kept
+    result = db.session.execute(
+        update(MediaUpload)
+        .where(MediaUpload.status == 'failed')
+        .values(status='pending', attempts=0, available_at=datetime.now())
+    )
+    for kind, (model, _, status_column, _) in TARGETS.items():
+        target_ids = db.session.execute(
+            select(model.id)
+            .where(getattr(model, status_column) == 'failed',
+                   model.id.in_(select(MediaUpload.target_id).where(MediaUpload.kind == kind, MediaUpload.status == 'pending')))
+        ).scalars().all()
+        if target_ids:
+            db.session.execute(update(model).where(model.id.in_(target_ids)).values({status_column: 'pending'}))
+            _changed(kind, *target_ids)
+    db.session.commit()
+    return result.rowcount
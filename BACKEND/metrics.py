@@ -0,0 +1,262 @@
+import glob
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request metrics in the Prometheus text format, served at /metrics:
+#
+#   http_requests_total{method,route,status}           counter
+#   http_request_duration_seconds{method,route}        histogram
+#   http_requests_in_flight                            gauge
+#   db_time_seconds{route}                             histogram, per request
+#   db_statements_total{route}                         counter
+#   outbound_request_duration_seconds{service}         histogram (youtube, cloudinary)
+#   outbound_requests_total{service,status}            counter
+#
+# route is the URL rule ('/quiz/<int:quiz_id>'), so the number of series
+# stays bounded. Everything is kept in memory per process; recording is a
+# dict lookup and a few additions under one lock.
+#
+# Under gunicorn every worker has its own numbers. With METRICS_DIR set,
+# each process (web workers and worker.py) writes a snapshot there at most
+# every METRICS_FLUSH_INTERVAL seconds and /metrics adds them all up. Empty
+# the directory before starting the processes. METRICS_TOKEN, when set, is
+# required as a bearer token to read /metrics. METRICS_ENABLED=0 turns
+# recording off.
+
+ENABLED = os.getenv('METRICS_ENABLED', '1') not in ('0', 'false', '')
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+TOKEN = os.getenv('METRICS_TOKEN') or None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+OUTBOUND_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    'http_requests_total': ('counter', 'Requests by route and status code'),
+    'http_request_duration_seconds': ('histogram', 'Time to produce the response'),
+    'http_requests_in_flight': ('gauge', 'Requests being handled'),
+    'db_time_seconds': ('histogram', 'Time spent in SQL statements per request'),
+    'db_statements_total': ('counter', 'SQL statements issued by requests'),
+    'outbound_request_duration_seconds': ('histogram', 'Time of calls to external services'),
+    'outbound_requests_total': ('counter', 'Calls to external services by status'),
+}
+
+# [seconds, statements] of the current request's SQL
+_db_usage = ContextVar('db_usage', default=None)
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.buckets = {}     # name -> bucket bounds
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        with self._lock:
+            row = self.histograms.get(key)
+            if row is None:
+                self.buckets[name] = buckets
+                row = self.histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def add_in_flight(self, delta):
+        with self._lock:
+            self.in_flight += delta
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(row)] for (name, labels), row in self.histograms.items()],
+                'buckets': {name: list(bounds) for name, bounds in self.buckets.items()},
+                'in_flight': self.in_flight,
+            }
+
+
+registry = Registry()
+_last_flush = 0.0
+
+
+def observe_outbound(service, seconds, status):
+    # status: HTTP status code, or 'error' when no response came back
+    if not ENABLED:
+        return
+    registry.observe('outbound_request_duration_seconds', (('service', service),), seconds, OUTBOUND_BUCKETS)
+    registry.inc('outbound_requests_total', (('service', service), ('status', str(status))))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if ENABLED and context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    usage = _db_usage.get()
+    if usage is not None and context is not None and hasattr(context, '_metrics_start'):
+        usage[0] += time.perf_counter() - context._metrics_start
+        usage[1] += 1
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_request():
+    if not ENABLED:
+        return
+    g._metrics_start = time.perf_counter()
+    g._metrics_db = _db_usage.set([0.0, 0])
+    registry.add_in_flight(1)
+
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    if start is None:
+        return response
+    route = _route()
+    usage = _db_usage.get()
+    registry.observe('http_request_duration_seconds', (('method', request.method), ('route', route)),
+                     time.perf_counter() - start, LATENCY_BUCKETS)
+    registry.inc('http_requests_total', (('method', request.method), ('route', route), ('status', str(response.status_code))))
+    if usage is not None:
+        registry.observe('db_time_seconds', (('route', route),), usage[0], DB_BUCKETS)
+        if usage[1]:
+            registry.inc('db_statements_total', (('route', route),), usage[1])
+    maybe_flush()
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop('_metrics_db', None)
+    if token is not None:
+        _db_usage.reset(token)
+        registry.add_in_flight(-1)
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f'metrics-{pid}.json')
+
+
+def flush():
+    # Writes this process's snapshot to METRICS_DIR
+    global _last_flush
+    if METRICS_DIR is None:
+        return
+    _last_flush = time.monotonic()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    with open(path + '.tmp', 'w') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(path + '.tmp', path)
+
+
+def maybe_flush():
+    if METRICS_DIR is not None and time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _snapshots():
+    if METRICS_DIR is None:
+        return [registry.snapshot()]
+    flush()
+    snapshots = []
+    for path in glob.glob(os.path.join(METRICS_DIR, 'metrics-*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # being replaced
+    return snapshots
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def render():
+    counters, histograms, buckets = {}, {}, {}
+    in_flight = 0
+    for snapshot in _snapshots():
+        # A dead worker's counts stay in the totals; its in-flight requests do not
+        if snapshot['pid'] == os.getpid() or _alive(snapshot['pid']):
+            in_flight += snapshot['in_flight']
+        buckets.update(snapshot['buckets'])
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, row in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(row))
+            for i, value in enumerate(row):
+                total[i] += value
+
+    lines = []
+    for name, (kind, text) in HELP.items():
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if name == 'http_requests_in_flight':
+            lines.append(f'{name} {in_flight}')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {value}')
+        for (metric, labels), row in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets[name], row):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {row[-1]}')
+            lines.append(f'{name}_sum{_labels(labels)} {row[-2]}')
+            lines.append(f'{name}_count{_labels(labels)} {row[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    if TOKEN is not None and request.headers.get('Authorization') != f'Bearer {TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,8 @@
+from models import db
+
+# Tables as db.create_all() used to create them. Existing tables are left
+# alone; on a fresh database this creates the current schema in one go.
+
+
+def upgrade(connection):
+    db.metadata.create_all(bind=connection)
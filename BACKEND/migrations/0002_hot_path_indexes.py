@@ -0,0 +1,27 @@
+from sqlalchemy import text
+from models import User, Course, Enrollment, Quiz, Question, QuizSubmission
+from migrations import create_index, model_index
+
+# Indexes for the lookups every page makes. The unique constraints on
+# (quiz_id, student_id) and (submission_id, question_id) already serve
+# QuizSubmission.quiz_id and QuizAnswer.submission_id.
+
+INDEXES = [
+    (User, 'ix_user_role'),                                   # notify_students
+    (Course, 'ix_course_teacher'),                            # teacher dashboard
+    (Enrollment, 'ix_enrollment_course'),                     # course fan-out, counters
+    (Quiz, 'ix_quiz_course'),                                 # /quizzes?course_id=, progress
+    (Quiz, 'ix_quiz_teacher'),                                # /quizzes?teacher_id=
+    (Question, 'ix_question_quiz'),                           # answer keys, quiz detail
+    (QuizSubmission, 'ix_quiz_submission_rank'),              # rankings from submissions
+    (QuizSubmission, 'ix_quiz_submission_student'),           # student progress
+]
+
+
+def upgrade(connection):
+    for model, name in INDEXES:
+        create_index(connection, model_index(model, name))
+    # Notification list, newest first; replaced in 0005
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_notification_recipient_timestamp ON notification (recipient_id, timestamp DESC)'
+    ))
@@ -0,0 +1,24 @@
+from sqlalchemy import select, insert, update, func, exists
+from models import User, Course, Enrollment, QuizSubmission, LeaderboardEntry
+
+# Fills leaderboard_entry and course.students on databases that had
+# submissions and enrollments before those were maintained.
+
+
+def upgrade(connection):
+    if not connection.execute(select(exists().select_from(LeaderboardEntry))).scalar():
+        connection.execute(insert(LeaderboardEntry).from_select(
+            ['quiz_id', 'student_id', 'student_name', 'score', 'time_taken', 'submitted_at'],
+            select(
+                QuizSubmission.quiz_id,
+                QuizSubmission.student_id,
+                User.name,
+                func.coalesce(QuizSubmission.score, 0),
+                QuizSubmission.time_taken,
+                QuizSubmission.submitted_at
+            ).join(User, User.id == QuizSubmission.student_id)
+        ))
+
+    connection.execute(update(Course).values(
+        students=select(func.count(Enrollment.id)).where(Enrollment.course_id == Course.id).scalar_subquery()
+    ))
@@ -0,0 +1,15 @@
+from sqlalchemy import select, update, func
+from models import User, Notification
+from migrations import add_column
+
+# Per-user count of unread notifications, kept by fanout.py and
+# routes/notifications.py.
+
+
+def upgrade(connection):
+    add_column(connection, User, 'unread_notifications')
+    connection.execute(update(User).values(
+        unread_notifications=select(func.count(Notification.id))
+        .where(Notification.recipient_id == User.id, Notification.is_read.is_(False))
+        .scalar_subquery()
+    ))
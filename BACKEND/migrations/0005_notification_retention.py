@@ -0,0 +1,12 @@
+from sqlalchemy import text
+from models import Notification, NotificationArchive
+from migrations import create_index, model_index
+
+# Notifications are listed and marked read by id now, and old read ones move
+# to notification_archive (retention.py).
+
+
+def upgrade(connection):
+    NotificationArchive.__table__.create(connection, checkfirst=True)
+    connection.execute(text('DROP INDEX IF EXISTS ix_notification_recipient_timestamp'))
+    create_index(connection, model_index(Notification, 'ix_notification_recipient'))
@@ -0,0 +1,14 @@
+from sqlalchemy import update
+from models import User, Course, MediaUpload
+from migrations import add_column
+
+# Uploads staged by requests and pushed by the worker (media.py), with a
+# status next to the image they fill in.
+
+
+def upgrade(connection):
+    MediaUpload.__table__.create(connection, checkfirst=True)
+    if add_column(connection, User, 'image_status'):
+        connection.execute(update(User).where(User.image.isnot(None)).values(image_status='ready'))
+    if add_column(connection, Course, 'thumbnail_status'):
+        connection.execute(update(Course).where(Course.thumbnail.isnot(None)).values(thumbnail_status='ready'))
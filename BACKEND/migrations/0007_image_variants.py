@@ -0,0 +1,10 @@
+from models import User, Course
+from migrations import add_column
+
+# URLs of the resized variants made by images.py. Images uploaded before
+# have none; clients fall back to the original.
+
+
+def upgrade(connection):
+    add_column(connection, User, 'image_variants')
+    add_column(connection, Course, 'thumbnail_variants')
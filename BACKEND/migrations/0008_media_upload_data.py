@@ -0,0 +1,22 @@
+import os
+from sqlalchemy import select, update
+from models import MediaUpload
+from migrations import add_column
+
+# Staged uploads move from the web process's disk into media_upload.data,
+# so a worker on another machine can read them. Files still waiting on
+# this machine are copied in; path keeps only the file name.
+
+
+def upgrade(connection):
+    if not add_column(connection, MediaUpload, 'data'):
+        return
+    waiting = connection.execute(
+        select(MediaUpload.id, MediaUpload.path).where(MediaUpload.status.in_(['pending', 'uploading', 'failed']))
+    ).all()
+    for upload_id, path in waiting:
+        values = {'path': os.path.basename(path)}
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                values['data'] = f.read()
+        connection.execute(update(MediaUpload).where(MediaUpload.id == upload_id).values(values))
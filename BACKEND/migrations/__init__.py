@@ -0,0 +1,95 @@
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+# Numbered schema migrations, applied in order and recorded in the
+# schema_migrations table:
+#
+#     flask --app app db-upgrade      apply pending migrations
+#     flask --app app db-status       list applied and pending ones
+#
+# A migration is a module NNNN_<name>.py in this package with an
+# upgrade(connection) function; each one runs in its own transaction.
+# 0001 creates whatever tables the models define, so on a fresh database
+# later migrations find their tables, columns and indexes already there and
+# must be written to skip them (add_column() and create_index() below).
+
+_MODULE_NAME = re.compile(r'^(\d{4})_(\w+)$')
+
+
+def discover():
+    # [(version, name, module)] sorted by version
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(info.name)
+        if match:
+            module = importlib.import_module(f'{__name__}.{info.name}')
+            found.append((int(match.group(1)), match.group(2), module))
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def _ensure_table(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(engine):
+    with engine.begin() as connection:
+        _ensure_table(connection)
+        return {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def pending(engine):
+    applied = applied_versions(engine)
+    return [(version, name, module) for version, name, module in discover() if version not in applied]
+
+
+def upgrade(engine, log=print):
+    # Returns the versions that were applied
+    done = []
+    for version, name, module in pending(engine):
+        log(f'Applying {version:04d}_{name}')
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                {'version': version, 'name': name, 'applied_at': datetime.now()}
+            )
+        done.append(version)
+    return done
+
+
+# Helpers for migrations
+
+def has_column(connection, table, column):
+    return any(c['name'] == column for c in inspect(connection).get_columns(table))
+
+
+def add_column(connection, model, name):
+    # Adds a column declared on model to its existing table, unless it is
+    # already there. Returns whether it was added.
+    table = model.__table__
+    if has_column(connection, table.name, name):
+        return False
+    preparer = connection.dialect.identifier_preparer
+    column = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column}')
+    return True
+
+
+def create_index(connection, index):
+    # index is a sqlalchemy Index declared on a model
+    index.create(connection, checkfirst=True)
+
+
+def model_index(model, name):
+    for index in model.__table__.indexes:
+        if index.name == name:
+            return index
+    raise LookupError(f'{model.__name__} has no index {name}')
@@ -10,6 +10,11 @@ class User(db.Model):
     password = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), nullable=False)
     image = db.Column(db.String(200), nullable=True)
+    image_status = db.Column(db.String(20), nullable=True)  # pending, ready, failed; see media.py
+    image_variants = db.Column(db.JSON, nullable=True)  # {grid|card|detail: {webp|jpeg: url}}
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see fanout.py
+
+    __table_args__ = (db.Index('ix_user_role', 'role'),)
 
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,12 +22,16 @@ class Course(db.Model):
     level = db.Column(db.String(20))
     description = db.Column(db.Text, nullable=False)
     thumbnail = db.Column(db.String(500), nullable=True)
+    thumbnail_status = db.Column(db.String(20), nullable=True)  # pending, ready, failed; see media.py
+    thumbnail_variants = db.Column(db.JSON, nullable=True)  # {grid|card|detail: {webp|jpeg: url}}
     youtube_link = db.Column(db.String(300), nullable=False)
     teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    students = db.Column(db.Integer, default=0)
+    students = db.Column(db.Integer, default=0)  # enrollment count, see counters.py
 
     teacher = db.relationship('User', backref='courses')
 
+    __table_args__ = (db.Index('ix_course_teacher', 'teacher_id'),)
+
 
 class Enrollment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -32,9 +41,11 @@ class Enrollment(db.Model):
 
     student = db.relationship('User', backref='enrollments')
     course = db.relationship('Course', backref='enrollments')
-    students = db.Column(db.Integer, default=0)
 
-    __table_args__ = (db.UniqueConstraint('student_id', 'course_id', name='unique_student_course'),)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='unique_student_course'),
+        db.Index('ix_enrollment_course', 'course_id', 'student_id'),
+    )
 
 
 class Notification(db.Model):
@@ -46,6 +57,58 @@ class Notification(db.Model):
     
     recipient = db.relationship('User', backref='notifications')
 
+    # Notifications of one user by id, for paging and mark-read up to an id
+    __table_args__ = (db.Index('ix_notification_recipient', 'recipient_id', 'id'),)
+
+
+class NotificationArchive(db.Model):
+    # Read notifications moved out of the notification table by retention.py;
+    # ids are kept from the original rows
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    is_read = db.Column(db.Boolean, default=True)
+    timestamp = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.now)
+
+class MediaUpload(db.Model):
+    # A file accepted by a request and staged in the database, pushed to the
+    # media backend later by worker.py (see media.py)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # avatar, thumbnail
+    target_id = db.Column(db.Integer, nullable=False)  # user id or course id, depending on kind
+    path = db.Column(db.String(500), nullable=False)  # file name under the worker's MEDIA_STAGING_DIR
+    data = db.Column(db.LargeBinary, nullable=True)  # staged bytes, cleared once uploaded
+    filename = db.Column(db.String(255), nullable=True)  # as sent by the client
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, uploading, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    url = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    available_at = db.Column(db.DateTime, default=datetime.now)  # next attempt, or end of the current lease
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_media_upload_status_available', 'status', 'available_at'),
+        db.Index('ix_media_upload_target', 'kind', 'target_id'),
+    )
+
+class NotificationEvent(db.Model):
+    # Outbox: written in the same transaction as the change that triggers it,
+    # expanded into Notification rows later by worker.py
+    id = db.Column(db.Integer, primary_key=True)
+    audience = db.Column(db.String(20), nullable=False)  # students, course, user
+    target_id = db.Column(db.Integer, nullable=True)  # course id or user id, depending on audience
+    message = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    available_at = db.Column(db.DateTime, default=datetime.now)  # next attempt not before this
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_notification_event_status_available', 'status', 'available_at'),)
+
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255))
@@ -59,6 +122,11 @@ class Quiz(db.Model):
     submissions = db.relationship('QuizSubmission', backref='quiz', cascade="all, delete-orphan")
     teacher = db.relationship('User', backref='created_quizzes')
 
+    __table_args__ = (
+        db.Index('ix_quiz_course', 'course_id'),
+        db.Index('ix_quiz_teacher', 'teacher_id'),
+    )
+
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
@@ -70,6 +138,8 @@ class Question(db.Model):
     # Relationships
     student_answers = db.relationship('QuizAnswer', backref='question', cascade="all, delete-orphan")
 
+    __table_args__ = (db.Index('ix_question_quiz', 'quiz_id'),)
+
 class QuizSubmission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
@@ -82,7 +152,25 @@ class QuizSubmission(db.Model):
     student = db.relationship('User', backref='quiz_submissions')
     answers = db.relationship('QuizAnswer', backref='submission', cascade="all, delete-orphan")
     
-    __table_args__ = (db.UniqueConstraint('quiz_id', 'student_id', name='unique_quiz_student'),)
+    # unique_quiz_student also serves lookups by quiz_id
+    __table_args__ = (
+        db.UniqueConstraint('quiz_id', 'student_id', name='unique_quiz_student'),
+        db.Index('ix_quiz_submission_rank', quiz_id, score.desc(), time_taken),
+        db.Index('ix_quiz_submission_student', 'student_id'),
+    )
+
+class LeaderboardEntry(db.Model):
+    # Materialized leaderboard, one row per submission. Kept up to date by
+    # submit_quiz and update_quiz_score so reads never sort QuizSubmission.
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    student_name = db.Column(db.String(100))
+    score = db.Column(db.Float, nullable=False, default=0)
+    time_taken = db.Column(db.Integer, nullable=False)
+    submitted_at = db.Column(db.DateTime)
+
+    # Matches the board order exactly, so top-N and rank lookups are index range scans
+    __table_args__ = (db.Index('ix_leaderboard_entry_rank', quiz_id, score.desc(), time_taken, student_id),)
 
 class QuizAnswer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -91,4 +179,11 @@ class QuizAnswer(db.Model):
     answer = db.Column(db.Text, nullable=False)  # Student's answer
     is_correct = db.Column(db.Boolean, default=False)  # Whether answer is correct
     
-    __table_args__ = (db.UniqueConstraint('submission_id', 'question_id', name='unique_submission_question'),)
\ No newline at end of file
+    # unique_submission_question also serves lookups by submission_id
+    __table_args__ = (db.UniqueConstraint('submission_id', 'question_id', name='unique_submission_question'),)
+
+class EntityVersion(db.Model):
+    # Change counters used for ETags, bumped by versions.py in the same
+    # transaction as the change (leaderboards: right after it commits)
+    name = db.Column(db.String(100), primary_key=True)  # e.g. 'quizzes'
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+from models import db, Notification
+
+# In-process pub/sub behind /notifications/<user_id>/stream. Notifications
+# are inserted by this process and by worker.py, so instead of hooking the
+# inserts one poller thread per process tails the notification table by id
+# and hands new rows to the queues of users that have a stream open. That
+# is one small query per SSE_POLL_INTERVAL for the whole process, however
+# many clients are connected, and none while nobody is. Commits that wrote
+# notifications in this process wake the poller right away.
+#
+# Delivery is best effort: on PostgreSQL a transaction that commits after a
+# later id may be passed over. The unread counter and the notification list
+# stay authoritative; the stream only saves the polling.
+
+POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', 2))
+QUEUE_SIZE = 100
+BATCH_SIZE = 5000
+
+
+class NotificationHub:
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = {}  # user id -> set of queues
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._app = None
+        self.last_id = None
+
+    def subscribe(self, user_id, app):
+        # Called in a request; anything committed after this returns is
+        # delivered to the queue
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            if self.last_id is None:
+                self.last_id = db.session.execute(select(func.coalesce(func.max(Notification.id), 0))).scalar()
+            self._subscribers.setdefault(user_id, set()).add(q)
+            if self._thread is None:
+                self._start(app)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(q)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, user_id, item):
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        for q in queues:
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                # The stream has fallen behind; replace what is queued with
+                # None so it closes and the client reconnects with
+                # Last-Event-ID to catch up
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                q.put_nowait(None)
+
+    def wake(self):
+        self._wake.set()
+
+    def _start(self, app):
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name='notification-hub', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not self.subscriber_count():
+                continue
+            try:
+                with self._app.app_context():
+                    self.poll()
+            except Exception:
+                import traceback
+                traceback.print_exc()
+
+    def poll(self):
+        # Hands every notification newer than last_id to its subscribers
+        while True:
+            rows = db.session.execute(
+                select(Notification.id, Notification.recipient_id, Notification.message, Notification.timestamp)
+                .where(Notification.id > self.last_id)
+                .order_by(Notification.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            db.session.rollback()
+            for row in rows:
+                self.publish(row.recipient_id, serialize(row))
+            if rows:
+                self.last_id = rows[-1].id
+            if len(rows) < BATCH_SIZE:
+                return
+
+
+def serialize(row):
+    # Same fields as GET /notifications/<user_id>
+    return {
+        'id': row.id,
+        'message': row.message,
+        'is_read': False,
+        'timestamp': row.timestamp.strftime('%Y-%m-%d %H:%M'),
+    }
+
+
+hub = NotificationHub()
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('notifications_written', False):
+        hub.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('notifications_written', None)
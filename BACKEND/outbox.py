@@ -0,0 +1,93 @@
+import os
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from models import db, NotificationEvent
+from fanout import notify_students, notify_course_students, notify_users
+
+# Request handlers only record *that* somebody must be notified, as one
+# NotificationEvent in their own transaction. worker.py expands the events
+# into Notification rows afterwards, so request latency does not depend on
+# the size of the audience.
+
+BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', 30))  # seconds, doubled after every failure
+
+AUDIENCES = {
+    'students': lambda event: notify_students(event.message, event.created_at),
+    'course': lambda event: notify_course_students(event.target_id, event.message, event.created_at),
+    'user': lambda event: notify_users([event.target_id], event.message, event.created_at),
+}
+
+
+def enqueue_notification(audience, message, target_id=None):
+    # Adds the event to the current session; the caller commits it together
+    # with whatever change it describes
+    if audience not in AUDIENCES:
+        raise ValueError(f'Unknown notification audience: {audience}')
+    event = NotificationEvent(audience=audience, target_id=target_id, message=message)
+    db.session.add(event)
+    return event
+
+
+def _expand(event_id):
+    # Claim and expand in one transaction: if the worker dies half way the
+    # claim is rolled back with the notifications and the event stays pending.
+    # A concurrent worker that lost the race sees rowcount 0 and skips it.
+    claimed = db.session.execute(
+        update(NotificationEvent)
+        .where(NotificationEvent.id == event_id, NotificationEvent.status == 'pending')
+        .values(status='done', processed_at=datetime.now())
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        return 0
+
+    event = db.session.get(NotificationEvent, event_id)
+    written = AUDIENCES[event.audience](event)
+    db.session.commit()
+    return written
+
+
+def _record_failure(event_id, error):
+    event = db.session.get(NotificationEvent, event_id)
+    event.attempts += 1
+    event.last_error = error
+    if event.attempts >= MAX_ATTEMPTS:
+        event.status = 'failed'
+    else:
+        event.available_at = datetime.now() + timedelta(seconds=RETRY_DELAY * 2 ** (event.attempts - 1))
+    db.session.commit()
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    # Expands up to batch_size due events, oldest first. Returns how many
+    # events were looked at so the worker knows whether to sleep.
+    event_ids = db.session.execute(
+        select(NotificationEvent.id)
+        .where(NotificationEvent.status == 'pending', NotificationEvent.available_at <= datetime.now())
+        .order_by(NotificationEvent.id)
+        .limit(batch_size)
+    ).scalars().all()
+    db.session.rollback()
+
+    for event_id in event_ids:
+        try:
+            _expand(event_id)
+        except Exception:
+            db.session.rollback()
+            traceback.print_exc()
+            _record_failure(event_id, traceback.format_exc(limit=5))
+    return len(event_ids)
+
+
+def retry_failed():
+    # Puts events that ran out of attempts back in the queue
+    result = db.session.execute(
+        update(NotificationEvent)
+        .where(NotificationEvent.status == 'failed')
+        .values(status='pending', attempts=0, available_at=datetime.now())
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask_bcrypt import Bcrypt
+
+# Password hashing with bcrypt (BCRYPT_LOG_ROUNDS, default 12). Hashes run
+# on a small pool of threads, PASSWORD_HASH_WORKERS of them (default: one per
+# CPU); bcrypt releases the GIL, so they use real cores while the request
+# thread waits. At most PASSWORD_HASH_QUEUE hashes may be running or waiting
+# per process; beyond that hash_password/check_password raise HashingBusy
+# at once, which the routes answer with 503, instead of letting a login
+# burst tie up every gunicorn thread behind the CPU.
+#
+# Accounts created before bcrypt have an unsalted SHA-256 hex digest; it is
+# still accepted and replaced with a bcrypt hash on the next login. So are
+# bcrypt hashes with a lower cost than the configured one.
+#
+# In a gevent worker threading is monkey-patched, so a ThreadPoolExecutor
+# would run hashes on greenlets and every hash would stall all requests of
+# the worker. gevent's own executor is used there; it runs on OS threads.
+
+bcrypt = Bcrypt()
+
+MAX_PASSWORD_BYTES = 72  # bcrypt ignores (bcrypt>=5: rejects) anything longer
+WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE', WORKERS * 4))
+WAIT_SECONDS = float(os.getenv('PASSWORD_HASH_WAIT', 0.5))  # for a free slot, before HashingBusy
+
+_LEGACY_HASH = re.compile(r'^[0-9a-f]{64}$')
+_BCRYPT_COST = re.compile(r'^\$2[abxy]?\$(\d\d)\$')
+
+
+def _executor():
+    # gevent.monkey is only loaded when something patched with it
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched('threading'):
+        from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+        return NativeThreadPoolExecutor(max_workers=WORKERS)
+    return ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='password-hash')
+
+
+_pool = _executor()
+_slots = threading.BoundedSemaphore(QUEUE_SIZE)
+_dummy_hash = None
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def init_app(app):
+    app.config.setdefault('BCRYPT_LOG_ROUNDS', int(os.getenv('BCRYPT_LOG_ROUNDS', 12)))
+    bcrypt.init_app(app)
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=WAIT_SECONDS):
+        raise HashingBusy()
+    try:
+        return _pool.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def _hash(password):
+    return bcrypt.generate_password_hash(password).decode()
+
+
+def _check(stored, password):
+    # Returns (matches, new hash to store or None)
+    if _LEGACY_HASH.match(stored):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        if not hmac.compare_digest(stored, legacy):
+            return False, None
+        # Passwords bcrypt cannot take keep their old hash
+        return True, None if too_long(password) else _hash(password)
+
+    try:
+        if not bcrypt.check_password_hash(stored, password):
+            return False, None
+    except ValueError:
+        # Not a bcrypt hash, or a password bcrypt cannot take
+        return False, None
+    cost = _BCRYPT_COST.match(stored)
+    if cost and int(cost.group(1)) < bcrypt._log_rounds:
+        return True, _hash(password)
+    return True, None
+
+
+def too_long(password):
+    return len(password.encode()) > MAX_PASSWORD_BYTES
+
+
+def hash_password(password):
+    return _run(_hash, password)
+
+
+def check_password(stored, password):
+    # (matches, new hash or None). stored may be None for an unknown user;
+    # a dummy hash is checked then so the answer takes as long either way.
+    global _dummy_hash
+    if stored is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(os.urandom(16).hex())
+        _run(_check, _dummy_hash, password)
+        return False, None
+    return _run(_check, stored, password)
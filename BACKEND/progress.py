@@ -0,0 +1,76 @@
+from sqlalchemy import select, func
+from models import db, Quiz, QuizSubmission, Course, Enrollment
+
+# Per-student progress: every submission with its quiz and course, plus
+# per-course aggregates, in two indexed queries. Not cached: submissions,
+# rescoring, regrades, enrollment and new quizzes all change it, from any
+# gunicorn worker, and a student expects to see a submission right away.
+
+
+def _format_time(value, fmt='%Y-%m-%d %H:%M'):
+    return value.strftime(fmt) if value else None
+
+
+def student_submissions(student_id):
+    # Submissions joined to their quiz and course in one statement
+    return db.session.execute(
+        select(
+            QuizSubmission.quiz_id,
+            QuizSubmission.submitted_at,
+            QuizSubmission.time_taken,
+            QuizSubmission.score,
+            Quiz.title,
+            Quiz.course_id,
+            Course.title.label('course_title')
+        )
+        .outerjoin(Quiz, Quiz.id == QuizSubmission.quiz_id)
+        .outerjoin(Course, Course.id == Quiz.course_id)
+        .where(QuizSubmission.student_id == student_id)
+        .order_by(QuizSubmission.id)
+    ).all()
+
+
+def student_progress(student_id):
+    submissions = student_submissions(student_id)
+
+    # Quizzes available in each enrolled course
+    available = db.session.execute(
+        select(Course.id, Course.title, func.count(Quiz.id))
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .outerjoin(Quiz, Quiz.course_id == Course.id)
+        .where(Enrollment.student_id == student_id)
+        .group_by(Course.id, Course.title)
+    ).all()
+
+    courses = {
+        course_id: {'course_id': course_id, 'title': title, 'quizzes_available': count, 'quizzes_attempted': 0, 'scores': []}
+        for course_id, title, count in available
+    }
+    for sub in submissions:
+        course = courses.setdefault(sub.course_id, {
+            'course_id': sub.course_id, 'title': sub.course_title, 'quizzes_available': None, 'quizzes_attempted': 0, 'scores': []
+        })
+        course['quizzes_attempted'] += 1
+        if sub.score is not None:
+            course['scores'].append(sub.score)
+
+    course_list = []
+    for course in courses.values():
+        scores = course.pop('scores')
+        course['average_score'] = round(sum(scores) / len(scores), 2) if scores else None
+        course['best_score'] = max(scores) if scores else None
+        course_list.append(course)
+
+    return {
+        'student_id': student_id,
+        'submissions': [{
+            'quiz_id': sub.quiz_id,
+            'title': sub.title or 'Untitled',
+            'course_id': sub.course_id,
+            'course_title': sub.course_title,
+            'submitted_at': _format_time(sub.submitted_at),
+            'time_taken': sub.time_taken,
+            'score': sub.score
+        } for sub in submissions],
+        'courses': course_list
+    }
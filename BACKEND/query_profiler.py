@@ -0,0 +1,193 @@
+import functools
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Statement profiling on SQLAlchemy engine events.
+#
+#     with query_profiler.profile() as profile:
+#         ...
+#     profile.repeated()   # [(shape, count)] run N_PLUS_ONE_THRESHOLD+ times
+#
+# Statements are grouped by shape: whitespace collapsed, literals replaced
+# by ?, and IN/VALUES lists of any length folded into (?...), so
+# "SELECT ... WHERE user.id = ?" run once per row of an earlier result
+# shows up as one shape with a high count, the usual N+1.
+#
+# QUERY_PROFILE=1 profiles every request: responses get an X-Query-Count
+# header and requests with a repeated shape print a report. Independently,
+# statements slower than SLOW_QUERY_MS (default 200, 0 turns it off) are
+# printed with their query plan. Their parameters hold emails, password
+# hashes and the like, so they are only printed under QUERY_PROFILE; so are
+# the plans of databases whose EXPLAIN shows bound values (all but SQLite).
+#
+# In tests and benchmarks, assert_query_budget() fails a block that runs
+# more statements than allowed:
+#
+#     with query_profiler.assert_query_budget(3, repeats=1):
+#         client.get(f'/quiz/{quiz_id}/submissions')
+
+PROFILE_REQUESTS = os.getenv('QUERY_PROFILE', '0') not in ('0', 'false', '')
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_LISTS = re.compile(rf'\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)')
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+# Profiles the current statements are recorded into; nested profile() blocks all see them
+_active = ContextVar('query_profiles', default=())
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize(statement):
+    shape = _LITERALS.sub('?', ' '.join(statement.split()))
+    return _LISTS.sub('(?...)', shape)
+
+
+class QueryProfile:
+    def __init__(self):
+        self.statements = []  # (shape, statement, parameters, seconds)
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def seconds(self):
+        return sum(row[3] for row in self.statements)
+
+    def shapes(self):
+        # {shape: [count, seconds]}, most frequent first
+        groups = {}
+        for shape, _, _, seconds in self.statements:
+            group = groups.setdefault(shape, [0, 0.0])
+            group[0] += 1
+            group[1] += seconds
+        return dict(sorted(groups.items(), key=lambda item: -item[1][0]))
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return [(shape, count) for shape, (count, _) in self.shapes().items() if count >= threshold]
+
+    def report(self, limit=10):
+        lines = [f'{len(self)} statements, {self.seconds * 1000:.1f} ms']
+        for shape, (count, seconds) in list(self.shapes().items())[:limit]:
+            lines.append(f'  {count:>4}x {seconds * 1000:>8.1f} ms  {shape[:200]}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profile():
+    profile = QueryProfile()
+    token = _active.set(_active.get() + (profile,))
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_query_budget(statements, repeats=None):
+    # AssertionError when the block runs more than `statements` statements,
+    # or one statement shape more than `repeats` times
+    with profile() as result:
+        yield result
+    if len(result) > statements:
+        raise AssertionError(f'Query budget of {statements} exceeded\n{result.report()}')
+    if repeats is not None and result.repeated(repeats + 1):
+        raise AssertionError(f'A statement ran more than {repeats} times\n{result.report()}')
+
+
+def _pool_exhausted(pool):
+    # Checking out another connection would wait for pool_timeout
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return False
+    return pool.checkedin() == 0 and pool.overflow() >= pool._max_overflow
+
+
+def explain(engine, statement, parameters):
+    # Query plan lines, from a separate connection so a failing EXPLAIN
+    # cannot break the caller's transaction. Skipped rather than queueing
+    # for a connection when the pool has none left.
+    if _pool_exhausted(engine.pool):
+        return ['EXPLAIN skipped: no free connection in the pool']
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    connection = None
+    try:
+        connection = engine.raw_connection()
+        cursor = connection.cursor()
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+def _log_slow(conn, statement, parameters, executemany, seconds):
+    print(f'Slow query ({seconds * 1000:.1f} ms): {" ".join(statement.split())}')
+    if PROFILE_REQUESTS:
+        print(f'  parameters: {parameters!r}'[:500])
+    else:
+        print('  parameters: (hidden, set QUERY_PROFILE=1 to print them)')
+    if executemany or statement.lstrip().split(None, 1)[0].upper() not in _EXPLAINABLE:
+        return
+    if not PROFILE_REQUESTS and conn.engine.dialect.name != 'sqlite':
+        return
+    for line in explain(conn.engine, statement, parameters):
+        print(f'  plan: {line}')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profiler_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not hasattr(context, '_profiler_start'):
+        return
+    seconds = time.perf_counter() - context._profiler_start
+    profiles = _active.get()
+    if profiles:
+        row = (normalize(statement), statement, parameters, seconds)
+        for profile in profiles:
+            profile.statements.append(row)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        _log_slow(conn, statement, parameters, executemany, seconds)
+
+
+def _before_request():
+    g._query_profile = profile()
+    g._query_profile_result = g._query_profile.__enter__()
+
+
+def _after_request(response):
+    result = g.get('_query_profile_result')
+    if result is None:
+        return response
+    response.headers['X-Query-Count'] = str(len(result))
+    if result.repeated():
+        print(f'Possible N+1 in {request.method} {request.full_path.rstrip("?")}: {result.report()}')
+    return response
+
+
+def _teardown_request(exc):
+    manager = g.pop('_query_profile', None)
+    if manager is not None:
+        manager.__exit__(None, None, None)
+
+
+def init_app(app):
+    if PROFILE_REQUESTS:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_teardown_request)
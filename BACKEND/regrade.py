@@ -0,0 +1,137 @@
+import os
+import time
+import numpy as np
+from sqlalchemy import select, update, bindparam, func
+from models import db, QuizSubmission, QuizAnswer
+from answer_keys import get_answer_key, option_number, invalidate as invalidate_answer_key
+from leaderboard import rebuild_leaderboard
+
+# Regrades every submission of a quiz against its current answer key.
+# QuizAnswer rows are read in id-ordered chunks of plain columns and scored
+# as NumPy arrays; only rows whose result changed are written back, with
+# executemany UPDATEs. Scores are recomputed from the automatically graded
+# answers, so manual score changes for the quiz are replaced.
+
+CHUNK_SIZE = int(os.getenv('REGRADE_CHUNK_SIZE', 50000))
+NO_OPTION = -1
+
+
+def _compile_key(answer_key):
+    # Sorted question ids plus, at the same positions, the correct option
+    # (NO_OPTION when the question is not graded automatically)
+    items = sorted(answer_key.questions.items())
+    question_ids = np.array([qid for qid, _ in items], dtype=np.int64)
+    correct = np.array([
+        option if qtype == 'mcq' and option is not None else NO_OPTION
+        for _, (qtype, option) in items
+    ], dtype=np.int64)
+    return question_ids, correct
+
+
+def _parse_answers(answers):
+    # The option each stored answer names, by the same rule submissions are
+    # graded with (answer_keys.option_number); NO_OPTION for anything else.
+    # Answers repeat a lot, so each distinct text is parsed once.
+    options = {}
+    for text in set(answers):
+        option = option_number(text)
+        options[text] = NO_OPTION if option is None else option
+    return np.array([options[text] for text in answers], dtype=np.int64)
+
+
+def _score_chunk(rows, question_ids, correct):
+    ids, submissions, answered, answers, was_correct = zip(*rows)
+    answer_ids = np.array(ids, dtype=np.int64)
+    submission_ids = np.array(submissions, dtype=np.int64)
+    answered = np.array(answered, dtype=np.int64)
+    was_correct = np.array(was_correct, dtype=bool)
+    given = _parse_answers(answers)
+
+    if len(question_ids):
+        pos = np.minimum(np.searchsorted(question_ids, answered), len(question_ids) - 1)
+        expected = np.where(question_ids[pos] == answered, correct[pos], NO_OPTION)
+    else:
+        expected = np.full(len(rows), NO_OPTION, dtype=np.int64)
+    is_correct = (expected != NO_OPTION) & (given == expected)
+    return answer_ids, submission_ids, is_correct, was_correct
+
+
+def regrade_quiz(quiz_id, chunk_size=CHUNK_SIZE, progress=None):
+    # progress, if given, is called as progress(answers_done, answers_total)
+    started = time.perf_counter()
+    invalidate_answer_key(quiz_id)
+    question_ids, correct = _compile_key(get_answer_key(quiz_id))
+    total_questions = len(question_ids)
+
+    submissions = db.session.execute(
+        select(QuizSubmission.id, QuizSubmission.score)
+        .where(QuizSubmission.quiz_id == quiz_id)
+        .order_by(QuizSubmission.id)
+    ).all()
+    submission_ids = np.array([s.id for s in submissions], dtype=np.int64)
+    old_scores = np.array([s.score if s.score is not None else np.nan for s in submissions], dtype=np.float64)
+    correct_counts = np.zeros(len(submissions), dtype=np.int64)
+
+    answers_total = db.session.execute(
+        select(func.count(QuizAnswer.id))
+        .join(QuizSubmission, QuizSubmission.id == QuizAnswer.submission_id)
+        .where(QuizSubmission.quiz_id == quiz_id)
+    ).scalar()
+
+    # Plain Core rows, without going through the ORM result machinery
+    connection = db.session.connection()
+    set_is_correct = update(QuizAnswer).where(QuizAnswer.id == bindparam('answer_id')).values(is_correct=bindparam('value'))
+    answers_done = 0
+    answers_changed = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(QuizAnswer.id, QuizAnswer.submission_id, QuizAnswer.question_id, QuizAnswer.answer, QuizAnswer.is_correct)
+            .join(QuizSubmission, QuizSubmission.id == QuizAnswer.submission_id)
+            .where(QuizSubmission.quiz_id == quiz_id, QuizAnswer.id > last_id)
+            .order_by(QuizAnswer.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        answer_ids, answer_submissions, is_correct, was_correct = _score_chunk(rows, question_ids, correct)
+        positions = np.searchsorted(submission_ids, answer_submissions)
+        correct_counts += np.bincount(positions, weights=is_correct, minlength=len(submission_ids)).astype(np.int64)
+
+        changed = np.flatnonzero(is_correct != was_correct)
+        if len(changed):
+            connection.execute(set_is_correct, [
+                {'answer_id': int(answer_ids[i]), 'value': bool(is_correct[i])} for i in changed
+            ])
+        answers_changed += len(changed)
+        answers_done += len(rows)
+        if progress:
+            progress(answers_done, answers_total)
+
+    if total_questions:
+        new_scores = correct_counts / total_questions * 100
+    else:
+        new_scores = np.zeros(len(submissions))
+    changed_scores = np.flatnonzero(~np.isclose(new_scores, old_scores))
+    if len(changed_scores):
+        set_score = update(QuizSubmission).where(QuizSubmission.id == bindparam('submission_id')).values(score=bindparam('value'))
+        for start in range(0, len(changed_scores), chunk_size):
+            connection.execute(set_score, [
+                {'submission_id': int(submission_ids[i]), 'value': float(new_scores[i])}
+                for i in changed_scores[start:start + chunk_size]
+            ])
+
+    # Commits the answer and score updates together with the new board
+    rebuild_leaderboard(quiz_id)
+
+    return {
+        'quiz_id': quiz_id,
+        'questions': total_questions,
+        'submissions': len(submissions),
+        'answers': answers_done,
+        'answers_changed': answers_changed,
+        'scores_changed': len(changed_scores),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
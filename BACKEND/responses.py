@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+from datetime import datetime
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib json, same output
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# JSON encoding and compression for every response. init_app() makes
+# jsonify encode with orjson when it is installed, and compresses JSON and
+# text bodies of COMPRESS_MIN_SIZE bytes or more with brotli or gzip,
+# whichever the client accepts (brotli first).
+#
+# orjson writes non-ASCII characters as UTF-8 rather than \u escapes;
+# otherwise the output is the same as the stdlib encoder's.
+#
+# Datetimes can be handed to jsonify as they are: they come out as
+# 'YYYY-MM-DD HH:MM:SS', the format the routes used to strftime by hand,
+# formatted by isoformat(), which is much cheaper than strftime.
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # bytes
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))  # 0-11; 4 suits dynamic bodies
+COMPRESSIBLE = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    return DefaultJSONProvider.default(value)
+
+
+class JSONProvider(DefaultJSONProvider):
+    default = staticmethod(_encode_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', self.default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options()) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _options(self):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        body = brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity ones; versions.conditional
+    # compares If-None-Match weakly, so the weak tag still gets a 304
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.json = JSONProvider(app)
+    app.after_request(compress)
@@ -0,0 +1,61 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete
+from models import db, Notification, NotificationArchive
+
+# Moves read notifications older than NOTIFICATION_RETENTION_DAYS from the
+# notification table to notification_archive, in batches that each commit on
+# their own so the table is never locked for long. Unread notifications stay
+# however old they are.
+#
+# Rows are walked in id order, which is also insertion order, and the walk
+# stops at the first batch that is entirely newer than the cutoff; so a run
+# reads only the old part of the table through the primary key and needs
+# no index on timestamp.
+
+RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+BATCH_SIZE = int(os.getenv('NOTIFICATION_ARCHIVE_BATCH', 1000))
+
+ARCHIVE_COLUMNS = ['id', 'recipient_id', 'message', 'is_read', 'timestamp', 'archived_at']
+
+
+def archive_notifications(days=RETENTION_DAYS, batch_size=BATCH_SIZE, now=None):
+    # Returns the number of notifications archived
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=days)
+    archived = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Notification.id, Notification.is_read, Notification.timestamp)
+            .where(Notification.id > last_id)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        old = [row for row in rows if row.timestamp is not None and row.timestamp < cutoff]
+        ids = [row.id for row in old if row.is_read]
+        if ids:
+            db.session.execute(insert(NotificationArchive).from_select(
+                ARCHIVE_COLUMNS,
+                select(
+                    Notification.id,
+                    Notification.recipient_id,
+                    Notification.message,
+                    Notification.is_read,
+                    Notification.timestamp,
+                    db.literal(now, NotificationArchive.archived_at.type)
+                ).where(Notification.id.in_(ids))
+            ))
+            db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+            db.session.commit()
+            archived += len(ids)
+        else:
+            db.session.rollback()
+
+        if not old:
+            break
+    return archived
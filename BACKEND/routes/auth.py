@@ -1,23 +1,13 @@
 from flask import Blueprint, request, jsonify
 from models import db, User
+from passwords import hash_password, check_password, too_long, HashingBusy
 import re
-import hashlib
 import os
-from dotenv import load_dotenv
-from werkzeug.utils import secure_filename
-from flask import current_app
-import cloudinary
-import cloudinary.uploader
+from werkzeug.exceptions import RequestEntityTooLarge
+from media import stage_upload
 
 
 auth_bp = Blueprint('auth', __name__)
-load_dotenv()
-
-cloudinary.config(
-    cloud_name=os.getenv("cloud_name"),
-    api_key=os.getenv("api_key"),
-    api_secret=os.getenv("api_secret")
-)
 
 def is_valid_email(email):
     return re.match(r".+@(gmail|yahoo|outlook)\.com$", email)
@@ -25,6 +15,11 @@ def is_valid_email(email):
 def is_strong_password(pw):
     return re.match(r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@$!%*?&]).{8,}$', pw)
 
+def busy_response():
+    response = jsonify({'error': 'Server is busy, please try again'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
@@ -37,8 +32,6 @@ def signup():
         name = data.get('name')
         image_file = request.files.get('image')  # Optional file
 
-        print("Form Data:", email, password, role, name)
-
         # 2. Basic validations
         if not email or not password or not role:
             return jsonify({'error': 'Missing required fields'}), 400
@@ -46,32 +39,37 @@ def signup():
             return jsonify({'error': 'Invalid email'}), 400
         if not is_strong_password(password):
             return jsonify({'error': 'Weak password'}), 400
+        if too_long(password):
+            return jsonify({'error': 'Password is too long'}), 400
         if User.query.filter_by(email=email).first():
             return jsonify({'error': 'Email already exists'}), 400
 
         # 3. Hash password
-        hashed = hashlib.sha256(password.encode()).hexdigest()
+        hashed = hash_password(password)
 
-        # 4. Upload image to Cloudinary
-        image_url = None
-        if image_file:
-            result = cloudinary.uploader.upload(image_file)
-            image_url = result.get("secure_url")
-
-        # 5. Create user
+        # 4. Create user
         user = User(
             email=email,
             password=hashed,
             role=role,
-            name=name,
-            image=image_url
+            name=name
         )
-
         db.session.add(user)
+
+        # 5. Stage the image; the worker uploads it and sets user.image
+        if image_file:
+            db.session.flush()
+            stage_upload('avatar', user, image_file)
+
         db.session.commit()
 
-        return jsonify({'message': 'Signup successful'})
+        return jsonify({'message': 'Signup successful', 'image_status': user.image_status})
 
+    except HashingBusy:
+        return busy_response()
+    except RequestEntityTooLarge as e:
+        db.session.rollback()
+        return jsonify({'error': e.description}), 413
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -81,17 +79,27 @@ def signup():
 def login():
     data = request.json
     email = data['email']
-    password = hashlib.sha256(data['password'].encode()).hexdigest()
 
-    user = User.query.filter_by(email=email, password=password).first()
-    if not user:
+    user = User.query.filter_by(email=email).first()
+    try:
+        valid, new_hash = check_password(user.password if user else None, data['password'])
+    except HashingBusy:
+        return busy_response()
+    if not valid:
         return jsonify({'error': 'Invalid credentials'}), 401
 
+    # Old SHA-256 or lower-cost hash: store the current kind
+    if new_hash:
+        user.password = new_hash
+        db.session.commit()
+
     return jsonify({'message': 'Login successful', 'user': {
         'name' : user.name,
         'id': user.id,
         'role': user.role,
         'email': user.email,
-        'image': user.image
+        'image': user.image,
+        'image_status': user.image_status,
+        'image_variants': user.image_variants
     }})
     
@@ -1,18 +1,14 @@
 from flask import Blueprint, request, jsonify
-from models import db, User, Course, Enrollment, Notification
+from models import db, User, Course, Enrollment
+from outbox import enqueue_notification
+from counters import change_student_count
+from werkzeug.exceptions import RequestEntityTooLarge
+from media import stage_upload
+import versions
+from sqlalchemy.exc import IntegrityError
 import os
-from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
 
 course_bp = Blueprint('course', __name__)
-load_dotenv()
-
-cloudinary.config(
-    cloud_name=os.getenv("cloud_name"),
-    api_key=os.getenv("api_key"),
-    api_secret=os.getenv("api_secret")
-)
 
 
 @course_bp.route('/create-course', methods=['POST'])
@@ -34,33 +30,29 @@ def create_course():
         if not all([title, description, teacher_id]):
             return jsonify({'error': 'Missing required fields'}), 400
 
-        thumbnail_url = None
-        if thumbnail_file:
-            upload_result = cloudinary.uploader.upload(thumbnail_file)
-            thumbnail_url = upload_result['secure_url']
-
         new_course = Course(
             title=title,
             description=description,
-            thumbnail=thumbnail_url,
             teacher_id=teacher_id,
             youtube_link=youtube_link
         )
         db.session.add(new_course)
 
+        # Staged here, uploaded by the worker
+        if thumbnail_file:
+            db.session.flush()
+            stage_upload('thumbnail', new_course, thumbnail_file)
+
         # Notify all students
-        students = User.query.filter_by(role='student').all()
-        for student in students:
-            notif = Notification(
-                recipient_id=student.id,
-                message=f'New course uploaded: {title}',
-                is_read=False
-            )
-            db.session.add(notif)
-        
+        enqueue_notification('students', f'New course uploaded: {title}')
+
         db.session.commit()
-        return jsonify({'message': 'Course created successfully'})
+        return jsonify({'message': 'Course created successfully', 'id': new_course.id,
+                        'thumbnail_status': new_course.thumbnail_status})
 
+    except RequestEntityTooLarge as e:
+        db.session.rollback()
+        return jsonify({'error': e.description}), 413
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -75,40 +67,61 @@ def enroll_in_course(course_id):
     if not student_id:
         return jsonify({'error': 'Missing student ID'}), 400
 
-    # Prevent duplicate
-    if Enrollment.query.filter_by(student_id=student_id, course_id=course_id).first():
-        return jsonify({'error': 'Already enrolled'}), 400
+    course = db.session.get(Course, course_id)
+    if not course:
+        return jsonify({'error': 'Course not found'}), 404
 
+    # Prevent duplicate; the unique constraint also catches concurrent requests
     enrollment = Enrollment(student_id=student_id, course_id=course_id)
     db.session.add(enrollment)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Already enrolled'}), 400
 
-    # Increment student count
-    course = Course.query.get(course_id)
-    if course.students is None:
-        course.students = 1
-    else:
-        course.students += 1
+    # Increment student count in SQL so concurrent enrollments cannot overwrite each other
+    change_student_count(course_id, 1)
 
     # Notify teacher
-    notification = Notification(
-        recipient_id=course.teacher_id,
-        message=f"A student has enrolled in your course: {course.title}"
-    )
-    db.session.add(notification)
+    enqueue_notification('user', f"A student has enrolled in your course: {course.title}", course.teacher_id)
 
     db.session.commit()
 
     return jsonify({'message': 'Enrolled successfully'})
 
 
+@course_bp.route('/unenroll/<int:course_id>', methods=['POST'])
+def unenroll_from_course(course_id):
+    data = request.get_json()
+    student_id = data.get('student_id')
+
+    if not student_id:
+        return jsonify({'error': 'Missing student ID'}), 400
+
+    removed = Enrollment.query.filter_by(student_id=student_id, course_id=course_id).delete()
+    if not removed:
+        db.session.rollback()
+        return jsonify({'error': 'Not enrolled'}), 404
+
+    change_student_count(course_id, -1)
+    db.session.commit()
+
+    return jsonify({'message': 'Unenrolled successfully'})
+
+
 @course_bp.route('/course/<int:id>')
+@versions.conditional(lambda id: [f'course:{id}'])
 def get_course_by_id(id):
     course = Course.query.get(id)
     return jsonify({
         'id': course.id,
         'title': course.title,
         'description': course.description,
-        'youtube_link': course.youtube_link
+        'youtube_link': course.youtube_link,
+        'thumbnail': course.thumbnail,
+        'thumbnail_status': course.thumbnail_status,
+        'thumbnail_variants': course.thumbnail_variants
     })
 
 
@@ -132,7 +145,9 @@ def get_course(course_id):
         'youtube_link': course.youtube_link,
         'teacher_id': int(course.teacher_id),
         'enrolled': enrolled,
-        'thumbnail': course.thumbnail
+        'thumbnail': course.thumbnail,
+        'thumbnail_status': course.thumbnail_status,
+        'thumbnail_variants': course.thumbnail_variants
     })
 
 
@@ -167,12 +182,14 @@ def update_course(course_id):
         if youtube_link:
             course.youtube_link = youtube_link
         if thumbnail_file:
-            upload_result = cloudinary.uploader.upload(thumbnail_file)
-            course.thumbnail = upload_result['secure_url']
+            stage_upload('thumbnail', course, thumbnail_file)
 
         db.session.commit()
-        return jsonify({'message': 'Course updated successfully'})
+        return jsonify({'message': 'Course updated successfully', 'thumbnail_status': course.thumbnail_status})
 
+    except RequestEntityTooLarge as e:
+        db.session.rollback()
+        return jsonify({'error': e.description}), 413
     except Exception as e:
         import traceback
         traceback.print_exc()
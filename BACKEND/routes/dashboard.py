@@ -1,19 +1,26 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy import and_
 from models import db, Course, User, Enrollment
+import versions
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+CATALOG_PAGE_SIZE = 24
+CATALOG_MAX_PAGE_SIZE = 100
+DESCRIPTION_PREVIEW = 160  # characters of description sent in list views
+
 @dashboard_bp.route('/dashboard/student', methods=['GET'])
 def student_dashboard():
     student_id = request.args.get('student_id')
     if not student_id:
         return jsonify({'error': 'Missing student ID'}), 400
 
-    enrolled_ids = [e.course_id for e in Enrollment.query.filter_by(student_id=student_id).all()]
+    enrolled_ids = [course_id for (course_id,) in db.session.query(Enrollment.course_id).filter_by(student_id=student_id)]
+    enrolled_set = set(enrolled_ids)
     
-    all_courses = Course.query.all() 
+    all_courses = db.session.query(Course.id, Course.title, Course.description, Course.thumbnail, Course.thumbnail_variants).all()
 
-    enrolled_courses_details = [c for c in all_courses if c.id in enrolled_ids]
+    enrolled_courses_details = [c for c in all_courses if c.id in enrolled_set]
 
     return jsonify({
         'enrolled': enrolled_ids,
@@ -21,36 +28,90 @@ def student_dashboard():
             'id': c.id,
             'title': c.title,
             'description': c.description,
-            'thumbnail': c.thumbnail
+            'thumbnail': c.thumbnail,
+            'thumbnail_variants': c.thumbnail_variants
         } for c in enrolled_courses_details],
         'courses': [{
             'id': c.id,
             'title': c.title,
             'description': c.description,
-            'thumbnail': c.thumbnail
+            'thumbnail': c.thumbnail,
+            'thumbnail_variants': c.thumbnail_variants
         } for c in all_courses] # Return all_courses here
     })
 
 
+# Paginated course catalog, newest first. Pass the previous page's
+# next_cursor as ?cursor= to continue; ?student_id= adds an enrolled flag
+# and ?enrolled=1 restricts the list to that student's courses.
+@dashboard_bp.route('/catalog', methods=['GET'])
+def course_catalog():
+    student_id = request.args.get('student_id', type=int)
+    cursor = request.args.get('cursor', type=int)
+    only_enrolled = request.args.get('enrolled') in ('1', 'true')
+    limit = min(max(request.args.get('limit', CATALOG_PAGE_SIZE, type=int), 1), CATALOG_MAX_PAGE_SIZE)
+
+    if only_enrolled and not student_id:
+        return jsonify({'error': 'Missing student ID'}), 400
+
+    query = db.session.query(
+        Course.id,
+        Course.title,
+        Course.level,
+        Course.thumbnail,
+        Course.thumbnail_variants,
+        db.func.substr(Course.description, 1, DESCRIPTION_PREVIEW).label('summary'),
+        (db.func.length(Course.description) > DESCRIPTION_PREVIEW).label('truncated'),
+        Enrollment.id.isnot(None).label('enrolled')
+    ).outerjoin(Enrollment, and_(Enrollment.course_id == Course.id, Enrollment.student_id == student_id))
+
+    if only_enrolled:
+        query = query.filter(Enrollment.id.isnot(None))
+    if cursor is not None:
+        query = query.filter(Course.id < cursor)
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(Course.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        'courses': [{
+            'id': c.id,
+            'title': c.title,
+            'level': c.level,
+            'thumbnail': c.thumbnail,
+            'thumbnail_variants': c.thumbnail_variants,
+            'description': c.summary + '…' if c.truncated else c.summary,
+            'enrolled': bool(c.enrolled)
+        } for c in rows],
+        'next_cursor': rows[-1].id if has_more else None
+    })
+
+
 
 @dashboard_bp.route('/dashboard/teacher', methods=['GET'])
+@versions.conditional(lambda: [f"teacher:{request.args.get('id')}"], cache_control='private, no-cache')
 def get_teacher_dashboard():
     teacher_id = request.args.get('id')
     if not teacher_id:
         return jsonify({'error': 'Missing teacher ID'}), 400
 
-    courses = Course.query.filter_by(teacher_id=teacher_id).all()
-
-    my_courses = []
-    for course in courses:
-        student_count = Enrollment.query.filter_by(course_id=course.id).count()
-        my_courses.append({
-            'id': course.id,
-            'title': course.title,
-            'description': course.description,
-            'students': student_count,
-            'thumbnail': course.thumbnail
-        })
+    # Enrollment counts come from the Course.students counter, so this is one query
+    courses = db.session.query(
+        Course.id, Course.title, Course.description, Course.students, Course.thumbnail, Course.thumbnail_status,
+        Course.thumbnail_variants
+    ).filter_by(teacher_id=teacher_id).all()
+
+    my_courses = [{
+        'id': course.id,
+        'title': course.title,
+        'description': course.description,
+        'students': course.students or 0,
+        'thumbnail': course.thumbnail,
+        'thumbnail_status': course.thumbnail_status,
+        'thumbnail_variants': course.thumbnail_variants
+    } for course in courses]
 
     actions = [
         {'title': 'Upload New Course', 'link': '/courses/create'},
@@ -0,0 +1,12 @@
+from flask import Blueprint, send_from_directory, abort
+from media import get_uploader, LocalUploader
+
+media_bp = Blueprint('media', __name__)
+
+# Files pushed by the 'local' media backend (MEDIA_BACKEND=local)
+@media_bp.route('/media/<path:filename>', methods=['GET'])
+def local_media(filename):
+    uploader = get_uploader()
+    if not isinstance(uploader, LocalUploader):
+        abort(404)
+    return send_from_directory(uploader.root, filename)
@@ -1,23 +1,134 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app
 from models import db, Notification, User
+from notification_stream import hub, serialize
 from datetime import datetime
+import json
+import os
+import queue
+import time
 
 notif_bp = Blueprint('notifications', __name__)
 
+KEEPALIVE_INTERVAL = 15  # seconds between comment lines on an idle stream
+STREAM_MAX_SECONDS = int(os.getenv('SSE_MAX_SECONDS', 300))  # clients reconnect after this
+# Each open stream holds a worker, so streams are only served where gunicorn
+# runs threaded or gevent workers (render.yaml); otherwise bells poll
+SSE_ENABLED = os.getenv('SSE_ENABLED', '0') not in ('0', 'false', '')
+REPLAY_LIMIT = 50
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Newest first. ?before=<id> continues after the last notification of the
+# previous page; when there are more, the cursor for the next page is sent
+# in the X-Next-Cursor header.
 @notif_bp.route('/notifications/<int:user_id>', methods=['GET'])
 def get_notifications(user_id):
-    notifs = Notification.query.filter_by(recipient_id=user_id).order_by(Notification.timestamp.desc()).limit(20).all()
-    return jsonify([
+    before = request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+    query = Notification.query.filter_by(recipient_id=user_id)
+    if before is not None:
+        query = query.filter(Notification.id < before)
+    notifs = query.order_by(Notification.id.desc()).limit(limit + 1).all()
+
+    response = jsonify([
         {
             'id': n.id,
             'message': n.message,
             'is_read': n.is_read,
             'timestamp': n.timestamp.strftime('%Y-%m-%d %H:%M'),
-        } for n in notifs
+        } for n in notifs[:limit]
     ])
+    if len(notifs) > limit:
+        response.headers['X-Next-Cursor'] = str(notifs[limit - 1].id)
+    return response
+
+@notif_bp.route('/notifications/<int:user_id>/unread-count', methods=['GET'])
+def unread_count(user_id):
+    count = db.session.execute(db.select(User.unread_notifications).where(User.id == user_id)).scalar()
+    if count is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify({'unread': count})
+
+@notif_bp.route('/notifications/<int:user_id>/stream', methods=['GET'])
+def stream_notifications(user_id):
+    # Server-sent events: "unread" with the current count, then one
+    # "notification" per new notification. Needs a threaded or gevent
+    # worker, since each open stream holds one. With SSE_ENABLED off, 204
+    # tells EventSource not to reconnect and the bell polls unread-count.
+    if not SSE_ENABLED:
+        return '', 204
+    q = hub.subscribe(user_id, current_app._get_current_object())
+    unread = db.session.execute(db.select(User.unread_notifications).where(User.id == user_id)).scalar()
+    if unread is None:
+        hub.unsubscribe(user_id, q)
+        return jsonify({'error': 'User not found'}), 404
+
+    # Catch up after a reconnect
+    missed = []
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is not None:
+        missed = db.session.execute(
+            db.select(Notification.id, Notification.recipient_id, Notification.message, Notification.timestamp)
+            .where(Notification.recipient_id == user_id, Notification.id > last_event_id)
+            .order_by(Notification.id)
+            .limit(REPLAY_LIMIT)
+        ).all()
+    # The stream outlives the request's database work
+    db.session.remove()
 
+    def event(name, data, event_id=None):
+        head = f'id: {event_id}\n' if event_id is not None else ''
+        return f'{head}event: {name}\ndata: {json.dumps(data)}\n\n'
+
+    def generate():
+        try:
+            yield 'retry: 3000\n' + event('unread', {'unread': unread})
+            for row in missed:
+                yield event('notification', serialize(row), row.id)
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    item = q.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if item is None:
+                    break
+                yield event('notification', item, item['id'])
+        finally:
+            hub.unsubscribe(user_id, q)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Marks the user's notifications read, all of them or, with {"up_to": <id>},
+# those up to and including that id (what the user has actually seen)
 @notif_bp.route('/notifications/mark-read/<int:user_id>', methods=['POST'])
 def mark_read(user_id):
-    Notification.query.filter_by(recipient_id=user_id).update({'is_read': True})
+    data = request.get_json(silent=True) or {}
+    up_to = data.get('up_to', request.args.get('up_to'))
+
+    query = Notification.query.filter_by(recipient_id=user_id, is_read=False)
+    if up_to is not None:
+        try:
+            up_to = int(up_to)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'up_to must be a notification id'}), 400
+        query = query.filter(Notification.id <= up_to)
+    marked = query.update({'is_read': True}, synchronize_session=False)
+
+    if up_to is None:
+        User.query.filter_by(id=user_id).update({'unread_notifications': 0})
+    else:
+        remaining = User.unread_notifications - marked
+        User.query.filter_by(id=user_id).update(
+            {'unread_notifications': db.case((remaining < 0, 0), else_=remaining)},
+            synchronize_session=False
+        )
+    unread = db.session.execute(db.select(User.unread_notifications).where(User.id == user_id)).scalar()
     db.session.commit()
-    return jsonify({'message': 'All marked as read'})
+    return jsonify({'message': 'All marked as read' if up_to is None else 'Marked as read',
+                    'marked': marked, 'unread': unread or 0})
@@ -1,13 +1,17 @@
 from flask import Blueprint, request, jsonify
-from models import db, Quiz, Question, Notification, User, Enrollment, QuizSubmission, QuizAnswer
+from models import db, Quiz, Question, User, Enrollment, QuizSubmission, QuizAnswer
+from outbox import enqueue_notification
+from leaderboard import record_submission
+from answer_keys import get_answer_key, answer_text
+import versions
+from progress import student_progress, student_submissions
 from datetime import datetime
+from sqlalchemy import insert, select
 import traceback
 from flask_cors import cross_origin
-from dotenv import load_dotenv
 import os
 
 quiz_bp = Blueprint('quiz', __name__)
-load_dotenv()
 
 cors_origin = os.getenv("CORS_ORIGINS")
 
@@ -66,14 +70,7 @@ def create_quiz():
             db.session.add(new_q)
 
         # Notify all enrolled students in the course
-        enrolled_students = Enrollment.query.filter_by(course_id=course_id).all()
-        for enrollment in enrolled_students:
-            notif = Notification(
-                recipient_id=enrollment.student_id,
-                message=f"New quiz uploaded in your course (ID: {course_id})",
-                is_read=False
-            )
-            db.session.add(notif)
+        enqueue_notification('course', f"New quiz uploaded in your course (ID: {course_id})", course_id)
 
         db.session.commit()
         response = jsonify({'message': 'Quiz created successfully with notifications'})
@@ -113,6 +110,7 @@ def get_quizzes_for_student():
 
 # ✅ Get quiz detail + questions
 @quiz_bp.route("/quiz/<int:quiz_id>", methods=['GET'])
+@versions.conditional(lambda quiz_id: [f'quiz:{quiz_id}'])
 def get_quiz(quiz_id):
     quiz = Quiz.query.get(quiz_id)
     if not quiz:
@@ -148,6 +146,12 @@ def submit_quiz(quiz_id):
         answers = data["answers"]  # List of {question_id, answer}
         time_taken = data["time_taken"]
 
+        # Also checks that the quiz exists; served from cache when unchanged
+        answer_key = get_answer_key(quiz_id)
+        if answer_key is None:
+            response = jsonify({"error": "Quiz not found"})
+            return add_cors_headers(response), 404
+
         # Check if student already submitted this quiz
         existing_submission = QuizSubmission.query.filter_by(
             quiz_id=quiz_id, 
@@ -158,58 +162,50 @@ def submit_quiz(quiz_id):
             response = jsonify({"error": "You have already submitted this quiz"})
             return add_cors_headers(response), 400
 
-        # Calculate score
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        total_questions = len(questions)
+        # Grade against the answer key; no per-answer queries
+        total_questions = len(answer_key)
         correct_answers = 0
-        
-        # Create submission record
-        submission = QuizSubmission(
-            quiz_id=quiz_id,
-            student_id=student_id,
-            time_taken=time_taken
-        )
-        db.session.add(submission)
-        db.session.flush()  # Get submission ID
+        graded = []
 
         # Process each answer
         for answer_data in answers:
-            question_id = answer_data["question_id"]
+            question_id = int(answer_data["question_id"])
             student_answer = answer_data["answer"]
             
-            # Find the question
-            question = Question.query.get(question_id)
-            if not question:
+            # Only questions that belong to this quiz count
+            if question_id not in answer_key:
                 continue
-                
-            is_correct = False
-            
-            # Check if answer is correct based on question type
-            if question.type == 'mcq':
-                if question.correct_option is not None:
-                    is_correct = student_answer == question.correct_option
-            # For other question types, you might want to implement different logic
-            # or manual grading system
-            
+
+            # MCQ is graded here, other question types are reviewed manually
+            is_correct = answer_key.is_correct(question_id, student_answer)
+
             if is_correct:
                 correct_answers += 1
-            
-            # Store individual answer
-            quiz_answer = QuizAnswer(
-                submission_id=submission.id,
-                question_id=question_id,
-                answer=student_answer,
-                is_correct=is_correct
-            )
-            db.session.add(quiz_answer)
+            graded.append({'question_id': question_id, 'answer': answer_text(student_answer), 'is_correct': is_correct})
 
         # Calculate final score (percentage)
         if total_questions > 0:
             score = (correct_answers / total_questions) * 100
         else:
             score = 0
-            
-        submission.score = score
+
+        # Create submission record
+        submission = QuizSubmission(
+            quiz_id=quiz_id,
+            student_id=student_id,
+            time_taken=time_taken,
+            score=score
+        )
+        db.session.add(submission)
+        db.session.flush()  # Get submission ID
+
+        # Store individual answers in one executemany
+        if graded:
+            for row in graded:
+                row['submission_id'] = submission.id
+            db.session.execute(insert(QuizAnswer), graded)
+
+        record_submission(submission, new=True)
         db.session.commit()
         
         response = jsonify({
@@ -225,50 +221,6 @@ def submit_quiz(quiz_id):
         response = jsonify({"error": str(e)})
         return add_cors_headers(response), 500
 
-# ✅ Leaderboard (Updated to use correct tables)
-@quiz_bp.route("/leaderboard/<int:quiz_id>", methods=['GET'])
-def leaderboard(quiz_id):
-    try:
-        # Verify quiz exists
-        quiz = Quiz.query.get(quiz_id)
-        if not quiz:
-            response = jsonify({'error': 'Quiz not found'})
-            return add_cors_headers(response), 404
-
-        # Get submissions with user details from QuizSubmission table
-        submissions = db.session.query(
-            QuizSubmission.id,
-            QuizSubmission.student_id,
-            QuizSubmission.submitted_at,
-            QuizSubmission.time_taken,
-            QuizSubmission.score,  # This is the correct score from QuizSubmission
-            User.name.label('student_name')
-        ).join(User, User.id == QuizSubmission.student_id)\
-         .filter(QuizSubmission.quiz_id == quiz_id)\
-         .order_by(
-             QuizSubmission.score.desc(),  # Order by score first (highest first)
-             QuizSubmission.time_taken.asc()  # Then by time taken (fastest first)
-         ).all()
-
-        result = []
-        for sub in submissions:
-            result.append({
-                "student_id": sub.student_id,
-                "student_name": sub.student_name,
-                "time_taken": sub.time_taken,
-                "score": sub.score,  # Now correctly getting score from QuizSubmission
-                "submitted_at": sub.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if sub.submitted_at else None
-            })
-
-        response = jsonify(result)
-        return add_cors_headers(response)
-
-    except Exception as e:
-        print(f"Error fetching leaderboard: {str(e)}")
-        traceback.print_exc()
-        response = jsonify({'error': 'Server error fetching leaderboard'})
-        return add_cors_headers(response), 500
-
 # ✅ Get teacher's quizzes
 @quiz_bp.route('/quiz/teacher/<int:teacher_id>', methods=['GET'])
 def get_teacher_quizzes(teacher_id):
@@ -295,7 +247,7 @@ def get_teacher_quizzes(teacher_id):
             'title': q.title or 'Untitled Quiz',
             'instructions': q.instructions,
             'questions': q.question_count,
-            'created_at': q.created_at.strftime('%Y-%m-%d %H:%M:%S') if q.created_at else None
+            'created_at': q.created_at
         } for q in quizzes]
 
         return add_cors_headers(jsonify(result))
@@ -309,28 +261,64 @@ def get_teacher_quizzes(teacher_id):
 def after_request(response):
     return add_cors_headers(response)
 
+# Quiz list with question counts. Optional filters ?course_id= and
+# ?teacher_id=; with ?limit= the list is paged by id and the cursor for the
+# next page (?after=) is sent in the X-Next-Cursor header. The ETag follows
+# the quiz version counter, so unchanged lists are answered with 304.
 @quiz_bp.route('/quizzes', methods=['GET'])
-@cross_origin(origins=[cors_origin])
+@cross_origin(origins=[cors_origin], expose_headers=['ETag', 'X-Next-Cursor'])
+@versions.conditional(lambda: ['quizzes'])
 def get_all_quizzes():
     try:
-        quizzes = Quiz.query.all()
-        quiz_list = []
-
-        for q in quizzes:
-            # Count questions properly
-            question_count = 0
-            if hasattr(q, 'questions') and q.questions:
-                question_count = len(q.questions)
-            
-            quiz_list.append({
-                'id': q.id,
-                'title': q.title,
-                'instructions': q.instructions,
-                'created_at': q.created_at.strftime('%Y-%m-%d %H:%M:%S') if q.created_at else None,
-                'question_count': question_count
-            })
+        course_id = request.args.get('course_id', type=int)
+        teacher_id = request.args.get('teacher_id', type=int)
+        after = request.args.get('after', type=int)
+        limit = request.args.get('limit', type=int)
+
+        question_count = select(db.func.count(Question.id))\
+            .where(Question.quiz_id == Quiz.id)\
+            .correlate(Quiz)\
+            .scalar_subquery()
+        query = db.session.query(
+            Quiz.id,
+            Quiz.title,
+            Quiz.instructions,
+            Quiz.created_at,
+            Quiz.course_id,
+            Quiz.teacher_id,
+            question_count.label('question_count')
+        )
+        if course_id is not None:
+            query = query.filter(Quiz.course_id == course_id)
+        if teacher_id is not None:
+            query = query.filter(Quiz.teacher_id == teacher_id)
+        if after is not None:
+            query = query.filter(Quiz.id > after)
+        query = query.order_by(Quiz.id)
+        if limit is not None:
+            limit = min(max(limit, 1), 100)
+            query = query.limit(limit + 1)
+
+        quizzes = query.all()
+        next_cursor = None
+        if limit is not None and len(quizzes) > limit:
+            quizzes = quizzes[:limit]
+            next_cursor = quizzes[-1].id
+
+        quiz_list = [{
+            'id': q.id,
+            'title': q.title,
+            'instructions': q.instructions,
+            'created_at': q.created_at,
+            'course_id': q.course_id,
+            'teacher_id': q.teacher_id,
+            'question_count': q.question_count
+        } for q in quizzes]
 
-        return jsonify(quiz_list), 200
+        response = jsonify(quiz_list)
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+        return response, 200
 
     except Exception as e:
         import traceback
@@ -348,13 +336,22 @@ def handle_quizzes_options():
 # Get all quiz submissions for teacher review
 @quiz_bp.route('/quiz/<int:quiz_id>/submissions', methods=['GET'])
 def get_quiz_submissions(quiz_id):
-    submissions = QuizSubmission.query.filter_by(quiz_id=quiz_id).all()
+    # Names come from the join; sub.student would load each student separately
+    submissions = db.session.query(
+        QuizSubmission.student_id,
+        User.name.label('student_name'),
+        QuizSubmission.submitted_at,
+        QuizSubmission.time_taken,
+        QuizSubmission.score
+    ).join(User, User.id == QuizSubmission.student_id)\
+        .filter(QuizSubmission.quiz_id == quiz_id)\
+        .all()
     data = []
     for sub in submissions:
         data.append({
             'student_id': sub.student_id,
-            'student_name': sub.student.name,
-            'submitted_at': sub.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'student_name': sub.student_name,
+            'submitted_at': sub.submitted_at,
             'time_taken': sub.time_taken,
             'score': sub.score
         })
@@ -372,20 +369,34 @@ def update_quiz_score(quiz_id, student_id):
         return jsonify({'error': 'Submission not found'}), 404
 
     sub.score = new_score
-    db.session.commit()
+    record_submission(sub)
 
     # Notify student
-    notif = Notification(
-        recipient_id=student_id,
-        message=f"Your quiz score was updated to {new_score}%. Feedback: {feedback}",
-        is_read=False
-    )
-    db.session.add(notif)
+    enqueue_notification('user', f"Your quiz score was updated to {new_score}%. Feedback: {feedback}", student_id)
     db.session.commit()
 
     return jsonify({'message': 'Score updated and student notified'})
 
 
+# Regrade every submission after the answer key changed
+@quiz_bp.route('/quiz/<int:quiz_id>/regrade', methods=['POST'])
+def regrade(quiz_id):
+    # Imported here: regrade needs numpy, which no other route loads
+    from regrade import regrade_quiz
+
+    if not db.session.get(Quiz, quiz_id):
+        return jsonify({'error': 'Quiz not found'}), 404
+
+    try:
+        summary = regrade_quiz(quiz_id)
+    except Exception as e:
+        db.session.rollback()
+        traceback.print_exc()
+        return jsonify({'error': f'Regrade failed: {str(e)}'}), 500
+
+    return jsonify(summary)
+
+
 @quiz_bp.route('/quiz/<int:quiz_id>/submission/<int:student_id>', methods=['GET'])
 def get_submission_detail(quiz_id, student_id):
     submission = QuizSubmission.query.filter_by(quiz_id=quiz_id, student_id=student_id).first()
@@ -417,18 +428,20 @@ def get_submission_detail(quiz_id, student_id):
 
 @quiz_bp.route('/student/<int:student_id>/submissions', methods=['GET'])
 def get_student_submissions(student_id):
-    submissions = QuizSubmission.query.filter_by(student_id=student_id).all()
-    result = []
-    for sub in submissions:
-        quiz = Quiz.query.get(sub.quiz_id)
-        result.append({
-            'quiz_id': sub.quiz_id,
-            'title': quiz.title if quiz else 'Untitled',
-            'submitted_at': sub.submitted_at.strftime('%Y-%m-%d %H:%M'),
-            'time_taken': sub.time_taken,
-            'score': sub.score
-        })
-    return jsonify(result)
+    submissions = student_submissions(student_id)
+    return jsonify([{
+        'quiz_id': sub.quiz_id,
+        'title': sub.title or 'Untitled',
+        'submitted_at': sub.submitted_at.strftime('%Y-%m-%d %H:%M') if sub.submitted_at else None,
+        'time_taken': sub.time_taken,
+        'score': sub.score
+    } for sub in submissions])
+
+
+# Submissions with quiz and course, plus per-course quiz counts and scores
+@quiz_bp.route('/student/<int:student_id>/progress', methods=['GET'])
+def get_student_progress(student_id):
+    return jsonify(student_progress(student_id))
 
 
 @quiz_bp.route('/student/<int:student_id>/submission/<int:quiz_id>', methods=['GET'])
@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads DATABASE_URL when it is created; point it at a scratch
+# database before anything imports it
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'tests.sqlite3')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, User, Quiz, Question  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_quiz(app):
+    # make_quiz(correct_options, students=1) -> (quiz id, question ids, student ids)
+    # with one MCQ question per correct option
+    def make(correct_options, students=1):
+        prefix = os.urandom(4).hex()
+        teacher = User(name='Teacher', email=f'{prefix}-t@gmail.com', password='x', role='teacher')
+        users = [User(name=f'Student {n}', email=f'{prefix}-s{n}@gmail.com', password='x', role='student')
+                 for n in range(students)]
+        db.session.add(teacher)
+        db.session.add_all(users)
+        db.session.flush()
+        quiz = Quiz(title='Quiz', teacher_id=teacher.id)
+        db.session.add(quiz)
+        db.session.flush()
+        questions = [Question(quiz_id=quiz.id, text=f'Question {n}', type='mcq', options=['a', 'b', 'c'],
+                              correct_option=option)
+                     for n, option in enumerate(correct_options)]
+        db.session.add_all(questions)
+        db.session.commit()
+        return quiz.id, [q.id for q in questions], [u.id for u in users]
+
+    return make
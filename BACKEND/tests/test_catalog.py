@@ -0,0 +1,27 @@
+from models import db, Course, Enrollment
+
+
+def test_catalog_pages_and_enrolled_flag(client, make_quiz):
+    _, _, (student_id,) = make_quiz([])
+    teacher_id = student_id  # any user will do as the owner
+    courses = [Course(title=f'Course {n}', description='x' * 500, youtube_link='y', teacher_id=teacher_id)
+               for n in range(5)]
+    db.session.add_all(courses)
+    db.session.flush()
+    db.session.add(Enrollment(student_id=student_id, course_id=courses[1].id))
+    db.session.commit()
+    ids = {course.id for course in courses}
+
+    seen, cursor = [], None
+    while True:
+        page = client.get(f'/catalog?student_id={student_id}&limit=2' + (f'&cursor={cursor}' if cursor else '')).json
+        seen.extend(c for c in page['courses'] if c['id'] in ids)
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert [c['id'] for c in seen] == sorted(ids, reverse=True)
+    assert [c['enrolled'] for c in seen].count(True) == 1
+    assert all(len(c['description']) <= 161 for c in seen)
+
+    enrolled = client.get(f'/catalog?student_id={student_id}&enrolled=1&limit=100').json
+    assert [c['id'] for c in enrolled['courses']] == [courses[1].id]
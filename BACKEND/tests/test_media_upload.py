@@ -0,0 +1,39 @@
+import io
+
+import pytest
+from PIL import Image
+
+import images
+import media
+from models import db, Course
+
+
+def post_course(client, teacher_id, size):
+    return client.post('/create-course', content_type='multipart/form-data', data={
+        'title': 'Course', 'description': 'About', 'teacher_id': str(teacher_id), 'youtube_link': 'y',
+        'thumbnail': (io.BytesIO(b'x' * size), 'thumbnail.jpg'),
+    })
+
+
+def test_upload_size_limits(app, client, make_quiz, monkeypatch):
+    _, _, (teacher_id,) = make_quiz([])
+    monkeypatch.setattr(media, 'MAX_UPLOAD_BYTES', 1000)
+    before = db.session.query(Course).count()
+
+    assert post_course(client, teacher_id, 1000).status_code == 200
+    assert post_course(client, teacher_id, 1001).status_code == 413
+
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 2000)
+    assert post_course(client, teacher_id, 3000).status_code == 413
+    assert db.session.query(Course).count() == before + 1
+
+
+def test_images_over_the_pixel_limit_are_refused(tmp_path, monkeypatch):
+    # Pillow alone would only warn up to twice its limit
+    path = str(tmp_path / 'photo.jpg')
+    Image.new('RGB', (150, 100)).save(path)
+    monkeypatch.setattr(images, 'MAX_PIXELS', 10_000)
+    with pytest.raises(images.InvalidImage):
+        images.make_variants(path, 'avatar')
+    monkeypatch.setattr(images, 'MAX_PIXELS', 15_000)
+    assert set(images.make_variants(path, 'avatar')) == {'detail', 'card', 'grid'}
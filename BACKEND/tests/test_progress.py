@@ -0,0 +1,15 @@
+from models import db, QuizSubmission
+
+
+def test_progress_sees_writes_of_other_workers(client, make_quiz):
+    quiz_id, _, (student_id,) = make_quiz([0])
+    assert client.get(f'/student/{student_id}/progress').json['submissions'] == []
+
+    # Written by another worker: nothing in this process is told
+    db.session.add(QuizSubmission(quiz_id=quiz_id, student_id=student_id, time_taken=30, score=100))
+    db.session.commit()
+
+    progress = client.get(f'/student/{student_id}/progress').json
+    assert [(s['quiz_id'], s['score']) for s in progress['submissions']] == [(quiz_id, 100)]
+    submissions = client.get(f'/student/{student_id}/submissions').json
+    assert [(s['quiz_id'], s['score']) for s in submissions] == [(quiz_id, 100)]
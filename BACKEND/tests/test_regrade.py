@@ -0,0 +1,43 @@
+import pytest
+
+from answer_keys import option_number
+from models import db, QuizAnswer
+from regrade import regrade_quiz
+
+ANSWERS = ['99999999999999999999', '²', '١', '1']
+
+
+@pytest.mark.parametrize('answer, option', [
+    (1, 1), ('1', 1), ('01', 1), ('123456789', 123456789),
+    ('99999999999999999999', None), ('1234567890', None), ('²', None), ('١', None),
+    ('', None), ('-1', None), (' 1', None), ('1.0', None), (True, None), (None, None),
+])
+def test_option_number(answer, option):
+    assert option_number(answer) == option
+
+
+def test_regrade_matches_submission(client, make_quiz):
+    quiz_id, question_ids, (student_id,) = make_quiz([1] * len(ANSWERS))
+    res = client.post(f'/submit-quiz/{quiz_id}', json={
+        'student_id': student_id, 'time_taken': 30,
+        'answers': [{'question_id': qid, 'answer': answer} for qid, answer in zip(question_ids, ANSWERS)],
+    })
+    assert res.status_code == 200, res.json
+    assert res.json['score'] == 25
+
+    def graded():
+        rows = db.session.execute(
+            db.select(QuizAnswer.answer, QuizAnswer.is_correct)
+            .where(QuizAnswer.question_id.in_(question_ids))
+            .order_by(QuizAnswer.question_id)
+        ).all()
+        return [tuple(row) for row in rows]
+
+    submitted = graded()
+    assert submitted == [(answer, answer == '1') for answer in ANSWERS]
+
+    result = regrade_quiz(quiz_id)
+    db.session.expire_all()
+    assert result['answers_changed'] == 0
+    assert result['scores_changed'] == 0
+    assert graded() == submitted
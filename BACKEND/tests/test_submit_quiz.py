@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import insert, update
+
+import query_profiler
+import versions
+from models import db, Question
+
+# Statements per submission, whatever the number of answers: quiz and
+# answer key version, duplicate check, submission, one executemany for the
+# answers, student name, leaderboard entry, and the leaderboard version
+# bump after the commit; plus the questions on a cold answer key cache.
+WARM_BUDGET = 7
+COLD_BUDGET = WARM_BUDGET + 1
+
+
+def submit(client, quiz_id, question_ids, student_id, answer=1):
+    return client.post(f'/submit-quiz/{quiz_id}', json={
+        'student_id': student_id, 'time_taken': 30,
+        'answers': [{'question_id': qid, 'answer': answer} for qid in question_ids],
+    })
+
+
+def changed_elsewhere(statement, quiz_id):
+    # A write made by another gunicorn worker: Core statements skip this
+    # process's ORM events, only the committed version changes
+    db.session.execute(statement)
+    versions.bump(f'quiz:{quiz_id}')
+    db.session.commit()
+
+
+@pytest.mark.parametrize('questions', [1, 50])
+def test_submit_quiz_statements(client, make_quiz, questions):
+    quiz_id, question_ids, (first, second) = make_quiz([1] * questions, students=2)
+
+    with query_profiler.assert_query_budget(COLD_BUDGET, repeats=1):
+        res = submit(client, quiz_id, question_ids, first)
+    assert res.status_code == 200, res.json
+    with query_profiler.assert_query_budget(WARM_BUDGET, repeats=1):
+        res = submit(client, quiz_id, question_ids, second)
+    assert res.status_code == 200, res.json
+    assert res.json['correct_answers'] == questions
+
+
+def test_duplicate_submission_statements(client, make_quiz):
+    quiz_id, question_ids, (student_id,) = make_quiz([1, 1])
+    submit(client, quiz_id, question_ids, student_id)
+    with query_profiler.assert_query_budget(2):
+        res = submit(client, quiz_id, question_ids, student_id)
+    assert res.status_code == 400
+
+
+def test_unknown_quiz(client, make_quiz):
+    _, _, (student_id,) = make_quiz([1])
+    res = submit(client, 999999, [], student_id)
+    assert res.status_code == 404
+
+
+def test_answer_key_follows_questions_changed_elsewhere(client, make_quiz):
+    quiz_id, question_ids, (first, second) = make_quiz([1], students=2)
+    assert submit(client, quiz_id, question_ids, first).json['correct_answers'] == 1
+
+    changed_elsewhere(update(Question).where(Question.id == question_ids[0]).values(correct_option=2), quiz_id)
+    res = submit(client, quiz_id, question_ids, second, answer=2)
+    assert res.json['correct_answers'] == 1
+
+
+def test_answer_key_of_quiz_without_questions(client, make_quiz):
+    quiz_id, _, (first, second) = make_quiz([], students=2)
+    assert submit(client, quiz_id, [], first).json['total_questions'] == 0
+
+    changed_elsewhere(insert(Question).values(quiz_id=quiz_id, text='Added', type='mcq', correct_option=1), quiz_id)
+    question_id = db.session.execute(db.select(Question.id).where(Question.quiz_id == quiz_id)).scalar()
+    res = submit(client, quiz_id, [question_id], second)
+    assert (res.json['total_questions'], res.json['correct_answers']) == (1, 1)
+
+
+def test_leaderboard_etag_changes_after_submission(client, make_quiz):
+    quiz_id, question_ids, (first, second) = make_quiz([1], students=2)
+    submit(client, quiz_id, question_ids, first)
+    tag = client.get(f'/leaderboard/{quiz_id}').headers['ETag']
+    assert client.get(f'/leaderboard/{quiz_id}', headers={'If-None-Match': tag}).status_code == 304
+
+    # Bumped once the submission committed, outside its transaction
+    submit(client, quiz_id, question_ids, second)
+    res = client.get(f'/leaderboard/{quiz_id}', headers={'If-None-Match': tag})
+    assert res.status_code == 200
+    assert len(res.json) == 2
@@ -0,0 +1,63 @@
+import pytest
+
+from benchmarks.fake_youtube import FakeYouTube
+from youtube_cache import YouTubeCache
+
+
+@pytest.fixture(scope='module')
+def fake():
+    server = FakeYouTube().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fetch(fake):
+    fake.reset_counters()
+
+    def fetch(cache, video_id):
+        return cache.fetch(f'videos:{video_id}', f'{fake.url}/videos', params={'part': 'snippet', 'id': video_id})
+    return fetch
+
+
+def test_hit_within_ttl(fake, fetch):
+    cache = YouTubeCache(ttl=60)
+    first = fetch(cache, 'a')
+    assert fetch(cache, 'a') == first
+    assert fake.total_requests() == 1
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (1, 1)
+
+
+def test_lru_eviction(fake, fetch):
+    cache = YouTubeCache(ttl=60, maxsize=2)
+    for video_id in 'abc':
+        fetch(cache, video_id)
+    assert cache.stats()['memory_size'] == 2
+
+    # 'a' was the least recently used: gone, so fetched in full again
+    fetch(cache, 'c')
+    fetch(cache, 'a')
+    assert fake.total_requests() == 4
+    assert fake.not_modified == 0
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (4, 1)
+
+
+def test_revalidation_with_if_none_match(fake, fetch):
+    cache = YouTubeCache(ttl=0)
+    first = fetch(cache, 'a')
+    assert fetch(cache, 'a') == first
+    assert fake.total_requests() == 2
+    assert fake.not_modified == 1
+    assert (cache.stats()['misses'], cache.stats()['revalidated']) == (1, 1)
+
+
+def test_disk_tier_shared_by_workers(fake, fetch, tmp_path):
+    path = str(tmp_path / 'youtube-cache.sqlite3')
+    first = fetch(YouTubeCache(ttl=60, path=path), 'a')
+
+    # Another worker starts with an empty memory tier
+    other = YouTubeCache(ttl=60, path=path)
+    assert fetch(other, 'a') == first
+    assert fetch(other, 'a') == first
+    assert fake.total_requests() == 1
+    assert (other.stats()['disk_hits'], other.stats()['hits']) == (1, 1)
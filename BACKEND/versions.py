@@ -0,0 +1,140 @@
+import hashlib
+from functools import wraps
+from flask import request, make_response, Response
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import db, EntityVersion, Course, Quiz, Question, LeaderboardEntry
+
+# Version counters for cacheable reads. Every flush that touches a tracked
+# model bumps the counters named by that model's rule, inside the same
+# transaction, so a version can never be ahead of or behind the data.
+# Readers turn the counters into an ETag and answer 304 without running
+# the real query. Bulk Core statements bypass the ORM and must call bump().
+#
+# Rules tracked with after_commit=True bump in a short transaction of their
+# own once the writer has committed. That is for counters every writer
+# shares: a leaderboard row bumped inside submit_quiz would stay locked
+# until the submission commits and serialize all submissions to a quiz on
+# Postgres. Until the bump lands a reader may still get a 304 for the old
+# board; boards are cached for seconds anyway (leaderboard.py).
+#
+# Names: 'quizzes' (quiz list), 'quiz:<id>', 'course:<id>',
+# 'teacher:<id>' (teacher dashboard), 'leaderboard:<quiz id>' and
+# 'leaderboards' (every board, after a full rebuild).
+
+_rules = {}  # model class -> (function(instance) -> version names, after_commit)
+_AFTER_COMMIT = 'versions_after_commit'  # Session.info key: names to bump on commit
+
+
+def track(model, names, after_commit=False):
+    _rules[model] = (names, after_commit)
+
+
+track(Quiz, lambda quiz: ['quizzes', f'quiz:{quiz.id}'])
+track(Question, lambda question: ['quizzes', f'quiz:{question.quiz_id}'])
+track(Course, lambda course: [f'course:{course.id}', f'teacher:{course.teacher_id}'])
+track(LeaderboardEntry, lambda entry: [f'leaderboard:{entry.quiz_id}'], after_commit=True)
+
+
+def _upsert(dialect_name):
+    if dialect_name == 'postgresql':
+        return postgresql.insert
+    if dialect_name == 'sqlite':
+        return sqlite.insert
+    return None
+
+
+def bump(*names, connection=None):
+    connection = connection or db.session.connection()
+    upsert = _upsert(connection.dialect.name)
+    for name in sorted(set(names)):
+        if upsert is not None:
+            stmt = upsert(EntityVersion).values(name=name, version=1)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[EntityVersion.name],
+                set_={'version': EntityVersion.version + 1}
+            ))
+        elif not connection.execute(
+            update(EntityVersion).where(EntityVersion.name == name).values(version=EntityVersion.version + 1)
+        ).rowcount:
+            connection.execute(insert(EntityVersion).values(name=name, version=1))
+
+
+def bump_courses(*course_ids, connection=None):
+    # For Core updates of Course rows: the course pages and the dashboards
+    # of their teachers
+    if not course_ids:
+        return
+    connection = connection or db.session.connection()
+    teacher_ids = connection.execute(
+        select(Course.teacher_id).where(Course.id.in_(course_ids)).distinct()
+    ).scalars()
+    bump(*[f'course:{course_id}' for course_id in course_ids],
+         *[f'teacher:{teacher_id}' for teacher_id in teacher_ids], connection=connection)
+
+
+def get_versions(names):
+    rows = dict(db.session.execute(
+        select(EntityVersion.name, EntityVersion.version).where(EntityVersion.name.in_(names))
+    ).all())
+    return [rows.get(name, 0) for name in names]
+
+
+def etag(names, *extra):
+    # Strong validator for a response that depends only on the named
+    # counters and on extra (query string, user id, ...)
+    parts = [f'{name}={version}' for name, version in zip(names, get_versions(names))]
+    parts.extend(str(e) for e in extra)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+
+
+def conditional(names, cache_control='no-cache'):
+    # Decorator for GET views whose 200 response only changes with the named
+    # counters. names(**view_args) returns the names; the path and query
+    # string are part of the ETag. The versions are read before the view
+    # runs, so a write in between can only make the ETag older than the
+    # body, which costs the client a full response next time, never a stale
+    # 304.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = etag(names(**kwargs), request.path, request.query_string.decode())
+            if request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed(session, flush_context):
+    names, later = set(), set()
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        rule = _rules.get(type(instance))
+        if rule is not None:
+            rule_names, after_commit = rule
+            (later if after_commit else names).update(rule_names(instance))
+    if names:
+        bump(*names, connection=session.connection())
+    if later:
+        session.info.setdefault(_AFTER_COMMIT, set()).update(later)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed(session):
+    names = session.info.pop(_AFTER_COMMIT, None)
+    if names:
+        with session.get_bind().begin() as connection:
+            bump(*names, connection=connection)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_uncommitted(session):
+    session.info.pop(_AFTER_COMMIT, None)
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import metrics
+from app import create_app
+from outbox import process_batch, retry_failed
+from media import process_uploads, retry_failed_uploads
+from counters import reconcile_student_counts, reconcile_unread_counts
+from retention import archive_notifications
+
+# Background worker, run next to the web process:
+#
+#     python worker.py              poll forever
+#     python worker.py --once       drain what is due and exit
+#     python worker.py --retry      requeue failed events and uploads and exit
+
+POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', 2))
+RECONCILE_INTERVAL = float(os.getenv('RECONCILE_INTERVAL', 3600))  # seconds between counter checks
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', 86400))  # seconds between notification archiving runs
+
+
+def run_once():
+    processed = 0
+    while True:
+        count = process_batch() + process_uploads()
+        processed += count
+        if not count:
+            return processed
+
+
+def main(argv):
+    app = create_app(routes=False)
+    with app.app_context():
+        if '--retry' in argv:
+            print(f'Requeued {retry_failed()} failed notification events')
+            print(f'Requeued {retry_failed_uploads()} failed uploads')
+            return
+        if '--once' in argv:
+            print(f'Processed {run_once()} notification events and uploads')
+            return
+
+        print('Worker started')
+        next_reconcile = time.monotonic()
+        next_archive = time.monotonic()
+        while True:
+            if time.monotonic() >= next_reconcile:
+                drift = reconcile_student_counts()
+                if drift:
+                    print(f'Repaired enrollment counters of {len(drift)} courses')
+                drift = reconcile_unread_counts()
+                if drift:
+                    print(f'Repaired unread counters of {len(drift)} users')
+                next_reconcile = time.monotonic() + RECONCILE_INTERVAL
+            if time.monotonic() >= next_archive:
+                archived = archive_notifications()
+                if archived:
+                    print(f'Archived {archived} read notifications')
+                next_archive = time.monotonic() + ARCHIVE_INTERVAL
+            processed = run_once()
+            metrics.maybe_flush()
+            if not processed:
+                time.sleep(POLL_INTERVAL)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import requests
+import metrics
+from cache import LRUCache
+
+# Cache for YouTube Data API responses, keyed by what was asked for
+# ("playlistItems:<playlist id>:<page token>", "videos:<video ids>", ...).
+#
+# Two tiers: a bounded in-process LRU, and optionally a SQLite file that all
+# gunicorn workers on the machine share (YOUTUBE_CACHE_PATH). Entries are
+# kept after their TTL runs out so they can be revalidated with
+# If-None-Match; the API answers 304 for unchanged resources, which costs no
+# quota. A stale entry is also served if the API cannot be reached.
+
+
+if 'gevent.monkey' in sys.modules:
+    _thread_local = sys.modules['gevent.monkey'].get_original('threading', 'local')
+else:
+    _thread_local = threading.local
+
+
+class YouTubeAPIError(Exception):
+    def __init__(self, message, code=500):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class YouTubeCache:
+    def __init__(self, ttl=3600, maxsize=512, path=None, timeout=10):
+        self.ttl = ttl
+        self.path = path
+        self.timeout = timeout
+        self.memory = LRUCache(maxsize=maxsize)
+        self.counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'revalidated': 0, 'stale': 0}
+        self._counters_lock = threading.Lock()  # += is not atomic across threads
+        # Per OS thread even under gevent, where threading.local would open
+        # a connection for every greenlet, i.e. every request
+        self._local = _thread_local()
+        if path:
+            self._disk().execute(
+                'CREATE TABLE IF NOT EXISTS youtube_cache ('
+                'key TEXT PRIMARY KEY, etag TEXT, body TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            ttl=int(os.getenv('YOUTUBE_CACHE_TTL', 3600)),
+            maxsize=int(os.getenv('YOUTUBE_CACHE_SIZE', 512)),
+            path=os.getenv('YOUTUBE_CACHE_PATH') or None
+        )
+
+    def _disk(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def _load(self, key):
+        entry = self.memory.get(key)
+        if entry is not None or not self.path:
+            return entry, 'memory'
+        row = self._disk().execute(
+            'SELECT etag, body, expires_at FROM youtube_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        entry = {'etag': row[0], 'body': json.loads(row[1]), 'expires_at': row[2]}
+        self.memory.set(key, entry)
+        return entry, 'disk'
+
+    def _store(self, key, entry):
+        self.memory.set(key, entry)
+        if self.path:
+            self._disk().execute(
+                'INSERT OR REPLACE INTO youtube_cache (key, etag, body, expires_at) VALUES (?, ?, ?, ?)',
+                (key, entry['etag'], json.dumps(entry['body']), entry['expires_at'])
+            )
+
+    def fetch(self, key, url, params=None, http=requests, parse=None):
+        # Returns parse(decoded JSON body) for url, from cache when possible.
+        # Only the parsed value is kept, so parse should reduce the response
+        # to what callers need. Error responses raise YouTubeAPIError and are
+        # never cached.
+        entry, tier = self._load(key)
+        now = time.time()
+        if entry is not None and entry['expires_at'] > now:
+            self._count('disk_hits' if tier == 'disk' else 'hits')
+            return entry['body']
+
+        headers = {}
+        if entry is not None and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+
+        start = time.perf_counter()
+        try:
+            res = http.get(url, params=params, headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            metrics.observe_outbound('youtube', time.perf_counter() - start, 'error')
+            if entry is None:
+                raise
+            self._count('stale')
+            return entry['body']
+        metrics.observe_outbound('youtube', time.perf_counter() - start, res.status_code)
+
+        if res.status_code == 304 and entry is not None:
+            self._count('revalidated')
+            entry = dict(entry, expires_at=now + self.ttl)
+            self._store(key, entry)
+            return entry['body']
+
+        body = res.json()
+        self._count('misses')
+        if res.status_code != 200 or 'error' in body:
+            error = body.get('error') or {}
+            raise YouTubeAPIError(error.get('message', f'YouTube API returned {res.status_code}'), error.get('code', res.status_code))
+
+        etag = res.headers.get('ETag') or body.get('etag')
+        value = parse(body) if parse else body
+        self._store(key, {'etag': etag, 'body': value, 'expires_at': now + self.ttl})
+        return value
+
+    def invalidate(self, key):
+        self.memory.pop(key)
+        if self.path:
+            self._disk().execute('DELETE FROM youtube_cache WHERE key = ?', (key,))
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return dict(counters, memory_size=len(self.memory), memory_maxsize=self.memory.maxsize, disk=bool(self.path))
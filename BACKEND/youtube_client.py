@@ -0,0 +1,116 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from youtube_cache import YouTubeCache, YouTubeAPIError
+
+# One client per process, shared by routes/youtube.py and course.py. It keeps
+# a pooled requests.Session, asks for the largest pages the API allows and
+# reduces every response to small video records before caching it.
+
+MAX_RESULTS = 50  # API maximum for both playlistItems and videos?id=
+
+
+def _thumbnail(snippet, *sizes):
+    thumbnails = snippet.get('thumbnails', {})
+    for size in sizes:
+        if size in thumbnails:
+            return thumbnails[size]['url']
+    return None
+
+
+def _parse_playlist_page(body):
+    videos = []
+    for item in body.get('items', []):
+        snippet = item['snippet']
+        videos.append({
+            'title': snippet['title'],
+            'videoId': snippet['resourceId']['videoId'],
+            'thumbnail': _thumbnail(snippet, 'medium', 'default')
+        })
+    return {'videos': videos, 'next_page_token': body.get('nextPageToken')}
+
+
+def _parse_videos(body):
+    videos = []
+    for item in body.get('items', []):
+        snippet = item['snippet']
+        videos.append({
+            'videoId': item['id'],
+            'title': snippet.get('title', 'No Title'),
+            'description': snippet.get('description', 'No Description'),
+            'thumbnail': _thumbnail(snippet, 'medium', 'default'),
+            'thumbnail_high': _thumbnail(snippet, 'high', 'default')
+        })
+    return videos
+
+
+class YouTubeClient:
+    def __init__(self, api_key, api_url, cache=None, pool_size=10, timeout=10):
+        self.api_key = api_key
+        self.api_url = api_url.rstrip('/')
+        self.cache = cache or YouTubeCache(timeout=timeout)
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504], allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            api_key=os.getenv('YOUTUBE_API_KEY'),
+            api_url=os.getenv('YOUTUBE_API_URL', 'https://www.googleapis.com/youtube/v3'),
+            cache=YouTubeCache.from_env(),
+            pool_size=int(os.getenv('YOUTUBE_POOL_SIZE', 10))
+        )
+
+    def _get(self, key, endpoint, params, parse):
+        params = dict(params, key=self.api_key)
+        return self.cache.fetch(key, f'{self.api_url}/{endpoint}', params=params, http=self.session, parse=parse)
+
+    def playlist_page(self, playlist_id, page_token=''):
+        return self._get(
+            f'playlistItems:{playlist_id}:{page_token}',
+            'playlistItems',
+            {'part': 'snippet', 'maxResults': MAX_RESULTS, 'playlistId': playlist_id, 'pageToken': page_token},
+            _parse_playlist_page
+        )
+
+    def playlist_videos(self, playlist_id, limit=None):
+        # Follows nextPageToken until the playlist (or limit) is exhausted
+        videos = []
+        page_token = ''
+        while True:
+            page = self.playlist_page(playlist_id, page_token)
+            videos.extend(page['videos'])
+            page_token = page['next_page_token']
+            if not page_token or (limit is not None and len(videos) >= limit):
+                break
+        return videos[:limit] if limit is not None else videos
+
+    def videos(self, video_ids):
+        # Details for any number of videos, MAX_RESULTS ids per request.
+        # Returned in the order asked for; unknown ids are left out.
+        video_ids = list(dict.fromkeys(video_ids))
+        found = {}
+        for start in range(0, len(video_ids), MAX_RESULTS):
+            batch = video_ids[start:start + MAX_RESULTS]
+            for video in self._get(f"videos:{','.join(batch)}", 'videos', {'part': 'snippet', 'id': ','.join(batch)}, _parse_videos):
+                found[video['videoId']] = video
+        return [found[i] for i in video_ids if i in found]
+
+    def video(self, video_id):
+        videos = self.videos([video_id])
+        return videos[0] if videos else None
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = YouTubeClient.from_env()
+    return _client
+